@@ -0,0 +1,89 @@
+from flask import jsonify, send_file
+
+from utils.image_jobs import ImageJobQueue
+
+
+class ImageController:
+    # Las imágenes locales se identifican por su contenido: nunca cambian
+    IMAGE_MAX_AGE = 31536000  # 1 año
+    
+    # imagen_estado del plato -> estado del trabajo que subió su imagen
+    JOB_STATUS = {
+        "pendiente": ImageJobQueue.PENDING,
+        "lista": ImageJobQueue.DONE,
+        "error": ImageJobQueue.FAILED,
+    }
+    
+    def __init__(self, image_storage, image_jobs, menu_model=None):
+        self.image_storage = image_storage
+        self.image_jobs = image_jobs
+        # Sin base de datos solo se conocen los trabajos de este proceso
+        self.menu_model = menu_model
+    
+    def get_image(self, image_hash, size=None):
+        """
+        Sirve una imagen del almacenamiento local
+        GET /images/<hash>
+        GET /images/<hash>/<tamaño>  (thumb, preview o print)
+        """
+        opener = getattr(self.image_storage, 'open', None)
+        found = opener(image_hash, size) if opener else None
+        if found is None:
+            return jsonify({
+                "code": 404,
+                "message": "Imagen no encontrada"
+            }), 404
+        
+        path, mimetype = found
+        # El hash sirve de ETag; send_file responde 304 a If-None-Match
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            etag=f"{image_hash}-{size}" if size else image_hash,
+            max_age=self.IMAGE_MAX_AGE,
+            conditional=True
+        )
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+    
+    def get_image_job(self, job_id):
+        """
+        Consulta el estado de una subida o eliminación de imagen
+        GET /images/jobs/<job_id>
+        """
+        job = self.image_jobs.get(job_id)
+        if job is None:
+            # El trabajo pudo encolarse en otro worker: el plato guarda su estado
+            job = self._job_from_dish(job_id)
+        if job is None:
+            return jsonify({
+                "code": 404,
+                "message": "Trabajo no encontrado (pudo haber expirado)"
+            }), 404
+        return jsonify({
+            "code": 200,
+            "data": job,
+            "message": "OK"
+        }), 200
+    
+    def _job_from_dish(self, job_id):
+        """Estado de una subida según el plato que la espera, o None"""
+        if self.menu_model is None:
+            return None
+        result = self.menu_model.get_image_job(job_id)
+        if result.get('code') != 200:
+            return None
+        dish = result['data']
+        status = self.JOB_STATUS.get(dish['imagen_estado'], ImageJobQueue.PENDING)
+        return {
+            "id": job_id,
+            "type": "upload",
+            "dish_id": dish['id'],
+            "status": status,
+            "result": {"success": True, "url": dish['imagen_url']} if status == ImageJobQueue.DONE else None,
+            "error": "La subida de la imagen falló" if status == ImageJobQueue.FAILED else None,
+            # Los tiempos solo los conoce el proceso que ejecutó el trabajo
+            "created_at": None,
+            "finished_at": None
+        }
@@ -1,12 +1,46 @@
-from flask import request, jsonify
+from flask import request, jsonify, Response, current_app, stream_with_context
+from datetime import datetime
 import re
+import time
+import zlib
 from utils.cloudinary_config import CloudinaryConfig
+from utils.compression import EncodedSnapshot, negotiate
+from utils import menu_formats
+from utils.metrics import REGISTRY
+from utils.image_jobs import ImageJobQueue
+from utils.prefork import DETACH_KEY
+
+
+UPLOAD_SECONDS = REGISTRY.histogram(
+    "image_upload_seconds", "Duración de las subidas de imágenes al almacenamiento",
+    ("storage", "result"), buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
 
 
 class MenuController:
-    def __init__(self, menu_model):
+    # Espera máxima de un long-poll en /menu/changes (segundos)
+    MAX_POLL_WAIT = 30
+    # Intervalo de comentarios keep-alive en /menu/stream (segundos)
+    STREAM_HEARTBEAT = 15
+    MAX_STREAM_HEARTBEAT = 60
+    # Paginación de GET /menu
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+    PAGE_ARGS = ('limit', 'after_id', 'before_id', 'fields', 'min_precio',
+                 'max_precio', 'nombre', 'fecha_desde', 'fecha_hasta', 'with_total')
+    # Elementos por petición en /menu/bulk
+    MAX_BULK_ITEMS = 1000
+    
+    def __init__(self, menu_model, change_log, image_jobs=None, image_storage=None):
         self.menu_model = menu_model
-        self.cloudinary = CloudinaryConfig()
+        self.change_log = change_log
+        # Cloudinary salvo que se inyecte otro almacenamiento (p. ej. LocalImageStorage)
+        self.image_storage = image_storage if image_storage is not None else CloudinaryConfig()
+        # Subidas y eliminaciones de imágenes fuera del hilo de la petición
+        self.image_jobs = image_jobs if image_jobs is not None else ImageJobQueue()
+        # JSON del menú completo ya codificado (y comprimido) para la versión
+        # actual; se revalida con el mismo TTL que la caché de lectura
+        self.menu_snapshot = EncodedSnapshot(max_age=getattr(menu_model, 'ttl', None))
     
     def _sanitize_string(self, value, max_length=100):
         """
@@ -78,20 +112,305 @@ class MenuController:
         except (ValueError, TypeError):
             return False, "El ID debe ser un número entero válido"
     
+    def _parse_page_args(self, args):
+        """
+        Valida los parámetros de paginación, proyección y filtros de GET /menu
+        
+        Returns:
+            (is_valid, dict_de_parámetros_o_mensaje)
+        """
+        page = {}
+        
+        limit = args.get('limit')
+        if limit is None:
+            page['limit'] = self.DEFAULT_PAGE_SIZE
+        else:
+            try:
+                page['limit'] = int(limit)
+            except ValueError:
+                return False, "El parámetro 'limit' debe ser un número entero"
+            if not 1 <= page['limit'] <= self.MAX_PAGE_SIZE:
+                return False, f"El parámetro 'limit' debe estar entre 1 y {self.MAX_PAGE_SIZE}"
+        
+        for key in ('after_id', 'before_id'):
+            if args.get(key) is not None:
+                try:
+                    page[key] = int(args[key])
+                    if page[key] < 0:
+                        raise ValueError
+                except ValueError:
+                    return False, f"El parámetro '{key}' debe ser un entero positivo"
+        if 'after_id' in page and 'before_id' in page:
+            return False, "Use solo uno de los parámetros 'after_id' o 'before_id'"
+        
+        page['with_total'] = args.get('with_total', '').lower() in ('1', 'true')
+        
+        if args.get('fields'):
+            fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+            invalid = [field for field in fields if field not in self.menu_model.FIELDS]
+            if invalid:
+                return False, f"Campos no permitidos: {', '.join(invalid)}. Use: {', '.join(self.menu_model.FIELDS)}"
+            page['fields'] = fields
+        
+        for key in ('min_precio', 'max_precio'):
+            if args.get(key) is not None:
+                is_valid, precio = self._validate_price(args[key])
+                if not is_valid:
+                    return False, f"{key}: {precio}"
+                page[key] = precio
+        
+        if args.get('nombre'):
+            page['nombre'] = self._sanitize_string(args['nombre'], max_length=100)
+        
+        for key in ('fecha_desde', 'fecha_hasta'):
+            if args.get(key) is not None:
+                try:
+                    page[key] = datetime.strptime(args[key], "%Y-%m-%d").date()
+                except ValueError:
+                    return False, f"El parámetro '{key}' debe tener formato YYYY-MM-DD"
+        
+        return True, page
+    
+    def _menu_etag(self, version, *parts):
+        """ETag fuerte derivado de la versión del menú"""
+        return "-".join(["menu", str(version), *(str(part) for part in parts)])
+    
+    def _not_modified(self, etag):
+        """
+        Retorna una respuesta 304 si el cliente ya tiene esta versión
+        (header If-None-Match), o None si hay que enviar el contenido
+        """
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        return None
+    
+    def _with_etag(self, result, etag):
+        """Serializa el resultado y agrega el ETag si la consulta fue exitosa"""
+        response = jsonify(result)
+        if result.get('code') == 200:
+            response.set_etag(etag)
+            # Permitir guardar la respuesta pero revalidarla en cada uso
+            response.headers['Cache-Control'] = 'no-cache'
+        return response, result.get('code', 500)
+    
+    def _menu_response(self, body, mimetype, etag, encoding=None):
+        """Respuesta exitosa de GET /menu con un cuerpo ya codificado"""
+        response = Response(body, status=200, mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept, Accept-Encoding'
+        response.set_etag(etag)
+        # Permitir guardar la respuesta pero revalidarla en cada uso
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    def _snapshot_response(self, result, version, etag, mimetype, encoding):
+        """
+        Responde con el menú completo sin volver a serializarlo
+
+        El cuerpo de cada formato (y su versión comprimida) se genera una
+        vez por versión del menú y se reutiliza en las consultas siguientes.
+        """
+        def encode():
+            result['version'] = version
+            return menu_formats.encode(result, mimetype)
+        
+        body, encoding = self.menu_snapshot.get(
+            version, result.get('data'), encode, encoding, form=mimetype
+        )
+        return self._menu_response(body, mimetype, etag, encoding)
+    
     def get_all_dishes(self):
         """
         Obtiene todos los platos del menú
         GET /menu
+        
+        Con cualquiera de los parámetros limit, after_id, before_id, fields,
+        min_precio, max_precio, nombre (prefijo), fecha_desde, fecha_hasta o
+        with_total devuelve una página ordenada por id; `next_cursor` se
+        envía como after_id para pedir la siguiente y `prev_cursor` como
+        before_id para la anterior.
+        
+        Responde 304 sin consultar la base de datos si el ETag enviado
+        en If-None-Match corresponde a la versión actual. Según el header
+        Accept responde en JSON, por columnas o por columnas en MessagePack
+        (ver utils.menu_formats). El menú completo se envía comprimido
+        (br o gzip) si el cliente lo acepta en Accept-Encoding.
         """
         try:
+            # Leer la versión antes de consultar: si hay una escritura en medio,
+            # el cliente la volverá a recibir en /menu/changes (es idempotente)
+            version = self.change_log.version
+            mimetype = menu_formats.negotiate(request.accept_mimetypes)
+            # Cada formato es una representación distinta: su propio ETag
+            tags = [] if mimetype == menu_formats.JSON else [menu_formats.TAGS[mimetype]]
+            
+            if any(key in request.args for key in self.PAGE_ARGS):
+                is_valid, page = self._parse_page_args(request.args)
+                if not is_valid:
+                    return jsonify({
+                        "code": 400,
+                        "message": page
+                    }), 400
+                
+                # El ETag depende también de la consulta
+                query_key = zlib.crc32(request.query_string) & 0xffffffff
+                etag = self._menu_etag(version, f"q{query_key:08x}", *tags)
+                not_modified = self._not_modified(etag)
+                if not_modified is not None:
+                    not_modified.headers['Vary'] = 'Accept'
+                    return not_modified
+                
+                result = self.menu_model.get_page(**page)
+                if result.get('code') != 200:
+                    return self._with_etag(result, etag)
+                result['version'] = version
+                return self._menu_response(menu_formats.encode(result, mimetype), mimetype, etag)
+            
+            # Igual para cada codificación
+            encoding = negotiate(request.accept_encodings)
+            etag = self._menu_etag(version, *tags, *([encoding] if encoding else []))
+            not_modified = self._not_modified(etag)
+            if not_modified is not None:
+                not_modified.headers['Vary'] = 'Accept, Accept-Encoding'
+                return not_modified
+            
+            # Cuerpo ya codificado para esta versión: sin pasar por la caché ni MySQL
+            cached = self.menu_snapshot.cached(version, encoding, form=mimetype)
+            if cached is not None:
+                return self._menu_response(cached[0], mimetype, etag, cached[1])
+            
             result = self.menu_model.get_all()
-            return jsonify(result), result.get('code', 500)
+            if result.get('code') != 200:
+                return self._with_etag(result, etag)
+            return self._snapshot_response(result, version, etag, mimetype, encoding)
         except Exception as e:
             return jsonify({
                 "code": 500,
                 "message": f"Error interno del servidor: {str(e)}"
             }), 500
     
+    def _parse_since(self, value):
+        """
+        Valida el parámetro de versión de los endpoints de cambios
+        
+        Returns:
+            (is_valid, version_o_mensaje); la versión puede ser None
+        """
+        if value is None or value == '':
+            return True, None
+        try:
+            since = int(value)
+            if since < 0:
+                raise ValueError
+            return True, since
+        except (ValueError, TypeError):
+            return False, "El parámetro 'since' debe ser un entero positivo"
+    
+    def get_changes(self):
+        """
+        Obtiene los cambios del menú posteriores a una versión
+        GET /menu/changes?since=<version>[&wait=<segundos>]
+        
+        Con `wait` la petición funciona como long-poll: espera hasta que
+        la versión avance o se agote el tiempo indicado
+        """
+        try:
+            is_valid, since = self._parse_since(request.args.get('since'))
+            if not is_valid:
+                return jsonify({
+                    "code": 400,
+                    "message": since
+                }), 400
+            
+            wait = request.args.get('wait')
+            if wait is not None:
+                try:
+                    wait = min(max(float(wait), 0), self.MAX_POLL_WAIT)
+                except ValueError:
+                    return jsonify({
+                        "code": 400,
+                        "message": "El parámetro 'wait' debe ser un número de segundos"
+                    }), 400
+                if since is not None and wait > 0:
+                    self.change_log.wait_for_change(since, wait)
+            
+            changes = self.change_log.changes_since(since)
+            return jsonify({
+                "code": 200,
+                "data": changes,
+                "message": "OK"
+            }), 200
+        except Exception as e:
+            return jsonify({
+                "code": 500,
+                "message": f"Error interno del servidor: {str(e)}"
+            }), 500
+    
+    def stream_changes(self):
+        """
+        Envía los cambios del menú como Server-Sent Events
+        GET /menu/stream?since=<version>[&heartbeat=<segundos>]
+        
+        Cada evento `changes` tiene el mismo formato que /menu/changes.
+        El id del evento es la versión, por lo que al reconectar el
+        navegador envía Last-Event-ID y no se pierden cambios.
+        """
+        is_valid, since = self._parse_since(
+            request.args.get('since') or request.headers.get('Last-Event-ID')
+        )
+        if not is_valid:
+            return jsonify({
+                "code": 400,
+                "message": since
+            }), 400
+        
+        try:
+            heartbeat = float(request.args.get('heartbeat', self.STREAM_HEARTBEAT))
+            heartbeat = min(max(heartbeat, 1), self.MAX_STREAM_HEARTBEAT)
+        except ValueError:
+            return jsonify({
+                "code": 400,
+                "message": "El parámetro 'heartbeat' debe ser un número de segundos"
+            }), 400
+        
+        # Con utils.prefork la conexión deja el cupo de hilos para peticiones
+        # y pasa al de streams (que tiene su propio máximo por worker)
+        detach = request.environ.get(DETACH_KEY)
+        if detach is not None and not detach():
+            return jsonify({
+                "code": 503,
+                "message": "Demasiadas conexiones abiertas al canal de cambios, intente más tarde"
+            }), 503
+        
+        change_log = self.change_log
+        
+        def generate(since):
+            # Indicar al cliente cuánto esperar antes de reconectar
+            yield "retry: 3000\n\n"
+            if since is None:
+                since = change_log.version
+            while True:
+                if not change_log.wait_for_change(since, heartbeat):
+                    # Comentario SSE: mantiene viva la conexión y detecta clientes caídos
+                    yield ": keep-alive\n\n"
+                    continue
+                changes = change_log.changes_since(since)
+                since = changes["version"]
+                payload = current_app.json.dumps(changes)
+                yield f"id: {since}\nevent: changes\ndata: {payload}\n\n"
+        
+        return Response(
+            stream_with_context(generate(since)),
+            mimetype="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"
+            }
+        )
+    
     def get_dish_by_id(self, dish_id):
         """
         Obtiene un plato específico por ID
@@ -106,14 +425,95 @@ class MenuController:
                     "message": validated_id
                 }), 400
             
+            etag = self._menu_etag(self.change_log.version, validated_id)
+            not_modified = self._not_modified(etag)
+            if not_modified is not None:
+                return not_modified
+            
             result = self.menu_model.get_by_id(validated_id)
-            return jsonify(result), result.get('code', 500)
+            return self._with_etag(result, etag)
         except Exception as e:
             return jsonify({
                 "code": 500,
                 "message": f"Error interno del servidor: {str(e)}"
             }), 500
     
+    # ==================== IMÁGENES EN SEGUNDO PLANO ====================
+    
+    def _delete_image(self, imagen_url):
+        """Elimina una imagen del almacenamiento (se ejecuta dentro de un trabajo)"""
+        if not self.image_storage.owns(imagen_url):
+            return {"success": True, "message": "La imagen no pertenece al almacenamiento"}
+        if self.image_storage.content_addressed:
+            # Otro plato puede estar usando (o empezando a usar) el mismo archivo
+            return self.menu_model.delete_image_if_unused(
+                self.image_storage.storage_key(imagen_url),
+                lambda: self.image_storage.delete(imagen_url)
+            )
+        return self.image_storage.delete(imagen_url)
+    
+    def _delete_image_later(self, imagen_url, dish_id=None):
+        """Encola la eliminación de una imagen que ya no se usa"""
+        if imagen_url and self.image_storage.owns(imagen_url):
+            self.image_jobs.submit("delete", self._delete_image, imagen_url, dish_id=dish_id)
+    
+    def _upload_image(self, dish_id, job_id, content, base_url):
+        """
+        Sube la imagen de un plato y la asigna cuando termina
+        (se ejecuta dentro de un trabajo)
+        """
+        start = time.perf_counter()
+        upload_result = self.image_storage.save(content, base_url)
+        UPLOAD_SECONDS.labels(
+            type(self.image_storage).__name__,
+            "ok" if upload_result.get('success') else "error"
+        ).observe(time.perf_counter() - start)
+        if not upload_result.get('success'):
+            self.menu_model.finish_image(dish_id, job_id, None)
+            return upload_result
+        
+        imagen_url = upload_result['url']
+        result = self.menu_model.finish_image(dish_id, job_id, imagen_url)
+        if result.get('code') != 200:
+            # El plato se eliminó o recibió otra imagen durante la subida
+            self._delete_image(imagen_url)
+            return {"success": False, "error": result.get('message')}
+        if self.image_storage.content_addressed:
+            # Una eliminación del mismo contenido pudo borrar el archivo entre
+            # save() y finish_image(); ahora que el plato lo usa, nadie más lo
+            # borra: save() lo vuelve a escribir si falta
+            self.image_storage.save(content, base_url)
+        if result.get('old_url') and result['old_url'] != imagen_url:
+            self._delete_image(result['old_url'])
+        return {"success": True, "url": imagen_url}
+    
+    def _read_image_file(self):
+        """
+        Lee el archivo 'imagen' del request
+        
+        Returns:
+            (is_valid, bytes_o_None_o_mensaje): None si no se envió archivo
+        """
+        file = request.files.get('imagen')
+        if not file or not file.filename:
+            return True, None
+        
+        # Validar tipo de archivo
+        allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+        file_ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
+        if file_ext not in allowed_extensions:
+            return False, f"Formato de imagen no permitido. Use: {', '.join(allowed_extensions)}"
+        
+        # El contenido se lee ahora: el archivo del request no sobrevive a la respuesta
+        return True, file.read()
+    
+    def _image_job_info(self, job_id):
+        return {
+            "id": job_id,
+            "status": ImageJobQueue.PENDING,
+            "url": f"/images/jobs/{job_id}"
+        }
+    
     def create_dish(self):
         """
         Crea un nuevo plato en el menú
@@ -153,13 +553,7 @@ class MenuController:
                     "message": "El nombre del plato no puede estar vacío"
                 }), 400
             
-            # Verificar que no exista un plato con el mismo nombre
-            existing_dish = self.menu_model.get_by_name(nombre)
-            if existing_dish.get('code') == 200 and existing_dish.get('data'):
-                return jsonify({
-                    "code": 409,
-                    "message": f"Ya existe un plato con el nombre '{nombre}' en el menú"
-                }), 409
+            # Los nombres repetidos los rechaza el índice único al insertar (409)
             
             # Validar precio
             is_valid, precio = self._validate_price(data['precio'])
@@ -171,31 +565,18 @@ class MenuController:
             
             # Manejar imagen
             imagen_url = None
+            job_id = None
+            
+            is_valid_file, content = self._read_image_file()
+            if not is_valid_file:
+                return jsonify({
+                    "code": 400,
+                    "message": content
+                }), 400
             
-            # Si hay un archivo en el request
-            if 'imagen' in request.files:
-                file = request.files['imagen']
-                if file.filename:
-                    # Validar tipo de archivo
-                    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-                    file_ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
-                    
-                    if file_ext not in allowed_extensions:
-                        return jsonify({
-                            "code": 400,
-                            "message": f"Formato de imagen no permitido. Use: {', '.join(allowed_extensions)}"
-                        }), 400
-                    
-                    # Subir a Cloudinary
-                    upload_result = CloudinaryConfig.upload_image(file)
-                    
-                    if not upload_result.get('success'):
-                        return jsonify({
-                            "code": 500,
-                            "message": upload_result.get('error', 'Error al subir imagen')
-                        }), 500
-                    
-                    imagen_url = upload_result['url']
+            # Si hay un archivo: el plato se crea ya y la imagen se sube en segundo plano
+            if content is not None:
+                job_id = self.image_jobs.new_id()
             
             # Si no hay archivo pero sí URL
             elif data.get('imagen_url'):
@@ -216,10 +597,20 @@ class MenuController:
             dish_data = {
                 "nombre": nombre,
                 "precio": precio,
-                "imagen_url": imagen_url
+                "imagen_url": imagen_url,
+                "imagen_job": job_id
             }
             
             result = self.menu_model.create_dish(dish_data)
+            
+            # Encolar la subida solo si el plato se creó (p. ej. no si el nombre está repetido)
+            if job_id and result.get('code') == 201:
+                self.image_jobs.submit(
+                    "upload", self._upload_image, result['id'], job_id, content, request.host_url,
+                    dish_id=result['id'], job_id=job_id
+                )
+                result['image_job'] = self._image_job_info(job_id)
+            
             return jsonify(result), result.get('code', 500)
             
         except Exception as e:
@@ -285,42 +676,28 @@ class MenuController:
             # Obtener plato actual para manejar imagen antigua
             current_dish = self.menu_model.get_by_id(validated_id)
             old_imagen_url = None
+            image_pending = False
             if current_dish.get('code') == 200 and current_dish.get('data'):
                 old_imagen_url = current_dish['data'].get('imagen_url')
+                image_pending = current_dish['data'].get('imagen_estado') == self.menu_model.IMAGE_PENDING
             
             # Manejar nueva imagen
             imagen_url = None
+            image_fields = {}
+            replaced_url = None
             
-            # Si hay un archivo nuevo en el request
-            if 'imagen' in request.files:
-                file = request.files['imagen']
-                if file.filename:
-                    # Validar tipo de archivo
-                    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-                    file_ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
-                    
-                    if file_ext not in allowed_extensions:
-                        return jsonify({
-                            "code": 400,
-                            "message": f"Formato de imagen no permitido. Use: {', '.join(allowed_extensions)}"
-                        }), 400
-                    
-                    # Subir nueva imagen a Cloudinary
-                    upload_result = CloudinaryConfig.upload_image(file)
-                    
-                    if not upload_result.get('success'):
-                        return jsonify({
-                            "code": 500,
-                            "message": upload_result.get('error', 'Error al subir imagen')
-                        }), 500
-                    
-                    imagen_url = upload_result['url']
-                    
-                    # Eliminar imagen antigua de Cloudinary si existe
-                    if old_imagen_url and 'cloudinary.com' in old_imagen_url:
-                        old_public_id = CloudinaryConfig.extract_public_id(old_imagen_url)
-                        if old_public_id:
-                            CloudinaryConfig.delete_image(old_public_id)
+            is_valid_file, content = self._read_image_file()
+            if not is_valid_file:
+                return jsonify({
+                    "code": 400,
+                    "message": content
+                }), 400
+            
+            # Si hay un archivo nuevo: se conserva la imagen actual hasta que
+            # termine la subida, y entonces la antigua se elimina en segundo plano
+            if content is not None:
+                imagen_url = old_imagen_url
+                image_fields["imagen_job"] = self.image_jobs.new_id()
             
             # Si no hay archivo pero sí URL nueva
             elif data.get('imagen_url'):
@@ -331,9 +708,13 @@ class MenuController:
                         "message": validated_url
                     }), 400
                 imagen_url = validated_url
+                if imagen_url != old_imagen_url:
+                    # Reemplaza a la imagen anterior y a cualquier subida en curso
+                    image_fields["imagen_job"] = None
+                    replaced_url = old_imagen_url
             
-            # Si no se proporciona nueva imagen, mantener la antigua
-            elif old_imagen_url:
+            # Si no se proporciona nueva imagen, mantener la antigua (o la que se está subiendo)
+            elif old_imagen_url or image_pending:
                 imagen_url = old_imagen_url
             else:
                 return jsonify({
@@ -345,10 +726,22 @@ class MenuController:
             dish_data = {
                 "nombre": nombre,
                 "precio": precio,
-                "imagen_url": imagen_url
+                "imagen_url": imagen_url,
+                **image_fields
             }
             
             result = self.menu_model.update_dish(validated_id, dish_data)
+            
+            if result.get('code') == 200:
+                job_id = image_fields.get("imagen_job")
+                if job_id:
+                    self.image_jobs.submit(
+                        "upload", self._upload_image, validated_id, job_id, content, request.host_url,
+                        dish_id=validated_id, job_id=job_id
+                    )
+                    result['image_job'] = self._image_job_info(job_id)
+                self._delete_image_later(replaced_url, validated_id)
+            
             return jsonify(result), result.get('code', 500)
             
         except Exception as e:
@@ -377,17 +770,177 @@ class MenuController:
             # Eliminar del modelo
             result = self.menu_model.delete_dish(validated_id)
             
-            # Si se eliminó exitosamente, eliminar imagen de Cloudinary
+            # Si se eliminó exitosamente, eliminar la imagen en segundo plano
             if result.get('code') == 200:
                 if current_dish.get('code') == 200 and current_dish.get('data'):
-                    imagen_url = current_dish['data'].get('imagen_url')
-                    if imagen_url and 'cloudinary.com' in imagen_url:
-                        public_id = CloudinaryConfig.extract_public_id(imagen_url)
-                        if public_id:
-                            CloudinaryConfig.delete_image(public_id)
+                    self._delete_image_later(current_dish['data'].get('imagen_url'), validated_id)
+            
+            return jsonify(result), result.get('code', 500)
+            
+        except Exception as e:
+            return jsonify({
+                "code": 500,
+                "message": f"Error interno del servidor: {str(e)}"
+            }), 500
+    
+    # ==================== OPERACIONES POR LOTE ====================
+    
+    def _bulk_body(self, key):
+        """
+        Lee el cuerpo JSON de /menu/bulk: una lista o un objeto {key: [...]}
+        
+        Returns:
+            (is_valid, lista_o_mensaje)
+        """
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get(key)
+        if not isinstance(data, list):
+            return False, f"El cuerpo debe ser una lista JSON o un objeto con '{key}'"
+        if not data:
+            return False, "El lote está vacío"
+        if len(data) > self.MAX_BULK_ITEMS:
+            return False, f"El lote excede el máximo de {self.MAX_BULK_ITEMS} elementos"
+        return True, data
+    
+    def _validate_bulk_item(self, item, partial=False):
+        """
+        Valida un elemento de un lote de creación o actualización
+        
+        Args:
+            item: Dict recibido
+            partial: Si es True los campos son opcionales (PATCH) pero se requiere id
+        
+        Returns:
+            (is_valid, dict_validado_o_mensaje)
+        """
+        if not isinstance(item, dict):
+            return False, "Cada elemento debe ser un objeto JSON"
+        
+        clean = {}
+        if partial:
+            is_valid, validated_id = self._validate_id(item.get('id'))
+            if not is_valid:
+                return False, validated_id
+            clean['id'] = validated_id
+            if not any(field in item for field in ('nombre', 'precio', 'imagen_url')):
+                return False, "Debe indicar al menos nombre, precio o imagen_url"
+        
+        if 'nombre' in item or not partial:
+            nombre = self._sanitize_string(item.get('nombre') or '', max_length=100)
+            if not nombre:
+                return False, "El nombre del plato es requerido"
+            clean['nombre'] = nombre
+        
+        if 'precio' in item or not partial:
+            if item.get('precio') in (None, ''):
+                return False, "El precio es requerido"
+            is_valid, precio = self._validate_price(item['precio'])
+            if not is_valid:
+                return False, precio
+            clean['precio'] = precio
+        
+        if 'imagen_url' in item or not partial:
+            is_valid, imagen_url = self._validate_url(item.get('imagen_url'))
+            if not is_valid:
+                return False, imagen_url
+            clean['imagen_url'] = imagen_url
+        
+        return True, clean
+    
+    def _run_bulk(self, raw_items, validate, operation):
+        """
+        Valida todos los elementos antes de tocar la base de datos y ejecuta
+        solo los válidos; el resultado conserva la posición original de cada uno
+        """
+        results = [None] * len(raw_items)
+        valid = []
+        positions = []
+        for index, raw in enumerate(raw_items):
+            is_valid, value = validate(raw)
+            if is_valid:
+                valid.append(value)
+                positions.append(index)
+            else:
+                results[index] = {"index": index, "code": 400, "message": value}
+        
+        result = operation(valid) if valid else {"code": 200, "results": [], "failed": 0}
+        if result.get('code') != 200:
+            return result
+        
+        for item_result in result['results']:
+            item_result['index'] = positions[item_result['index']]
+            results[item_result['index']] = item_result
+        result['results'] = results
+        result['failed'] = sum(1 for item_result in results if item_result['code'] >= 400)
+        done = len(results) - result['failed']
+        result['message'] = f"Lote procesado: {done} correctos, {result['failed']} con errores"
+        return result
+    
+    def bulk_create(self):
+        """
+        Crea varios platos en una sola transacción
+        POST /menu/bulk
+        Body: [{"nombre": "string", "precio": number, "imagen_url": "string"}, ...]
+        """
+        try:
+            is_valid, items = self._bulk_body('items')
+            if not is_valid:
+                return jsonify({"code": 400, "message": items}), 400
             
+            result = self._run_bulk(items, self._validate_bulk_item, self.menu_model.bulk_create)
+            result.setdefault('created', 0)
             return jsonify(result), result.get('code', 500)
+        except Exception as e:
+            return jsonify({
+                "code": 500,
+                "message": f"Error interno del servidor: {str(e)}"
+            }), 500
+    
+    def bulk_update(self):
+        """
+        Actualiza varios platos en una sola transacción
+        PATCH /menu/bulk
+        Body: [{"id": number, "nombre": "string", "precio": number, "imagen_url": "string"}, ...]
+        (solo el id es obligatorio; los campos omitidos no cambian)
+        """
+        try:
+            is_valid, items = self._bulk_body('items')
+            if not is_valid:
+                return jsonify({"code": 400, "message": items}), 400
             
+            result = self._run_bulk(
+                items,
+                lambda item: self._validate_bulk_item(item, partial=True),
+                self.menu_model.bulk_update
+            )
+            result.setdefault('updated', 0)
+            return jsonify(result), result.get('code', 500)
+        except Exception as e:
+            return jsonify({
+                "code": 500,
+                "message": f"Error interno del servidor: {str(e)}"
+            }), 500
+    
+    def bulk_delete(self):
+        """
+        Elimina varios platos en una sola transacción
+        DELETE /menu/bulk
+        Body: [1, 2, 3] o {"ids": [1, 2, 3]}
+        """
+        try:
+            is_valid, ids = self._bulk_body('ids')
+            if not is_valid:
+                return jsonify({"code": 400, "message": ids}), 400
+            
+            result = self._run_bulk(ids, self._validate_id, self.menu_model.bulk_delete)
+            result.setdefault('deleted', 0)
+            
+            # Eliminar en segundo plano las imágenes de los platos borrados
+            for imagen_url in result.pop('imagen_urls', []):
+                self._delete_image_later(imagen_url)
+            
+            return jsonify(result), result.get('code', 500)
         except Exception as e:
             return jsonify({
                 "code": 500,
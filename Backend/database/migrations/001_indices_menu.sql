@@ -0,0 +1,19 @@
+-- Índices de la tabla menu
+-- nombre único (reemplaza la consulta previa al insertar) e índices
+-- para los filtros de precio y fecha de GET /menu
+
+-- Renombrar duplicados existentes para que el índice único pueda crearse:
+-- se conserva el más antiguo y a los demás se les agrega su id
+UPDATE menu m
+JOIN (
+    SELECT nombre, MIN(id) AS keep_id
+    FROM menu
+    GROUP BY nombre
+    HAVING COUNT(*) > 1
+) d ON m.nombre = d.nombre AND m.id <> d.keep_id
+SET m.nombre = CONCAT(LEFT(m.nombre, 85), ' (', m.id, ')');
+
+ALTER TABLE menu
+    ADD UNIQUE INDEX uq_menu_nombre (nombre),
+    ADD INDEX idx_menu_precio (precio),
+    ADD INDEX idx_menu_fecha_creacion (fecha_creacion);
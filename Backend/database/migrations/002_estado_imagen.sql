@@ -0,0 +1,7 @@
+-- Estado de la imagen de cada plato
+-- Las imágenes se suben en segundo plano: mientras tanto el plato queda
+-- con imagen_estado = 'pendiente' e imagen_job con el ID del trabajo
+
+ALTER TABLE menu
+    ADD COLUMN imagen_estado VARCHAR(20) NOT NULL DEFAULT 'lista',
+    ADD COLUMN imagen_job CHAR(32) NULL;
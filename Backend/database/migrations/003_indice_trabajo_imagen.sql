@@ -0,0 +1,6 @@
+-- Índice del trabajo de imagen
+-- GET /images/jobs/<id> busca el plato por imagen_job cuando el trabajo
+-- corre en otro proceso del servidor (o ya no está en memoria)
+
+ALTER TABLE menu
+    ADD INDEX idx_menu_imagen_job (imagen_job);
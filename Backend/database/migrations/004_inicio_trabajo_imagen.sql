@@ -0,0 +1,8 @@
+-- Inicio de la subida de imagen en curso
+-- Las subidas viven en la memoria del worker que las encoló: si ese
+-- proceso cae, el plato quedaría 'pendiente' para siempre. Con la hora
+-- de inicio se detectan las que superaron IMAGE_JOB_TIMEOUT
+
+ALTER TABLE menu
+    ADD COLUMN imagen_job_desde DATETIME NULL,
+    ADD INDEX idx_menu_imagen_estado (imagen_estado, imagen_job_desde);
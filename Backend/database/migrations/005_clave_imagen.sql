@@ -0,0 +1,14 @@
+-- Clave de la imagen dentro del almacenamiento
+-- Antes de borrar una imagen compartida (almacenamiento local por
+-- contenido) se comprueba que ningún plato la use: con la clave en su
+-- propia columna indexada la consulta no recorre toda la tabla y puede
+-- bloquear la clave mientras se borra el archivo
+
+ALTER TABLE menu
+    ADD COLUMN imagen_clave VARCHAR(255) NULL,
+    ADD INDEX idx_menu_imagen_clave (imagen_clave);
+
+-- Imágenes locales existentes: la clave es el hash al final de la URL
+UPDATE menu
+SET imagen_clave = SUBSTRING_INDEX(imagen_url, '/', -1)
+WHERE imagen_url REGEXP '/images/[0-9a-f]{64}$';
@@ -7,5 +7,7 @@ CREATE TABLE IF NOT EXISTS menu (
     precio DECIMAL(10, 2) NOT NULL,
     fecha_creacion DATE DEFAULT CURRENT_DATE NOT NULL,
     imagen_url VARCHAR(255) NULL
-); 
+);
 
+-- Índices y demás cambios de esquema: database/migrations (se aplican al iniciar
+-- el servidor o con `python -m utils.migrations`)
@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import OrderedDict
+
+from model.menuModel import MenuModel
+
+
+class MenuCache:
+    """
+    Caché en memoria de lectura para MenuModel
+
+    Guarda una copia completa del menú con índices por id y por nombre,
+    más un LRU de hasta max_size consultas sueltas para cuando no hay
+    copia completa. Una entrada es válida mientras no venza su TTL y la
+    versión del registro de cambios sea la misma con la que se leyó,
+    así cualquier escritura la invalida al instante.
+    """
+
+    def __init__(self, model, change_log=None, ttl=30, max_size=5000):
+        self.model = model
+        self.change_log = change_log
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        # Solo un hilo recarga el menú completo a la vez
+        self._fill_lock = threading.Lock()
+        # (version, vence, filas, por_id, por_nombre)
+        self._snapshot = None
+        # clave -> (version, vence, resultado)
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        # Cualquier otro método del modelo se usa sin caché
+        return getattr(self.model, name)
+
+    def _current_version(self):
+        return self.change_log.version if self.change_log is not None else None
+
+    def _valid_snapshot(self):
+        snapshot = self._snapshot
+        if snapshot and snapshot[0] == self._current_version() and snapshot[1] > time.monotonic():
+            return snapshot
+        return None
+
+    def _count(self, hit):
+        # Contadores aproximados: no justifican un lock en cada lectura
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def invalidate(self):
+        """Descarta todo el contenido de la caché"""
+        with self._lock:
+            self._snapshot = None
+            self._entries.clear()
+
+    def stats(self):
+        """Contadores de aciertos y tamaño actual"""
+        total = self.hits + self.misses
+        snapshot = self._snapshot
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "snapshot_rows": len(snapshot[2]) if snapshot else 0,
+            "entries": len(self._entries)
+        }
+
+    # ==================== LECTURAS ====================
+
+    def get_all(self):
+        snapshot = self._valid_snapshot()
+        if snapshot:
+            self._count(True)
+            return {"code": 200, "data": snapshot[2], "message": "OK"}
+
+        with self._fill_lock:
+            # Otro hilo pudo haber recargado mientras esperábamos
+            snapshot = self._valid_snapshot()
+            if snapshot:
+                self._count(True)
+                return {"code": 200, "data": snapshot[2], "message": "OK"}
+
+            self._count(False)
+            # Leer la versión antes de consultar para no etiquetar datos viejos como nuevos
+            version = self._current_version()
+            result = self.model.get_all()
+            rows = result.get('data')
+            # La copia se guarda sea cual sea su tamaño: sin ella cada lectura
+            # del menú completo esperaría su turno para consultar MySQL
+            if result.get('code') == 200:
+                by_id = {row['id']: row for row in rows}
+                by_name = {MenuModel._name_key(row['nombre']): row for row in rows}
+                with self._lock:
+                    self._snapshot = (version, time.monotonic() + self.ttl, rows, by_id, by_name)
+            return result
+
+    def _lookup(self, key, index, value, load):
+        """
+        Resuelve una consulta puntual desde la copia completa o el LRU
+
+        Args:
+            key: Clave del LRU; key[1] es lo que se busca en el índice
+            index: Posición del índice en la copia completa (3 = id, 4 = nombre)
+            value: Valor buscado, tal como lo recibe load
+            load: Función que consulta la base de datos
+        """
+        snapshot = self._valid_snapshot()
+        if snapshot:
+            self._count(True)
+            row = snapshot[index].get(key[1])
+            if row is None:
+                return {"code": 404, "message": "Elemento no encontrado"}
+            return {"code": 200, "data": row, "message": "OK"}
+
+        version = self._current_version()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version and entry[1] > now:
+                self._entries.move_to_end(key)
+                self._count(True)
+                return entry[2]
+
+        self._count(False)
+        result = load(value)
+        # Los errores 500 no se guardan
+        if result.get('code') in (200, 404):
+            with self._lock:
+                self._entries[key] = (version, now + self.ttl, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return result
+
+    def get_by_id(self, id):
+        return self._lookup(("id", id), 3, id, self.model.get_by_id)
+
+    def get_by_name(self, nombre):
+        # Misma comparación que la columna: "pizza" y "Pizza " son el mismo plato
+        return self._lookup(("nombre", MenuModel._name_key(nombre)), 4, nombre, self.model.get_by_name)
+
+    # ==================== ESCRITURAS ====================
+
+    def create_dish(self, data):
+        try:
+            return self.model.create_dish(data)
+        finally:
+            self.invalidate()
+
+    def update_dish(self, id, data):
+        try:
+            return self.model.update_dish(id, data)
+        finally:
+            self.invalidate()
+
+    def finish_image(self, id, job_id, imagen_url):
+        try:
+            return self.model.finish_image(id, job_id, imagen_url)
+        finally:
+            self.invalidate()
+    
+    def delete_dish(self, id):
+        try:
+            return self.model.delete_dish(id)
+        finally:
+            self.invalidate()
+    
+    def bulk_create(self, items):
+        try:
+            return self.model.bulk_create(items)
+        finally:
+            self.invalidate()
+    
+    def bulk_update(self, items):
+        try:
+            return self.model.bulk_update(items)
+        finally:
+            self.invalidate()
+    
+    def bulk_delete(self, ids):
+        try:
+            return self.model.bulk_delete(ids)
+        finally:
+            self.invalidate()
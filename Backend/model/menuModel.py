@@ -1,10 +1,99 @@
+from contextlib import contextmanager
+
 import mysql.connector
+from mysql.connector import errorcode
+
+from utils.change_log import ChangeLog
+from utils.metrics import REGISTRY, timed
+
+
+# Duración de cada método (conexión del pool + consultas a MySQL), sin la caché
+DB_SECONDS = REGISTRY.histogram(
+    "menu_db_seconds", "Duración de los métodos de MenuModel que consultan MySQL", ("method",)
+)
 
 
 class MenuModel:
-    def __init__(self, conn):
-        self.conn = conn
+    # Columnas que se pueden pedir con ?fields= (orden de la tabla)
+    FIELDS = ("id", "nombre", "precio", "fecha_creacion", "imagen_url", "imagen_estado")
+    
+    # Estados de la imagen (columna imagen_estado)
+    IMAGE_READY = "lista"
+    IMAGE_PENDING = "pendiente"
+    IMAGE_ERROR = "error"
+    
+    def __init__(self, pool, change_log=None, image_variants=None, image_key=None):
+        self.pool = pool
+        self.change_log = change_log
+        # imagen_url -> {tamaño: url} (ImageStorage.variant_urls)
+        self.image_variants = image_variants
+        # imagen_url -> clave en el almacenamiento o None (ImageStorage.storage_key),
+        # guardada en la columna imagen_clave
+        self.image_key = image_key
+        
+    @contextmanager
+    def _cursor(self, dictionary=False):
+        """
+        Toma una conexión del pool solo durante la operación y entrega
+        (conexión, cursor). Revierte la transacción si ocurre un error.
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(dictionary=dictionary, buffered=True)
+            try:
+                yield conn, cursor
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def _is_duplicate(db_err):
+        """True si el error es una violación del índice único de nombre"""
+        return getattr(db_err, "errno", None) == errorcode.ER_DUP_ENTRY
+    
+    @staticmethod
+    def _duplicate_response(nombre):
+        return {
+            "code": 409,
+            "message": f"Ya existe un plato con el nombre '{nombre}' en el menú"
+        }
+    
+    def _with_variants(self, rows):
+        """
+        Agrega imagen_variantes (URLs de thumb, preview y print) a filas
+        que incluyen imagen_url. Acepta una fila, una lista o None.
+        """
+        if self.image_variants is None or not rows:
+            return rows
+        for row in rows if isinstance(rows, list) else [rows]:
+            if "imagen_url" in row:
+                row["imagen_variantes"] = self.image_variants(row["imagen_url"])
+        return rows
+    
+    def _key(self, imagen_url):
+        """Valor de imagen_clave para una URL"""
+        if self.image_key is None or not imagen_url:
+            return None
+        return self.image_key(imagen_url)
+    
+    def _record_change(self, op, dish_id, row=None):
+        """
+        Anota una escritura confirmada en el registro de cambios
         
+        Returns:
+            Versión del menú que incluye la escritura (None sin registro)
+        """
+        if self.change_log is not None:
+            return self.change_log.record(op, dish_id, self._with_variants(row))
+        self._with_variants(row)
+        return None
+    
+    def _record_changes(self, changes):
+        """Anota las escrituras de un lote confirmado con un solo aviso"""
+        if self.change_log is not None and changes:
+            self._with_variants([row for _, _, row in changes if row])
+            self.change_log.record_many(changes)
     
     def _validate_data(self, data, required_fields):
         missing_fields = [fields for fields in required_fields \
@@ -28,13 +117,13 @@ class MenuModel:
      
         
     
+    @timed(DB_SECONDS)
     def get_all(self):
-        cursor = None
         try:
-            cursor = self.conn.connection.cursor(dictionary=True)
-            query = "SELECT * FROM menu"
-            cursor.execute(query)
-            data = cursor.fetchall()
+            with self._cursor(dictionary=True) as (conn, cursor):
+                query = "SELECT * FROM menu"
+                cursor.execute(query)
+                data = self._with_variants(cursor.fetchall())
             return {
                 "code": 200,
                 "data": data,
@@ -46,18 +135,107 @@ class MenuModel:
                 "code": 500,
                 "message": f"Error al obtener los datos del menú: {e}"
                 }
-        finally:
-            if cursor:
-                cursor.close()
             
+    @timed(DB_SECONDS)
+    def get_page(self, limit, after_id=None, before_id=None, fields=None,
+                 min_precio=None, max_precio=None, nombre=None,
+                 fecha_desde=None, fecha_hasta=None, with_total=False):
+        """
+        Obtiene una página del menú ordenada por id (paginación por cursor)
+        
+        Args:
+            limit: Cantidad máxima de filas
+            after_id: Devolver solo ids mayores a este (cursor de la página anterior)
+            before_id: Devolver las filas inmediatamente anteriores a este id
+            fields: Columnas a devolver (el id siempre se incluye)
+            min_precio / max_precio: Rango de precio
+            nombre: Prefijo del nombre
+            fecha_desde / fecha_hasta: Rango de fecha_creacion (inclusive)
+            with_total: Incluir el total de filas y la posición (offset) de la página
+        """
+        try:
+            columns = [field for field in self.FIELDS if not fields or field in fields or field == "id"]
+            conditions = []
+            params = []
+            if min_precio is not None:
+                conditions.append("precio >= %s")
+                params.append(min_precio)
+            if max_precio is not None:
+                conditions.append("precio <= %s")
+                params.append(max_precio)
+            if nombre:
+                # Prefijo con LIKE 'abc%' (usa el índice); escapar comodines del usuario
+                escaped = nombre.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                conditions.append("nombre LIKE %s")
+                params.append(escaped + "%")
+            if fecha_desde is not None:
+                conditions.append("fecha_creacion >= %s")
+                params.append(fecha_desde)
+            if fecha_hasta is not None:
+                conditions.append("fecha_creacion <= %s")
+                params.append(fecha_hasta)
+            filters = list(conditions)
+            filter_params = list(params)
+            
+            if after_id is not None:
+                conditions.append("id > %s")
+                params.append(after_id)
+            if before_id is not None:
+                conditions.append("id < %s")
+                params.append(before_id)
+            
+            query = f"SELECT {', '.join(columns)} FROM menu"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            # Hacia atrás se recorre en orden descendente y luego se invierte.
+            # Se pide una fila extra para saber si hay más páginas
+            query += " ORDER BY id DESC LIMIT %s" if before_id is not None else " ORDER BY id LIMIT %s"
+            params.append(limit + 1)
+            
+            with self._cursor(dictionary=True) as (conn, cursor):
+                cursor.execute(query, tuple(params))
+                data = cursor.fetchall()
+                
+                has_more = len(data) > limit
+                data = self._with_variants(data[:limit])
+                if before_id is not None:
+                    data.reverse()
+                
+                result = {
+                    "code": 200,
+                    "data": data,
+                    "next_cursor": data[-1]["id"] if has_more and before_id is None else None,
+                    "prev_cursor": data[0]["id"] if has_more and before_id is not None else None,
+                    "message": "OK"
+                }
+                
+                if with_total:
+                    # Total filtrado y cantidad de filas antes de esta página, en un solo recorrido
+                    first_id = data[0]["id"] if data else 0
+                    count_query = "SELECT COUNT(*) AS total, COALESCE(SUM(id < %s), 0) AS rows_before FROM menu"
+                    if filters:
+                        count_query += " WHERE " + " AND ".join(filters)
+                    cursor.execute(count_query, tuple([first_id] + filter_params))
+                    counts = cursor.fetchone()
+                    result["total"] = int(counts["total"])
+                    result["offset"] = int(counts["rows_before"]) if data else result["total"]
+            
+            return result
+        except Exception as e:
+            print(f"Error al obtener la página del menú: {e}")
+            return {
+                "code": 500,
+                "message": f"Error al obtener los datos del menú: {e}"
+            }
+            
+    @timed(DB_SECONDS)
     def get_by_id(self, id):
-        cursor = None
         try:
             self._validate_data({"id": id}, ["id"])
-            cursor = self.conn.connection.cursor(dictionary=True)
-            query = "SELECT * FROM menu WHERE id = %s"
-            cursor.execute(query, (id,))
-            data = cursor.fetchone()
+            with self._cursor(dictionary=True) as (conn, cursor):
+                query = "SELECT * FROM menu WHERE id = %s"
+                cursor.execute(query, (id,))
+                data = self._with_variants(cursor.fetchone())
             if data is not None:
                 return {
                     "code": 200,
@@ -75,17 +253,14 @@ class MenuModel:
                 "message": f"Error al obtener el elemento: {e}"
             
             }
-        finally:
-            if cursor:
-                cursor.close()
             
+    @timed(DB_SECONDS)
     def get_by_name(self, nombre):
-        cursor = None
         try:
-            cursor = self.conn.connection.cursor(dictionary=True)
-            query = "SELECT * FROM menu WHERE nombre = %s"
-            cursor.execute(query, (nombre,))
-            data = cursor.fetchone()
+            with self._cursor(dictionary=True) as (conn, cursor):
+                query = "SELECT * FROM menu WHERE nombre = %s"
+                cursor.execute(query, (nombre,))
+                data = self._with_variants(cursor.fetchone())
             if data is not None:
                 return {
                     "code": 200,
@@ -103,134 +278,603 @@ class MenuModel:
                 "message": f"Error al buscar el elemento: {e}"
             
             }
-        finally:
-            if cursor:
-                cursor.close()
     
+    @timed(DB_SECONDS)
     def create_dish(self, data):
-        cursor = None
         try:
-            self._validate_data(data, ["nombre", "precio", "imagen_url"])
-            cursor = self.conn.connection.cursor()
-            query = "INSERT INTO menu (nombre, precio, imagen_url) \
-                    VALUES (%s, %s, %s)"
-            nombre = data.get("nombre")
-            precio = data.get("precio")
-            imagen_url = data.get("imagen_url")
-            cursor.execute(query, (nombre, precio, imagen_url))
-            self.conn.connection.commit()
+            # La imagen puede llegar después (imagen_job con la subida en curso)
+            self._validate_data(data, ["nombre", "precio"])
+            with self._cursor(dictionary=True) as (conn, cursor):
+                query = "INSERT INTO menu (nombre, precio, imagen_url, imagen_clave, imagen_estado, imagen_job, imagen_job_desde) \
+                        VALUES (%s, %s, %s, %s, %s, %s, NOW())"
+                nombre = data.get("nombre")
+                precio = data.get("precio")
+                imagen_url = data.get("imagen_url")
+                imagen_job = data.get("imagen_job")
+                imagen_estado = self.IMAGE_PENDING if imagen_job else self.IMAGE_READY
+                cursor.execute(query, (nombre, precio, imagen_url, self._key(imagen_url), imagen_estado, imagen_job))
+                conn.commit()
+                dish_id = cursor.lastrowid
+                # Leer la fila completa (incluye fecha_creacion asignada por MySQL)
+                cursor.execute("SELECT * FROM menu WHERE id = %s", (dish_id,))
+                row = cursor.fetchone()
+            version = self._record_change(ChangeLog.INSERT, dish_id, row)
             return {
                 "code": 201,
+                "id": dish_id,
+                "data": row,
+                "version": version,
                 "message": "Plato creado exitosamente"
             }
         except ValueError as ve:
             return {"code": 400, "message": str(ve)}
         except mysql.connector.Error as db_err:
-            self.conn.connection.rollback()
+            # El índice único uq_menu_nombre rechaza nombres repetidos
+            if self._is_duplicate(db_err):
+                return self._duplicate_response(data.get("nombre"))
             return {
                 "code": 500,
                 "message": f"Error de base de datos al crear el plato: {db_err}"
             }
         except Exception as e:
-            self.conn.connection.rollback()
             return {
                 "code": 500,
                 "message": f"Error interno inesperado: {e}"
             }
-        finally:
-            if cursor:
-                cursor.close()
             
     
+    @timed(DB_SECONDS)
     def update_dish(self, id, data):
-        cursor = None
         try:
-            # Verificar si existe primero para distinguir entre "no encontrado" y "sin cambios"
-            check_cursor = self.conn.connection.cursor()
-            check_cursor.execute("SELECT id FROM menu WHERE id = %s", (id,))
-            if not check_cursor.fetchone():
-                check_cursor.close()
-                return {
-                    "code": 404,
-                    "message": "Elemento no encontrado"
-                }
-            check_cursor.close()
+            with self._cursor(dictionary=True) as (conn, cursor):
+                # Verificar si existe primero para distinguir entre "no encontrado" y "sin cambios"
+                cursor.execute("SELECT id FROM menu WHERE id = %s", (id,))
+                if not cursor.fetchone():
+                    return {
+                        "code": 404,
+                        "message": "Elemento no encontrado"
+                    }
 
-            self._validate_data({"id": id}, ["id"])
-            self._validate_data(data, ["nombre", "precio", "imagen_url"])
-            cursor = self.conn.connection.cursor()
-            query = "UPDATE  menu \
-                    SET nombre = %s, precio = %s, imagen_url = %s \
-                    WHERE id = %s"
-            nombre = data.get("nombre")
-            precio = data.get("precio")
-            imagen_url = data.get("imagen_url")
-            cursor.execute(query, (nombre, precio, imagen_url, id))
-            self.conn.connection.commit()
+                self._validate_data({"id": id}, ["id"])
+                self._validate_data(data, ["nombre", "precio"])
+                query = "UPDATE  menu \
+                        SET nombre = %s, precio = %s, imagen_url = %s, imagen_clave = %s"
+                nombre = data.get("nombre")
+                precio = data.get("precio")
+                imagen_url = data.get("imagen_url")
+                params = [nombre, precio, imagen_url, self._key(imagen_url)]
+                # El estado de la imagen solo cambia si se indica: una edición que
+                # conserva la imagen no debe cancelar una subida en curso
+                if "imagen_job" in data:
+                    query += ", imagen_estado = %s, imagen_job = %s, imagen_job_desde = NOW()"
+                    imagen_job = data.get("imagen_job")
+                    params += [self.IMAGE_PENDING if imagen_job else self.IMAGE_READY, imagen_job]
+                query += " WHERE id = %s"
+                cursor.execute(query, tuple(params + [id]))
+                conn.commit()
+                cursor.execute("SELECT * FROM menu WHERE id = %s", (id,))
+                row = cursor.fetchone()
+            version = self._record_change(ChangeLog.UPDATE, id, row)
             
             # Si llegamos aquí, el registro existe. 
             # rowcount=0 solo significa que no hubo cambios en los datos.
             return {
                 "code": 200,
+                "data": row,
+                "version": version,
                 "message": "Plato actualizado exitosamente"
             }
         except ValueError as ve:
             return {"code": 400, "message": str(ve)}
         except mysql.connector.Error as db_err:
-            self.conn.connection.rollback()
+            if self._is_duplicate(db_err):
+                return self._duplicate_response(data.get("nombre"))
             return {
                 "code": 500,
                 "message": f"Error de base de datos al actualizar el plato: {db_err}"
             }
         except Exception as e:
-            self.conn.connection.rollback()
             return {
                 "code": 500,
                 "message": f"Error interno inesperado:: {e}"
             }
-        finally:
-            if cursor:
-                cursor.close()
                 
     
+    @timed(DB_SECONDS)
     def delete_dish(self, id):
-        cursor = None
         try:
             self._validate_data({"id": id}, ["id"])
-            cursor = self.conn.connection.cursor()
-            query = "DELETE FROM menu WHERE id = %s"
-            cursor.execute(query, (id,))
-            self.conn.connection.commit()
-            if cursor.rowcount == 0:
+            with self._cursor() as (conn, cursor):
+                query = "DELETE FROM menu WHERE id = %s"
+                cursor.execute(query, (id,))
+                conn.commit()
+                deleted = cursor.rowcount
+            if deleted == 0:
                 return {
                     "code": 404,
                     "message": "Elemento no encontrado"
                 }
+            version = self._record_change(ChangeLog.DELETE, id)
             return {
                 "code": 200,
+                "id": id,
+                "version": version,
                 "message": "Plato eliminado exitosamente"
                 }
         
         except ValueError as ve:
             return {"code": 400, "message": str(ve)}
         except mysql.connector.Error as db_err:
-            self.conn.connection.rollback()
             return {
                 "code": 500,
                 "message": f"Error de base de datos al eliminar el plato: {db_err}"
             }
         except Exception as e:
-            self.conn.connection.rollback()
             return {
                 "code": 500,
                 "message": f"Error interno inesperado: {e}"
             }
-        finally:
-            if cursor:
-                cursor.close() 
-            
 
+    @timed(DB_SECONDS)
+    def delete_image_if_unused(self, key, delete):
+        """
+        Elimina una imagen compartida (almacenamiento local por contenido)
+        solo si ningún plato la usa
+        
+        La consulta con FOR UPDATE bloquea la clave en el índice de
+        imagen_clave hasta terminar (bloqueo de rango de InnoDB con
+        REPEATABLE READ): un plato que empiece a usar la misma imagen
+        espera a que el archivo se haya borrado, y el que ya la usa impide
+        borrarlo.
+        
+        Args:
+            key: Clave de la imagen (imagen_clave)
+            delete: Función sin argumentos que borra el archivo
+        
+        Returns:
+            dict con success (el resultado de delete si se borró)
+        """
+        with self._cursor() as (conn, cursor):
+            conn.start_transaction()
+            cursor.execute("SELECT id FROM menu WHERE imagen_clave = %s LIMIT 1 FOR UPDATE", (key,))
+            if cursor.fetchone() is not None:
+                conn.rollback()
+                return {"success": True, "message": "La imagen sigue en uso"}
+            result = delete()
+            conn.commit()
+            return result
+    
+    @timed(DB_SECONDS)
+    def get_image_job(self, job_id):
+        """
+        Plato cuya imagen subió (o está subiendo) el trabajo indicado
+
+        El registro de trabajos vive en la memoria de cada worker; la tabla
+        permite responder desde cualquiera de ellos.
+
+        Returns:
+            dict con code y data (id, imagen_url, imagen_estado)
+        """
+        try:
+            with self._cursor(dictionary=True) as (conn, cursor):
+                cursor.execute(
+                    "SELECT id, imagen_url, imagen_estado FROM menu WHERE imagen_job = %s",
+                    (job_id,)
+                )
+                row = cursor.fetchone()
+            if row is None:
+                return {
+                    "code": 404,
+                    "message": "Trabajo no encontrado"
+                }
+            return {
+                "code": 200,
+                "data": row,
+                "message": "OK"
+            }
+        except Exception as e:
+            return {
+                "code": 500,
+                "message": f"Error al consultar el trabajo de imagen: {e}"
+            }
+    
+    @timed(DB_SECONDS)
+    def fail_stale_images(self, max_age, active_jobs=()):
+        """
+        Marca con error las subidas que ya no van a terminar
+
+        Un plato queda 'pendiente' para siempre si el worker que encoló su
+        subida cae o se reinicia. Se consideran perdidas las que llevan más
+        de max_age segundos sin terminar y no están en active_jobs (trabajos
+        en curso de este proceso).
+
+        Returns:
+            dict con code e ids de los platos marcados
+        """
+        try:
+            with self._cursor(dictionary=True) as (conn, cursor):
+                conn.start_transaction()
+                cursor.execute(
+                    "SELECT id, imagen_job FROM menu WHERE imagen_estado = %s "
+                    "AND (imagen_job_desde IS NULL OR imagen_job_desde < NOW() - INTERVAL %s SECOND) "
+                    "FOR UPDATE",
+                    (self.IMAGE_PENDING, int(max_age))
+                )
+                ids = [row["id"] for row in cursor.fetchall() if row["imagen_job"] not in active_jobs]
+                rows = []
+                if ids:
+                    cursor.execute(
+                        f"UPDATE menu SET imagen_estado = %s WHERE id IN ({self._placeholders(ids)})",
+                        (self.IMAGE_ERROR, *ids)
+                    )
+                    cursor.execute(f"SELECT * FROM menu WHERE id IN ({self._placeholders(ids)})", tuple(ids))
+                    rows = cursor.fetchall()
+                conn.commit()
+            self._record_changes([(ChangeLog.UPDATE, row["id"], row) for row in rows])
+            return {
+                "code": 200,
+                "ids": ids,
+                "message": "OK"
+            }
+        except Exception as e:
+            return {
+                "code": 500,
+                "message": f"Error al revisar las subidas pendientes: {e}"
+            }
+    
+    @timed(DB_SECONDS)
+    def finish_image(self, id, job_id, imagen_url):
+        """
+        Registra el resultado de una subida de imagen en segundo plano
+        
+        Solo se aplica si el plato sigue esperando ese mismo trabajo; si fue
+        eliminado o recibió otra imagen mientras tanto retorna 409. imagen_job
+        se conserva para que get_image_job informe el resultado.
+        
+        Args:
+            id: ID del plato
+            job_id: Trabajo que subió la imagen
+            imagen_url: URL subida, o None si la subida falló
+        
+        Returns:
+            dict con code y old_url (imagen reemplazada)
+        """
+        try:
+            with self._cursor(dictionary=True) as (conn, cursor):
+                conn.start_transaction()
+                cursor.execute(
+                    "SELECT imagen_url FROM menu WHERE id = %s AND imagen_job = %s "
+                    "AND imagen_estado = %s FOR UPDATE",
+                    (id, job_id, self.IMAGE_PENDING)
+                )
+                current = cursor.fetchone()
+                if current is None:
+                    conn.rollback()
+                    return {
+                        "code": 409,
+                        "message": "El plato ya no espera esta imagen"
+                    }
+                if imagen_url:
+                    cursor.execute(
+                        "UPDATE menu SET imagen_url = %s, imagen_clave = %s, imagen_estado = %s WHERE id = %s",
+                        (imagen_url, self._key(imagen_url), self.IMAGE_READY, id)
+                    )
+                else:
+                    cursor.execute(
+                        "UPDATE menu SET imagen_estado = %s WHERE id = %s",
+                        (self.IMAGE_ERROR, id)
+                    )
+                cursor.execute("SELECT * FROM menu WHERE id = %s", (id,))
+                row = cursor.fetchone()
+                conn.commit()
+            self._record_change(ChangeLog.UPDATE, id, row)
+            return {
+                "code": 200,
+                "old_url": current["imagen_url"] if imagen_url else None,
+                "message": "Imagen actualizada"
+            }
+        except Exception as e:
+            return {
+                "code": 500,
+                "message": f"Error al registrar la imagen del plato: {e}"
+            }
+    
+    # ==================== OPERACIONES POR LOTE ====================
+    
+    @staticmethod
+    def _placeholders(values):
+        return ", ".join(["%s"] * len(values))
+    
+    @staticmethod
+    def _name_key(nombre):
+        # La columna nombre compara sin distinguir mayúsculas ni espacios finales
+        return nombre.rstrip().casefold()
+    
+    @staticmethod
+    def _bulk_summary(results, done, code_ok):
+        failed = sum(1 for result in results if result["code"] != code_ok)
+        return {
+            "code": 200,
+            "message": f"Lote procesado: {done} correctos, {failed} con errores",
+            "results": results,
+            "failed": failed
+        }
+    
+    @timed(DB_SECONDS)
+    def bulk_create(self, items):
+        """
+        Crea varios platos en una sola transacción
+        
+        Los nombres repetidos (dentro del lote o ya existentes) se detectan
+        con una única consulta IN y se informan como 409; el resto se
+        inserta con executemany.
+        
+        Args:
+            items: Lista de dicts con nombre, precio e imagen_url
+        
+        Returns:
+            dict con results (uno por elemento, en el mismo orden), created y failed
+        """
+        results = [None] * len(items)
+        pending = []
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                self._validate_data(item, ["nombre", "precio", "imagen_url"])
+            except ValueError as ve:
+                results[index] = {"index": index, "code": 400, "message": str(ve)}
+                continue
+            key = self._name_key(item["nombre"])
+            if key in seen:
+                results[index] = {"index": index, "code": 409,
+                                  "message": f"Nombre repetido en el lote: '{item['nombre']}'"}
+                continue
+            seen.add(key)
+            pending.append(index)
+        
+        try:
+            rows = []
+            if pending:
+                with self._cursor(dictionary=True) as (conn, cursor):
+                    conn.start_transaction()
+                    names = [items[index]["nombre"] for index in pending]
+                    cursor.execute(
+                        f"SELECT nombre FROM menu WHERE nombre IN ({self._placeholders(names)})",
+                        tuple(names)
+                    )
+                    existing = {self._name_key(row["nombre"]) for row in cursor.fetchall()}
+                    
+                    to_insert = []
+                    for index in pending:
+                        nombre = items[index]["nombre"]
+                        if self._name_key(nombre) in existing:
+                            results[index] = {"index": index, "code": 409,
+                                              "message": f"Ya existe un plato con el nombre '{nombre}' en el menú"}
+                        else:
+                            to_insert.append(index)
+                    
+                    if to_insert:
+                        cursor.executemany(
+                            "INSERT INTO menu (nombre, precio, imagen_url, imagen_clave) VALUES (%s, %s, %s, %s)",
+                            [
+                                (items[i]["nombre"], items[i]["precio"], items[i]["imagen_url"],
+                                 self._key(items[i]["imagen_url"]))
+                                for i in to_insert
+                            ]
+                        )
+                        # Los ids de un INSERT múltiple no se garantizan consecutivos: leerlos por nombre
+                        names = [items[index]["nombre"] for index in to_insert]
+                        cursor.execute(
+                            f"SELECT * FROM menu WHERE nombre IN ({self._placeholders(names)})",
+                            tuple(names)
+                        )
+                        rows = cursor.fetchall()
+                    conn.commit()
+                
+                by_name = {self._name_key(row["nombre"]): row for row in rows}
+                for index in to_insert:
+                    row = by_name.get(self._name_key(items[index]["nombre"]), {})
+                    results[index] = {"index": index, "code": 201, "id": row.get("id"),
+                                      "message": "Plato creado exitosamente"}
+                self._record_changes([(ChangeLog.INSERT, row["id"], row) for row in rows])
             
+            summary = self._bulk_summary(results, len(rows), 201)
+            summary["created"] = len(rows)
+            return summary
+        except mysql.connector.Error as db_err:
+            if self._is_duplicate(db_err):
+                # Otra escritura tomó uno de los nombres entre la consulta y el INSERT
+                return {
+                    "code": 409,
+                    "message": f"Conflicto de nombres con otra escritura simultánea (no se aplicó ningún cambio): {db_err}"
+                }
+            return {
+                "code": 500,
+                "message": f"Error de base de datos al crear los platos (no se aplicó ningún cambio): {db_err}"
+            }
+        except Exception as e:
+            return {
+                "code": 500,
+                "message": f"Error interno inesperado: {e}"
+            }
+    
+    @timed(DB_SECONDS)
+    def bulk_update(self, items):
+        """
+        Actualiza varios platos en una sola transacción
+        
+        Cada elemento lleva el id y los campos a cambiar; los que se omiten
+        conservan su valor actual. Los platos inexistentes se informan como
+        404 y los nombres en conflicto como 409.
+        
+        Args:
+            items: Lista de dicts con id y al menos uno de nombre, precio o imagen_url
+        
+        Returns:
+            dict con results (uno por elemento, en el mismo orden), updated y failed
+        """
+        results = [None] * len(items)
+        pending = []
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                self._validate_data(item, ["id"])
+            except ValueError as ve:
+                results[index] = {"index": index, "code": 400, "message": str(ve)}
+                continue
+            if item["id"] in seen:
+                results[index] = {"index": index, "code": 409,
+                                  "message": f"ID repetido en el lote: {item['id']}"}
+                continue
+            seen.add(item["id"])
+            pending.append(index)
+        
+        try:
+            rows = []
+            if pending:
+                with self._cursor(dictionary=True) as (conn, cursor):
+                    conn.start_transaction()
+                    ids = [items[index]["id"] for index in pending]
+                    cursor.execute(
+                        f"SELECT * FROM menu WHERE id IN ({self._placeholders(ids)}) FOR UPDATE",
+                        tuple(ids)
+                    )
+                    current = {row["id"]: row for row in cursor.fetchall()}
+                    
+                    # Nombres nuevos: una sola consulta para ver a quién pertenecen
+                    renamed = [
+                        items[index]["nombre"] for index in pending
+                        if items[index]["id"] in current and "nombre" in items[index]
+                    ]
+                    owners = {}
+                    if renamed:
+                        cursor.execute(
+                            f"SELECT id, nombre FROM menu WHERE nombre IN ({self._placeholders(renamed)})",
+                            tuple(renamed)
+                        )
+                        owners = {self._name_key(row["nombre"]): row["id"] for row in cursor.fetchall()}
+                    
+                    to_update = []
+                    claimed = {}
+                    for index in pending:
+                        item = items[index]
+                        row = current.get(item["id"])
+                        if row is None:
+                            results[index] = {"index": index, "code": 404, "id": item["id"],
+                                              "message": "Elemento no encontrado"}
+                            continue
+                        merged = {field: item.get(field, row[field]) for field in ("nombre", "precio", "imagen_url")}
+                        key = self._name_key(merged["nombre"])
+                        owner = claimed.get(key, owners.get(key, item["id"]))
+                        if owner != item["id"]:
+                            results[index] = {"index": index, "code": 409, "id": item["id"],
+                                              "message": f"Ya existe un plato con el nombre '{merged['nombre']}' en el menú"}
+                            continue
+                        claimed[key] = item["id"]
+                        to_update.append((index, merged))
+                    
+                    if to_update:
+                        cursor.executemany(
+                            "UPDATE menu SET nombre = %s, precio = %s, imagen_url = %s, imagen_clave = %s WHERE id = %s",
+                            [
+                                (m["nombre"], m["precio"], m["imagen_url"], self._key(m["imagen_url"]), items[i]["id"])
+                                for i, m in to_update
+                            ]
+                        )
+                        ids = [items[index]["id"] for index, _ in to_update]
+                        cursor.execute(
+                            f"SELECT * FROM menu WHERE id IN ({self._placeholders(ids)})",
+                            tuple(ids)
+                        )
+                        rows = cursor.fetchall()
+                    conn.commit()
+                
+                for index, _ in to_update:
+                    results[index] = {"index": index, "code": 200, "id": items[index]["id"],
+                                      "message": "Plato actualizado exitosamente"}
+                self._record_changes([(ChangeLog.UPDATE, row["id"], row) for row in rows])
             
+            summary = self._bulk_summary(results, len(rows), 200)
+            summary["updated"] = len(rows)
+            return summary
+        except mysql.connector.Error as db_err:
+            if self._is_duplicate(db_err):
+                return {
+                    "code": 409,
+                    "message": f"Conflicto de nombres con otra escritura simultánea (no se aplicó ningún cambio): {db_err}"
+                }
+            return {
+                "code": 500,
+                "message": f"Error de base de datos al actualizar los platos (no se aplicó ningún cambio): {db_err}"
+            }
+        except Exception as e:
+            return {
+                "code": 500,
+                "message": f"Error interno inesperado: {e}"
+            }
+    
+    @timed(DB_SECONDS)
+    def bulk_delete(self, ids):
+        """
+        Elimina varios platos con una sola sentencia DELETE ... IN
+        
+        Args:
+            ids: Lista de IDs
+        
+        Returns:
+            dict con results (uno por ID, en el mismo orden), deleted, failed
+            e imagen_urls (imágenes de los platos eliminados)
+        """
+        results = [None] * len(ids)
+        pending = []
+        seen = set()
+        for index, dish_id in enumerate(ids):
+            if dish_id in seen:
+                results[index] = {"index": index, "code": 409, "id": dish_id,
+                                  "message": f"ID repetido en el lote: {dish_id}"}
+                continue
+            seen.add(dish_id)
+            pending.append(index)
+        
+        try:
+            found = {}
+            if pending:
+                with self._cursor(dictionary=True) as (conn, cursor):
+                    conn.start_transaction()
+                    unique_ids = [ids[index] for index in pending]
+                    cursor.execute(
+                        f"SELECT id, imagen_url FROM menu WHERE id IN ({self._placeholders(unique_ids)}) FOR UPDATE",
+                        tuple(unique_ids)
+                    )
+                    found = {row["id"]: row["imagen_url"] for row in cursor.fetchall()}
+                    if found:
+                        cursor.execute(
+                            f"DELETE FROM menu WHERE id IN ({self._placeholders(found)})",
+                            tuple(found)
+                        )
+                    conn.commit()
                 
-                
\ No newline at end of file
+                for index in pending:
+                    dish_id = ids[index]
+                    if dish_id in found:
+                        results[index] = {"index": index, "code": 200, "id": dish_id,
+                                          "message": "Plato eliminado exitosamente"}
+                    else:
+                        results[index] = {"index": index, "code": 404, "id": dish_id,
+                                          "message": "Elemento no encontrado"}
+                self._record_changes([(ChangeLog.DELETE, dish_id, None) for dish_id in found])
+            
+            summary = self._bulk_summary(results, len(found), 200)
+            summary["deleted"] = len(found)
+            summary["imagen_urls"] = [url for url in found.values() if url]
+            return summary
+        except mysql.connector.Error as db_err:
+            return {
+                "code": 500,
+                "message": f"Error de base de datos al eliminar los platos (no se aplicó ningún cambio): {db_err}"
+            }
+        except Exception as e:
+            return {
+                "code": 500,
+                "message": f"Error interno inesperado: {e}"
+            }
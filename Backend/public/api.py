@@ -1,8 +1,11 @@
 from flask import Flask
 from flask_cors import CORS
+from werkzeug.serving import WSGIRequestHandler
 from dotenv import load_dotenv
 import os
 import sys
+import threading
+import time
 
 # Agregar el directorio raíz del Backend al path de Python
 # Esto permite importar módulos desde cualquier subdirectorio
@@ -10,24 +13,35 @@ backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, backend_root)
 
 # Importar dependencias
-from utils.conexion import DatabaseConnection
+from utils.conexion import ConnectionPool
+from utils.change_log import ChangeLog
+from utils.migrations import MigrationRunner
+from utils.image_jobs import ImageJobQueue
+from utils.image_storage import LocalImageStorage
+from utils.cloudinary_config import CloudinaryConfig
+from utils.json_codec import CodecJSONProvider
+from utils import metrics
 from model.menuModel import MenuModel
+from model.menuCache import MenuCache
 from controller.menuController import MenuController
+from controller.imageController import ImageController
 
 # Cargar variables de entorno
 load_dotenv()
 
 # Inicializar Flask app
 app = Flask(__name__)
+# jsonify y request.get_json con utils.json_codec (orjson si está instalado)
+app.json = CodecJSONProvider(app)
 
 # Configuración de CORS para permitir acceso desde cualquier origen
 # Esto es importante para que el frontend en otra computadora pueda conectarse
 CORS(app, resources={
     r"/*": {
         "origins": "*",  # Permitir todos los orígenes (puedes restringirlo a IPs específicas)
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Type"],
+        "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+        "expose_headers": ["Content-Type", "ETag"],
         "supports_credentials": True,
         "max_age": 3600
     }
@@ -37,6 +51,10 @@ CORS(app, resources={
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # Límite de 16MB para archivos
 app.config['JSON_AS_ASCII'] = False  # Soporte para caracteres UTF-8
 
+# HTTP/1.1 en el servidor de desarrollo: conexiones keep-alive y respuestas
+# por chunks, necesarias para que /menu/stream entregue cada evento al instante
+WSGIRequestHandler.protocol_version = "HTTP/1.1"
+
 # Configuración de la base de datos desde variables de entorno
 DB_CONFIG = {
     "host": os.getenv('DB_HOST', 'localhost'),
@@ -46,17 +64,126 @@ DB_CONFIG = {
     "database": os.getenv('DB_NAME', 'restaurante')
 }
 
-# Inicializar conexión a la base de datos (Singleton)
+# Configuración del pool de conexiones
+POOL_CONFIG = {
+    "min_size": int(os.getenv('DB_POOL_MIN', 2)),
+    "max_size": int(os.getenv('DB_POOL_MAX', 10)),
+    "idle_timeout": int(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+    "acquire_timeout": int(os.getenv('DB_POOL_TIMEOUT', 10))
+}
+
+# Inicializar pool de conexiones a la base de datos
 try:
-    db_connection = DatabaseConnection(**DB_CONFIG)
+    db_pool = ConnectionPool(**DB_CONFIG, **POOL_CONFIG)
     print("✓ Conexión a base de datos establecida")
 except Exception as e:
     print(f"✗ Error al conectar con la base de datos: {e}")
-    db_connection = None
+    db_pool = None
+
+# Aplicar migraciones pendientes del esquema (índices y restricciones)
+if db_pool and os.getenv('DB_AUTO_MIGRATE', 'true').lower() == 'true':
+    try:
+        applied = MigrationRunner(db_pool).run()
+        if applied:
+            print(f"✓ Migraciones aplicadas: {', '.join(applied)}")
+    except Exception as e:
+        print(f"✗ Error al aplicar migraciones: {e}")
+
+# Registro de cambios del menú (versión + historial acotado)
+menu_change_log = ChangeLog(max_entries=int(os.getenv('MENU_CHANGELOG_SIZE', 1000)))
+
+# Almacenamiento de imágenes: Cloudinary o disco local (servido por GET /images/<hash>)
+if os.getenv('IMAGE_STORAGE', 'cloudinary').lower() == 'local':
+    image_storage = LocalImageStorage(
+        os.path.join(backend_root, os.getenv('IMAGE_STORAGE_DIR', 'images')),
+        base_url=os.getenv('IMAGE_BASE_URL') or None
+    )
+else:
+    image_storage = CloudinaryConfig()
+
+# Inyección de dependencias (el modelo se envuelve con la caché de lectura;
+# cada fila incluye las URLs de los tamaños derivados de su imagen)
+menu_model = MenuCache(
+    MenuModel(
+        db_pool, menu_change_log,
+        image_variants=image_storage.variant_urls,
+        image_key=image_storage.storage_key
+    ),
+    menu_change_log,
+    ttl=int(os.getenv('MENU_CACHE_TTL', 30)),
+    max_size=int(os.getenv('MENU_CACHE_MAX_SIZE', 5000))
+) if db_pool else None
+
+# Subidas y eliminaciones de imágenes en segundo plano
+image_jobs = ImageJobQueue(max_workers=int(os.getenv('IMAGE_JOB_WORKERS', 4)))
+# Segundos tras los que una subida sin terminar se da por perdida
+IMAGE_JOB_TIMEOUT = int(os.getenv('IMAGE_JOB_TIMEOUT', 600))
+menu_controller = MenuController(menu_model, menu_change_log, image_jobs, image_storage) if menu_model else None
+# Las imágenes no dependen de la base de datos; los trabajos de otros
+# workers se consultan en la tabla menu si está disponible
+image_controller = ImageController(image_storage, image_jobs, menu_model)
+
+
+def _recover_image_jobs():
+    """
+    Marca con error las subidas perdidas al caer o reiniciarse un worker:
+    al iniciar y luego cada IMAGE_JOB_TIMEOUT segundos
+    """
+    while True:
+        result = menu_model.fail_stale_images(IMAGE_JOB_TIMEOUT, image_jobs.active_ids())
+        if result.get('code') != 200:
+            print(f"⚠️  {result.get('message')}")
+        elif result['ids']:
+            print(f"⚠️  Subidas de imagen perdidas marcadas con error: platos {result['ids']}")
+        time.sleep(IMAGE_JOB_TIMEOUT)
+
+
+if menu_model:
+    threading.Thread(target=_recover_image_jobs, name="image-job-recovery", daemon=True).start()
+
+
+# ==================== MÉTRICAS ====================
 
-# Inyección de dependencias
-menu_model = MenuModel(db_connection) if db_connection else None
-menu_controller = MenuController(menu_model) if menu_model else None
+# Duración y estado de cada petición por ruta (GET /metrics)
+metrics.instrument(app)
+
+
+def _cache_requests():
+    counts = {}
+    if menu_model:
+        counts[("menu", "hit")] = menu_model.hits
+        counts[("menu", "miss")] = menu_model.misses
+    if menu_controller:
+        counts[("snapshot", "hit")] = menu_controller.menu_snapshot.hits
+        counts[("snapshot", "miss")] = menu_controller.menu_snapshot.misses
+    return counts
+
+
+def _pool_connections():
+    if not db_pool:
+        return {}
+    stats = db_pool.stats()
+    return {(state,): stats[state] for state in ("idle", "in_use", "max_size")}
+
+
+metrics.REGISTRY.counter_callback(
+    "cache_requests_total",
+    "Lecturas servidas por la caché del menú y por el cuerpo ya codificado (hit) o generadas de nuevo (miss)",
+    ("cache", "result"), _cache_requests
+)
+metrics.REGISTRY.gauge_callback(
+    "db_pool_connections", "Conexiones del pool por estado (max_size: límite configurado)",
+    ("state",), _pool_connections
+)
+metrics.REGISTRY.gauge_callback(
+    "image_jobs", "Trabajos de imágenes en memoria por estado",
+    ("status",), lambda: {(status,): count for status, count in image_jobs.stats().items()}
+)
+
+# Con varios workers (run.py) cada uno publica sus valores para que
+# cualquiera responda /metrics con el total del servidor
+if os.getenv('API_METRICS_DIR'):
+    metrics.REGISTRY.share(os.environ['API_METRICS_DIR'])
 
 
 # ==================== ENDPOINTS DE LA API ====================
@@ -67,15 +194,27 @@ def health_check():
     Endpoint para verificar el estado del servidor
     GET /health
     """
-    db_status = "connected" if db_connection and db_connection.connection and db_connection.connection.is_connected() else "disconnected"
+    db_status = "connected" if db_pool and db_pool.ping() else "disconnected"
     
     return {
         "status": "online",
         "database": db_status,
+        "pool": db_pool.stats() if db_pool else None,
+        "cache": menu_model.stats() if menu_model else None,
+        "image_jobs": image_jobs.stats(),
         "message": "API de Restaurante funcionando correctamente"
     }, 200
 
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Métricas en formato de texto de Prometheus
+    GET /metrics
+    """
+    return metrics.metrics_response()
+
+
 @app.route('/menu', methods=['GET'])
 def get_all_dishes():
     """
@@ -88,6 +227,30 @@ def get_all_dishes():
     return menu_controller.get_all_dishes()
 
 
+@app.route('/menu/changes', methods=['GET'])
+def get_menu_changes():
+    """
+    Obtiene solo los cambios posteriores a una versión del menú
+    GET /menu/changes?since=<version>[&wait=<segundos>]
+    """
+    if not menu_controller:
+        return {"code": 503, "message": "Servicio no disponible. Error de conexión a la base de datos"}, 503
+    
+    return menu_controller.get_changes()
+
+
+@app.route('/menu/stream', methods=['GET'])
+def stream_menu_changes():
+    """
+    Canal de eventos (SSE) con los cambios del menú en vivo
+    GET /menu/stream?since=<version>
+    """
+    if not menu_controller:
+        return {"code": 503, "message": "Servicio no disponible. Error de conexión a la base de datos"}, 503
+    
+    return menu_controller.stream_changes()
+
+
 @app.route('/menu/<int:dish_id>', methods=['GET'])
 def get_dish_by_id(dish_id):
     """
@@ -166,6 +329,78 @@ def delete_dish(dish_id):
     return menu_controller.delete_dish(dish_id)
 
 
+@app.route('/menu/bulk', methods=['POST'])
+def bulk_create_dishes():
+    """
+    Crea varios platos en una sola transacción
+    POST /menu/bulk
+    
+    Content-Type: application/json
+    Body: [{"nombre": "string", "precio": number, "imagen_url": "string"}, ...]
+    """
+    if not menu_controller:
+        return {"code": 503, "message": "Servicio no disponible. Error de conexión a la base de datos"}, 503
+    
+    return menu_controller.bulk_create()
+
+
+@app.route('/menu/bulk', methods=['PATCH'])
+def bulk_update_dishes():
+    """
+    Actualiza varios platos en una sola transacción
+    PATCH /menu/bulk
+    
+    Content-Type: application/json
+    Body: [{"id": number, "precio": number}, ...]
+    """
+    if not menu_controller:
+        return {"code": 503, "message": "Servicio no disponible. Error de conexión a la base de datos"}, 503
+    
+    return menu_controller.bulk_update()
+
+
+@app.route('/menu/bulk', methods=['DELETE'])
+def bulk_delete_dishes():
+    """
+    Elimina varios platos en una sola transacción
+    DELETE /menu/bulk
+    
+    Content-Type: application/json
+    Body: [1, 2, 3]
+    """
+    if not menu_controller:
+        return {"code": 503, "message": "Servicio no disponible. Error de conexión a la base de datos"}, 503
+    
+    return menu_controller.bulk_delete()
+
+
+@app.route('/images/jobs/<job_id>', methods=['GET'])
+def get_image_job(job_id):
+    """
+    Estado de una subida o eliminación de imagen en segundo plano
+    GET /images/jobs/<job_id>
+    """
+    return image_controller.get_image_job(job_id)
+
+
+@app.route('/images/<image_hash>', methods=['GET'])
+def get_image(image_hash):
+    """
+    Imagen del almacenamiento local, identificada por el SHA-256 de su contenido
+    GET /images/<hash>
+    """
+    return image_controller.get_image(image_hash)
+
+
+@app.route('/images/<image_hash>/<size>', methods=['GET'])
+def get_image_variant(image_hash, size):
+    """
+    Versión reducida de una imagen local (thumb, preview o print)
+    GET /images/<hash>/<tamaño>
+    """
+    return image_controller.get_image(image_hash, size)
+
+
 # ==================== MANEJO DE ERRORES ====================
 
 @app.errorhandler(404)
@@ -217,6 +452,7 @@ def handle_exception(error):
 # ==================== INICIALIZACIÓN DEL SERVIDOR ====================
 
 if __name__ == '__main__':
+    # Servidor de desarrollo: en producción usar run.py (varios procesos)
     # Obtener configuración del servidor desde variables de entorno
     host = os.getenv('API_HOST', '0.0.0.0')  # 0.0.0.0 permite conexiones desde cualquier IP
     port = int(os.getenv('API_PORT', 5000))
@@ -1,31 +1,88 @@
 """
 Script de inicialización del servidor
 Ejecutar este archivo desde el directorio Backend
+
+En Linux/macOS inicia el servidor de producción con varios procesos
+(utils.prefork); con API_DEBUG=True, API_SERVER=dev o en Windows usa el
+servidor de desarrollo de Flask
 """
 
+import os
+import shutil
+import tempfile
+
+
+def load_app(relay):
+    """Se ejecuta en cada worker después del fork: pool, caché e hilos propios"""
+    from public import api
+    relay.attach(api.menu_change_log)
+    return api.app
+
+
+def close_worker():
+    """Termina los trabajos de imágenes y cierra el pool del worker"""
+    from public import api
+    from utils.metrics import REGISTRY
+    api.image_jobs.shutdown(wait=True)
+    if api.db_pool:
+        api.db_pool.close()
+    REGISTRY.remove()
+
+
 if __name__ == '__main__':
-    # Importar y ejecutar la aplicación
-    from public.api import app
-    
-    import os
-    
+    from dotenv import load_dotenv
+    load_dotenv()
+
     # Obtener configuración del servidor desde variables de entorno
     host = os.getenv('API_HOST', '0.0.0.0')
     port = int(os.getenv('API_PORT', 5000))
     debug = os.getenv('API_DEBUG', 'False').lower() == 'true'
-    
+    prefork = (
+        os.getenv('API_SERVER', 'prefork').lower() == 'prefork'
+        and hasattr(os, 'fork') and not debug
+    )
+    # API_WORKERS fija la cantidad; si no, API_WORKERS_PER_CORE por cada núcleo
+    workers = int(os.getenv('API_WORKERS', 0)) or (
+        (os.cpu_count() or 1) * int(os.getenv('API_WORKERS_PER_CORE', 1))
+    )
+
     print("\n" + "="*50)
     print("🚀 Iniciando API de Restaurante")
     print("="*50)
     print(f"📍 Host: {host}")
     print(f"🔌 Puerto: {port}")
     print(f"🐛 Debug: {debug}")
+    print(f"⚙️  Servidor: {f'prefork ({workers} workers)' if prefork else 'desarrollo'}")
     print("="*50 + "\n")
-    
-    # Iniciar servidor
-    app.run(
-        host=host,
-        port=port,
-        debug=debug,
-        threaded=True
-    )
+
+    if prefork:
+        # La aplicación no se importa aquí: cada worker la carga después del fork
+        from utils.prefork import PreforkServer
+        # Directorio donde cada worker deja sus métricas para sumarlas en /metrics
+        os.environ['API_METRICS_DIR'] = tempfile.mkdtemp(prefix='restaurante-metrics-')
+        try:
+            PreforkServer(
+                load_app,
+                host,
+                port,
+                workers,
+                threads=int(os.getenv('API_THREADS', 32)),
+                streams=int(os.getenv('API_STREAMS', 256)),
+                backlog=int(os.getenv('API_BACKLOG', 2048)),
+                keepalive=int(os.getenv('API_KEEPALIVE', 5)),
+                graceful_timeout=int(os.getenv('API_GRACEFUL_TIMEOUT', 30)),
+                on_worker_exit=close_worker
+            ).run()
+        finally:
+            shutil.rmtree(os.environ['API_METRICS_DIR'], ignore_errors=True)
+    else:
+        # Importar y ejecutar la aplicación
+        from public.api import app
+
+        # Iniciar servidor
+        app.run(
+            host=host,
+            port=port,
+            debug=debug,
+            threaded=True
+        )
@@ -32,4 +32,4 @@ echo ========================================
 echo.
 
 cd /d "%~dp0"
-python public\api.py
\ No newline at end of file
+python run.py
\ No newline at end of file
@@ -46,4 +46,4 @@ echo ""
 cd "$(dirname "$0")"
 
 # Iniciar servidor
-python3 public/api.py
+python3 run.py
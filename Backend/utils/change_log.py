@@ -0,0 +1,153 @@
+"""
+Registro de cambios del menú
+Mantiene una versión creciente y un historial acotado de escrituras
+para que los clientes descarguen solo las diferencias
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class ChangeLog:
+    """Versión del menú y bitácora en memoria de inserciones, actualizaciones y eliminaciones"""
+
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+    def __init__(self, max_entries=1000):
+        # La versión inicial se basa en el reloj para que siempre sea mayor
+        # que cualquier versión entregada antes de reiniciar el servidor
+        self._version = int(time.time() * 1000)
+        # Versión desde la cual el historial está completo
+        self._floor = self._version
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        # Despierta a los clientes en espera (long-poll / SSE) cuando cambia la versión
+        self._changed = threading.Condition(self._lock)
+        # Con varios procesos (utils.prefork) las versiones se asignan en el
+        # proceso principal y las escrituras de todos llegan por apply()
+        self.relay = None
+
+    @property
+    def version(self):
+        return self._version
+
+    def record(self, op, dish_id, row=None):
+        """
+        Registra una escritura confirmada y avanza la versión
+
+        Args:
+            op: ChangeLog.INSERT, ChangeLog.UPDATE o ChangeLog.DELETE
+            dish_id: ID del plato afectado
+            row: Fila completa (no se usa en eliminaciones)
+
+        Returns:
+            int: Nueva versión del menú
+        """
+        return self.record_many([(op, dish_id, row)])
+
+    def record_many(self, changes):
+        """
+        Registra varias escrituras confirmadas en una sola transacción
+
+        Args:
+            changes: Iterable de tuplas (op, dish_id, row)
+
+        Returns:
+            int: Nueva versión del menú
+        """
+        if self.relay is not None:
+            return self.relay.publish(changes)
+        return self.record_local(changes)
+
+    def record_local(self, changes):
+        """Registra escrituras numerándolas en este proceso"""
+        with self._changed:
+            return self._append_locked(self._version + 1, changes)
+
+    def apply(self, first_version, changes):
+        """
+        Registra escrituras ya numeradas en otro proceso
+
+        Returns:
+            int: Nueva versión del menú
+        """
+        with self._changed:
+            return self._append_locked(first_version, changes)
+
+    def reset(self, version):
+        """Empieza de nuevo desde una versión dada, con el historial vacío"""
+        with self._changed:
+            self._version = self._floor = version
+            self._entries.clear()
+            self._changed.notify_all()
+
+    def _append_locked(self, version, changes):
+        for op, dish_id, row in changes:
+            if len(self._entries) == self._entries.maxlen:
+                # La entrada más antigua se descarta; el historial queda incompleto antes de ella
+                self._floor = self._entries[0][0]
+            self._version = version
+            self._entries.append((version, op, dish_id, row))
+            version += 1
+        # Un solo aviso por lote a los clientes en espera
+        self._changed.notify_all()
+        return self._version
+
+    def wait_for_change(self, since, timeout):
+        """
+        Bloquea hasta que la versión sea distinta de `since` o se agote el tiempo
+
+        Returns:
+            bool: True si hay cambios disponibles
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: self._version != since, timeout)
+
+    def changes_since(self, since):
+        """
+        Calcula los cambios posteriores a una versión
+
+        Args:
+            since: Última versión conocida por el cliente
+
+        Returns:
+            dict con version, resync, inserted, updated y deleted.
+            Si resync es True el cliente debe descargar el menú completo.
+        """
+        with self._lock:
+            version = self._version
+            if since is None or since < self._floor or since > version:
+                return {
+                    "version": version,
+                    "resync": True,
+                    "inserted": [],
+                    "updated": [],
+                    "deleted": []
+                }
+            entries = [entry for entry in self._entries if entry[0] > since]
+
+        # Compactar: solo interesa el último estado de cada plato
+        state = {}
+        for _, op, dish_id, row in entries:
+            previous = state.get(dish_id)
+            if op == self.DELETE:
+                if previous and previous[0] == self.INSERT:
+                    # Creado y eliminado después de la versión del cliente: no lo conoce
+                    del state[dish_id]
+                else:
+                    state[dish_id] = (self.DELETE, None)
+            elif op == self.UPDATE and previous and previous[0] == self.INSERT:
+                state[dish_id] = (self.INSERT, row)
+            else:
+                state[dish_id] = (op, row)
+
+        return {
+            "version": version,
+            "resync": False,
+            "inserted": [row for op, row in state.values() if op == self.INSERT],
+            "updated": [row for op, row in state.values() if op == self.UPDATE],
+            "deleted": [dish_id for dish_id, (op, _) in state.items() if op == self.DELETE]
+        }
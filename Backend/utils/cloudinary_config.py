@@ -3,10 +3,13 @@ import cloudinary.uploader
 import os
 from dotenv import load_dotenv
 
+from utils.image_storage import ImageStorage
+
 # Cargar variables de entorno
 load_dotenv()
 
-class CloudinaryConfig:
+class CloudinaryConfig(ImageStorage):
+    """Almacenamiento de imágenes en Cloudinary"""
     _instance = None
     _is_initialized = False
     
@@ -29,6 +32,30 @@ class CloudinaryConfig:
         
         CloudinaryConfig._is_initialized = True
     
+    # ==================== INTERFAZ ImageStorage ====================
+    
+    def save(self, content, base_url=None):
+        return self.upload_image(content)
+    
+    def delete(self, url):
+        public_id = self.extract_public_id(url)
+        if not public_id:
+            return {"success": False, "error": "La URL no corresponde a Cloudinary"}
+        return self.delete_image(public_id)
+    
+    def owns(self, url):
+        return bool(url) and 'cloudinary.com' in url
+    
+    def key_from_url(self, url):
+        return self.extract_public_id(url)
+    
+    def variant_url(self, url, size):
+        # Cloudinary genera y guarda cada tamaño la primera vez que se pide
+        if not self.owns(url) or size not in self.SIZES or '/upload/' not in url:
+            return url
+        width, height = self.SIZES[size]
+        return url.replace('/upload/', f'/upload/c_limit,w_{width},h_{height},q_auto,f_auto/', 1)
+    
     @staticmethod
     def upload_image(file, folder="menu_images"):
         """
@@ -57,6 +84,7 @@ class CloudinaryConfig:
             return {
                 "success": True,
                 "url": result['secure_url'],
+                "key": result['public_id'],
                 "public_id": result['public_id'],
                 "format": result['format'],
                 "width": result['width'],
@@ -0,0 +1,134 @@
+"""
+Compresión de respuestas
+Guarda el cuerpo ya codificado del menú completo y sus versiones
+comprimidas para servir cada consulta sin volver a serializar
+"""
+
+import gzip
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:  # Sin el paquete brotli solo se ofrece gzip
+    brotli = None
+
+
+# Codificaciones en orden de preferencia del servidor
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+# Cuerpos más chicos no ganan nada comprimiéndose
+MIN_SIZE = 1024
+
+
+def negotiate(accept_encodings):
+    """
+    Elige la codificación según el header Accept-Encoding
+
+    Args:
+        accept_encodings: request.accept_encodings de Flask
+
+    Returns:
+        "br", "gzip" o None (sin comprimir)
+    """
+    return accept_encodings.best_match(ENCODINGS)
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=9)
+    if encoding == "gzip":
+        # mtime fijo: el mismo contenido produce siempre los mismos bytes
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    raise ValueError(f"Codificación no soportada: {encoding}")
+
+
+class EncodedSnapshot:
+    """
+    Cuerpos codificados de una consulta y sus variantes comprimidas
+
+    Se reutilizan mientras la versión del menú sea la misma y la caché de
+    lectura entregue el mismo objeto de datos (MenuCache devuelve la
+    misma lista mientras su copia es válida); cualquier escritura cambia
+    la versión y el siguiente pedido los vuelve a generar. Cada formato
+    y cada variante comprimida se generan la primera vez que se piden.
+
+    Con cached() se sirven sin leer los datos de origen; pasados max_age
+    segundos (el TTL de la caché de lectura) hay que volver a pasar por
+    get() para notar cambios hechos fuera de la API.
+    """
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # (versión, datos de origen, {(formato, codificación): bytes}, vence)
+        self._current = None
+        # Respuestas servidas con un cuerpo ya generado / que hubo que generar
+        # (aproximados, como en MenuCache)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version, source, encode, encoding=None, form=None):
+        """
+        Args:
+            version: Versión del menú con la que se leyeron los datos
+            source: Objeto con los datos (se compara por identidad)
+            encode: Función sin argumentos que retorna los bytes sin comprimir
+            encoding: Codificación aceptada por el cliente, o None
+            form: Formato del cuerpo (lo que produce encode), por ejemplo su tipo MIME
+
+        Returns:
+            (bytes, codificación usada o None)
+        """
+        current = self._current
+        if current is None or current[0] != version or current[1] is not source:
+            with self._lock:
+                current = self._current
+                if current is None or current[0] != version or current[1] is not source:
+                    current = (version, source, {}, self._expiry())
+                    self._current = current
+                else:
+                    # Los datos de origen se confirmaron vigentes
+                    current = self._current = current[:3] + (self._expiry(),)
+
+        return self._body(current[2], form, encoding, encode)
+
+    def cached(self, version, encoding=None, form=None):
+        """
+        Como get() pero sin datos de origen: solo si ya hay un cuerpo de
+        ese formato para la versión indicada y no venció
+
+        Returns:
+            (bytes, codificación usada o None), o None
+        """
+        current = self._current
+        if current is None or current[0] != version or current[3] <= time.monotonic():
+            return None
+        variants = current[2]
+        if (form, None) not in variants:
+            return None
+        return self._body(variants, form, encoding, None)
+
+    def _expiry(self):
+        return time.monotonic() + self.max_age if self.max_age is not None else float("inf")
+
+    def _body(self, variants, form, encoding, encode):
+        raw = self._variant(variants, (form, None), encode)
+        if encoding is None or len(raw) < MIN_SIZE:
+            return raw, None
+        return self._variant(variants, (form, encoding), lambda: compress(raw, encoding)), encoding
+
+    def _variant(self, variants, key, build):
+        body = variants.get(key)
+        if body is None:
+            with self._lock:
+                body = variants.get(key)
+                if body is None:
+                    self.misses += 1
+                    body = variants[key] = build()
+                    return body
+        self.hits += 1
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._current = None
@@ -1,69 +1,249 @@
 #credentials
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import mysql.connector
 from mysql.connector import Error
 
-class DatabaseConnection:
-   _instance = None
-   _is_initialized = False
-   
-   def __new__(cls, *args, **kwargs):
-       if cls._instance is None:
-           cls._instance = super().__new__(cls)
-       return cls._instance
-   
-   def __init__(self, host, user, password, port, database):
-       if DatabaseConnection._is_initialized:
-           return
-       
-       self.host = host
-       self.user = user
-       self.password = password
-       self.port = port
-       self.database = database
-       self.connection = None
-       self.connect()
-       DatabaseConnection._is_initialized = True
-   
-   def connect(self):
-       try:
-           self.connection = mysql.connector.connect(
-               host=self.host,
-               user=self.user,
-               password=self.password,
-               port=self.port,
-               database=self.database
-           )
-           if self.connection.is_connected():
-               print("Conexión exitosa a la base de datos")
-               
-       except Error as e:
-           self.connection = None
-           raise (f"Error al conectar a la base de datos: {e}")
-           
-             
-       return self.connection
-   
-   def get_cursor(self):
-       if self.connection and self.connection.is_connected():
-           return self.connection.cursor()
-       else:
-           self.connect()
-           if self.connection and self.connection.is_connected():
-               return self.connection.cursor()
-           raise Exception("No se pudo establecer la conexión a la base de datos")
-       
-       
-       
-   def close(self):
-      if self.connection and self.connection.is_connected():
-          self.connection.close()
-          print("Conexión a la base de datos cerrada")
-          
-
-   
+
+class PoolExhaustedError(Exception):
+    """No hay conexiones libres dentro del tiempo de espera configurado"""
+
+
+class _Waiter:
+    """Hilo en espera de una conexión del pool"""
+    __slots__ = ("event", "slot")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.slot = None
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones MySQL seguro para múltiples hilos.
+
+    Cada petición toma prestada una conexión con `connection()` y la
+    devuelve al terminar, de modo que los hilos de Flask no comparten
+    el mismo socket. Las conexiones se validan al prestarse, se
+    reconectan si el servidor las cerró y se descartan si pasan
+    demasiado tiempo sin usarse.
+    """
+
+    def __init__(self, host, user, password, port, database,
+                 min_size=2, max_size=10, idle_timeout=300,
+                 acquire_timeout=10, ping_interval=5):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Tamaño de pool inválido: se requiere 0 <= min_size <= max_size y max_size >= 1")
+
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+        self.database = database
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.ping_interval = ping_interval
+
+        # Conexiones libres como (conexion, instante_ultimo_uso); se usan en orden LIFO
+        self._idle = []
+        # Conexiones abiertas en total (libres + prestadas)
+        self._size = 0
+        # Hilos esperando una conexión, atendidos en orden de llegada
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Abrir las conexiones mínimas (al menos una para validar credenciales)
+        for _ in range(max(1, min_size)):
+            self._idle.append((self._open(), time.monotonic()))
+            self._size += 1
+        print(f"Pool de conexiones listo ({self._size}/{self.max_size})")
+
+    def _open(self):
+        try:
+            return mysql.connector.connect(
+                host=self.host,
+                user=self.user,
+                password=self.password,
+                port=self.port,
+                database=self.database,
+                autocommit=True
+            )
+        except Error as e:
+            raise Error(f"Error al conectar a la base de datos: {e}") from e
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_idle_locked(self):
+        """Cierra conexiones ociosas por más de idle_timeout respetando min_size"""
+        if not self.idle_timeout:
+            return
+        limit = time.monotonic() - self.idle_timeout
+        # Las más antiguas están al inicio de la lista (LIFO)
+        while self._idle and self._size > self.min_size and self._idle[0][1] < limit:
+            conn, _ = self._idle.pop(0)
+            self._size -= 1
+            self._close_quietly(conn)
+
+    def acquire(self):
+        """
+        Toma prestada una conexión del pool
+
+        Returns:
+            Conexión MySQL válida
+
+        Raises:
+            PoolExhaustedError: si no se libera ninguna a tiempo
+        """
+        waiter = None
+        with self._lock:
+            if self._closed:
+                raise Error("El pool de conexiones está cerrado")
+            self._evict_idle_locked()
+            if self._idle:
+                slot = self._idle.pop()
+            elif self._size < self.max_size:
+                # Reservar el cupo; la conexión se abre fuera del lock
+                self._size += 1
+                slot = (None, None)
+            else:
+                # Cola FIFO: quien libera entrega la conexión al primero en espera
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+
+        if waiter is not None:
+            waiter.event.wait(self.acquire_timeout)
+            with self._lock:
+                slot = waiter.slot
+                if slot is None:
+                    self._waiters.remove(waiter)
+                    raise PoolExhaustedError(
+                        f"No hay conexiones disponibles (máximo {self.max_size})"
+                    )
+
+        conn, last_used = slot
+        try:
+            if conn is None:
+                conn = self._open()
+            elif time.monotonic() - last_used >= self.ping_interval:
+                # Verificar la conexión y reconectar de forma transparente
+                try:
+                    conn.ping(reconnect=True, attempts=1, delay=0)
+                except Error:
+                    self._close_quietly(conn)
+                    conn = self._open()
+        except Exception:
+            with self._lock:
+                self._give_slot_locked((None, None), reserved=True)
+            raise
+        return conn
+
+    def _give_slot_locked(self, slot, reserved=False):
+        """
+        Entrega una conexión (o un cupo para abrir una nueva) al primer
+        hilo en espera; si no hay nadie esperando la deja libre.
+        """
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.slot = slot
+            waiter.event.set()
+        elif slot[0] is not None:
+            self._idle.append(slot)
+        elif reserved:
+            self._size -= 1
+
+    def release(self, conn, check=False):
+        """
+        Devuelve una conexión al pool
+
+        Args:
+            conn: Conexión obtenida con acquire()
+            check: Si es True se verifica que siga viva antes de reutilizarla
+        """
+        healthy = True
+        try:
+            if check and not conn.is_connected():
+                healthy = False
+            elif conn.in_transaction:
+                # No dejar transacciones abiertas para el siguiente usuario
+                conn.rollback()
+        except Error:
+            healthy = False
+
+        with self._lock:
+            if healthy and not self._closed:
+                self._give_slot_locked((conn, time.monotonic()))
+            else:
+                self._close_quietly(conn)
+                if self._closed:
+                    self._size -= 1
+                else:
+                    # El cupo queda disponible para abrir una conexión nueva
+                    self._give_slot_locked((None, None), reserved=True)
+            self._evict_idle_locked()
+
+    @contextmanager
+    def connection(self):
+        """
+        Presta una conexión durante un bloque `with` y la devuelve al salir
+
+        Ejemplo:
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+        """
+        conn = self.acquire()
+        failed = False
+        try:
+            yield conn
+        except Error:
+            failed = True
+            raise
+        finally:
+            self.release(conn, check=failed)
+
+    def ping(self):
+        """Retorna True si es posible obtener una conexión válida"""
+        try:
+            with self.connection() as conn:
+                return conn.is_connected()
+        except Exception:
+            return False
+
+    def stats(self):
+        """Estado actual del pool"""
+        with self._lock:
+            idle = len(self._idle)
+            return {
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "min_size": self.min_size,
+                "max_size": self.max_size
+            }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._close_quietly(conn)
+        print("Pool de conexiones cerrado")
+
 
 if __name__ == "__main__":
-    
+
     DB_CONFIG = {
     "host":"localhost",
     "user":"root",
@@ -72,24 +252,27 @@ if __name__ == "__main__":
     "database":"restaurante"
     }
     def prueba_conexion():
-        conn = DatabaseConnection(**DB_CONFIG)
-        cursor = conn.get_cursor()
+        pool = ConnectionPool(**DB_CONFIG)
         query = "SELECT * FROM menu"
 
         try:
-            cursor.execute(query)
-            data = cursor.fetchall()
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query)
+                data = cursor.fetchall()
+                cursor.close()
             return {
                 "status": "success",
                 "code": 200,
                 "data": data
-            }   
+            }
         except Error as e:
             return {
                 "status": "error",
                 "code": 500,
                 "message": str(e)
             }
-            
+        finally:
+            pool.close()
+
     print(prueba_conexion())
-        
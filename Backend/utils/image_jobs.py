@@ -0,0 +1,118 @@
+"""
+Cola de trabajos de imágenes
+Ejecuta subidas y eliminaciones en un pool de hilos para que las
+peticiones HTTP no esperen al servicio de imágenes
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ImageJobQueue:
+    """
+    Pool de hilos con registro en memoria del estado de cada trabajo
+
+    Los trabajos terminados se conservan para consultarlos con get()
+    hasta que se supera max_jobs; entonces se descartan los más antiguos.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, max_workers=4, max_jobs=1000):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_id():
+        """Genera un ID de trabajo (se puede reservar antes de encolarlo)"""
+        return uuid.uuid4().hex
+
+    def submit(self, kind, func, *args, dish_id=None, job_id=None):
+        """
+        Encola un trabajo
+
+        Args:
+            kind: Tipo de trabajo ("upload" o "delete")
+            func: Función a ejecutar; si retorna un dict con success=False el trabajo falla
+            dish_id: Plato relacionado (informativo)
+            job_id: ID reservado con new_id()
+
+        Returns:
+            str: ID del trabajo
+        """
+        job_id = job_id or self.new_id()
+        job = {
+            "id": job_id,
+            "type": kind,
+            "dish_id": dish_id,
+            "status": self.PENDING,
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._trim_locked()
+        self._executor.submit(self._run, job, func, args)
+        return job_id
+
+    def _trim_locked(self):
+        # Descartar primero los trabajos terminados más antiguos
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id]["status"] in (self.DONE, self.FAILED):
+                del self._jobs[job_id]
+
+    def _run(self, job, func, args):
+        job["status"] = self.RUNNING
+        try:
+            result = func(*args)
+            if isinstance(result, dict) and result.get("success") is False:
+                job["status"] = self.FAILED
+                job["error"] = result.get("error", "Error desconocido")
+            else:
+                job["status"] = self.DONE
+                job["result"] = result
+        except Exception as e:
+            print(f"Error en trabajo de imagen {job['id']}: {e}")
+            job["status"] = self.FAILED
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = time.time()
+
+    def get(self, job_id):
+        """Retorna una copia del estado del trabajo o None si no existe"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def active_ids(self):
+        """IDs de los trabajos pendientes o en curso de este proceso"""
+        with self._lock:
+            return {
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in (self.PENDING, self.RUNNING)
+            }
+
+    def stats(self):
+        """Cantidad de trabajos por estado"""
+        with self._lock:
+            counts = {self.PENDING: 0, self.RUNNING: 0, self.DONE: 0, self.FAILED: 0}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+        return counts
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
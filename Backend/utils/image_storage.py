@@ -0,0 +1,264 @@
+"""
+Almacenamiento de imágenes
+Define la interfaz común y el almacenamiento local direccionado por contenido
+"""
+
+import hashlib
+import io
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+
+try:
+    from PIL import Image
+except ImportError:  # Sin Pillow se sirve siempre la imagen original
+    Image = None
+
+
+class ImageStorage(ABC):
+    """
+    Interfaz de un almacenamiento de imágenes (clase abstracta: un
+    almacenamiento sin alguno de los métodos obligatorios no se puede crear)
+
+    save() guarda el contenido y retorna su URL pública, delete() la
+    elimina y owns() indica si una URL pertenece a este almacenamiento.
+    variant_urls() da la URL de cada tamaño derivado (SIZES).
+    """
+
+    # True si contenidos idénticos comparten el mismo archivo (y la misma URL)
+    content_addressed = False
+
+    # Tamaños derivados: palabra clave -> caja máxima (ancho, alto)
+    SIZES = {
+        "thumb": (160, 120),     # Miniaturas y listados
+        "preview": (600, 420),   # Visor de imagen del formulario
+        "print": (1200, 900),    # Documento de impresión
+    }
+
+    @abstractmethod
+    def save(self, content, base_url=None):
+        """
+        Guarda una imagen
+
+        Args:
+            content: Bytes de la imagen
+            base_url: URL del servidor, para almacenamientos servidos por la API
+
+        Returns:
+            dict con success, url y key (o error)
+        """
+
+    @abstractmethod
+    def delete(self, url):
+        """Elimina la imagen de una URL propia; retorna dict con success"""
+
+    @abstractmethod
+    def owns(self, url):
+        """True si la URL fue generada por este almacenamiento"""
+
+    @abstractmethod
+    def key_from_url(self, url):
+        """Identificador de la imagen dentro del almacenamiento, o None"""
+
+    def storage_key(self, url):
+        """Clave de una URL propia (columna imagen_clave), o None si no es propia"""
+        if not url or not self.owns(url):
+            return None
+        return self.key_from_url(url)
+
+    def variant_url(self, url, size):
+        """URL de la imagen reducida al tamaño indicado (por defecto, la original)"""
+        return url
+
+    def variant_urls(self, url):
+        """
+        URLs de todos los tamaños derivados de una imagen propia
+
+        Returns:
+            dict tamaño -> URL, o None si la URL no pertenece al almacenamiento
+        """
+        if not url or not self.owns(url):
+            return None
+        return {size: self.variant_url(url, size) for size in self.SIZES}
+
+
+class LocalImageStorage(ImageStorage):
+    """
+    Imágenes en disco, guardadas por el SHA-256 de su contenido
+
+    Subir dos veces la misma imagen la guarda una sola vez. Los archivos
+    se reparten en subcarpetas por los dos primeros caracteres del hash
+    y se sirven con GET /images/<hash>. Al guardar se generan además las
+    versiones reducidas (<hash>.<tamaño>, servidas con GET
+    /images/<hash>/<tamaño>); si falta alguna se genera al pedirla.
+    """
+
+    content_addressed = True
+    HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+    URL_PATTERN = re.compile(r"/images/([0-9a-f]{64})$")
+
+    # Firmas de los formatos permitidos: (prefijo, desplazamiento, tipo MIME)
+    SIGNATURES = (
+        (b"\x89PNG\r\n\x1a\n", 0, "image/png"),
+        (b"\xff\xd8\xff", 0, "image/jpeg"),
+        (b"GIF87a", 0, "image/gif"),
+        (b"GIF89a", 0, "image/gif"),
+        (b"WEBP", 8, "image/webp"),
+    )
+
+    def __init__(self, directory, base_url=None):
+        self.directory = os.path.abspath(directory)
+        # Si no se configura, se usa la URL con la que llegó la petición
+        self.base_url = base_url.rstrip("/") if base_url else None
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def detect_mimetype(cls, content):
+        """Tipo MIME según los primeros bytes, o None si no es un formato permitido"""
+        for signature, offset, mimetype in cls.SIGNATURES:
+            if content[offset:offset + len(signature)] == signature:
+                return mimetype
+        return None
+
+    def path_for(self, key, size=None):
+        filename = f"{key}.{size}" if size else key
+        return os.path.join(self.directory, key[:2], filename)
+
+    @staticmethod
+    def _write_atomic(path, content):
+        # Escribir aparte y renombrar: nunca se sirve un archivo a medias
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _resize(self, content, size):
+        """
+        Reduce la imagen para que quepa en la caja del tamaño indicado
+
+        Returns:
+            bytes JPEG (PNG si tiene transparencia) o None si no se pudo
+        """
+        if Image is None:
+            return None
+        width, height = self.SIZES[size]
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                # En JPEG decodifica directamente a una escala menor
+                image.draft("RGB", (width, height))
+                image.thumbnail((width, height), Image.LANCZOS)
+                has_alpha = image.mode in ("RGBA", "LA") or (
+                    image.mode == "P" and "transparency" in image.info
+                )
+                output = io.BytesIO()
+                if has_alpha:
+                    image.convert("RGBA").save(output, "PNG", optimize=True)
+                else:
+                    image.convert("RGB").save(output, "JPEG", quality=85, optimize=True, progressive=True)
+                return output.getvalue()
+        except Exception as e:
+            print(f"No se pudo generar el tamaño {size}: {e}")
+            return None
+
+    def _save_variants(self, key, content):
+        for size in self.SIZES:
+            path = self.path_for(key, size)
+            if os.path.exists(path):
+                continue
+            resized = self._resize(content, size)
+            if resized is None:
+                break  # No se puede decodificar: tampoco saldrán los demás tamaños
+            self._write_atomic(path, resized)
+
+    def save(self, content, base_url=None):
+        if self.detect_mimetype(content) is None:
+            return {
+                "success": False,
+                "error": "El archivo no es una imagen PNG, JPG, GIF o WEBP válida"
+            }
+        base_url = self.base_url or (base_url or "").rstrip("/")
+        key = hashlib.sha256(content).hexdigest()
+        path = self.path_for(key)
+        try:
+            if not os.path.exists(path):
+                self._write_atomic(path, content)
+            # Generar los tamaños ahora (la subida ya corre en segundo plano)
+            self._save_variants(key, content)
+            return {
+                "success": True,
+                "url": f"{base_url}/images/{key}",
+                "key": key
+            }
+        except OSError as e:
+            return {
+                "success": False,
+                "error": f"Error al guardar imagen: {str(e)}"
+            }
+
+    def delete(self, url):
+        key = self.key_from_url(url)
+        if key is None:
+            return {"success": False, "error": "La URL no corresponde a una imagen local"}
+        try:
+            for size in self.SIZES:
+                try:
+                    os.remove(self.path_for(key, size))
+                except FileNotFoundError:
+                    pass
+            os.remove(self.path_for(key))
+            return {"success": True, "message": "Imagen eliminada exitosamente"}
+        except FileNotFoundError:
+            return {"success": True, "message": "La imagen ya no existía"}
+        except OSError as e:
+            return {"success": False, "error": f"Error al eliminar imagen: {str(e)}"}
+
+    def owns(self, url):
+        return self.key_from_url(url) is not None
+
+    def key_from_url(self, url):
+        match = self.URL_PATTERN.search(url or "")
+        return match.group(1) if match else None
+
+    def variant_url(self, url, size):
+        return f"{url}/{size}" if self.owns(url) and size in self.SIZES else url
+
+    def open(self, key, size=None):
+        """
+        Ubica una imagen guardada, o su versión reducida si se indica size
+
+        Si la versión reducida no existe (imagen anterior a los tamaños
+        o generada sin Pillow) se crea en ese momento; si no se puede,
+        se entrega la original.
+
+        Returns:
+            (ruta, tipo_mime) o None si no existe
+        """
+        if not self.HASH_PATTERN.match(key or ""):
+            return None
+        if size is not None and size not in self.SIZES:
+            return None
+        path = self.path_for(key)
+        if size is not None:
+            variant_path = self.path_for(key, size)
+            if not os.path.exists(variant_path) and os.path.exists(path):
+                try:
+                    with open(path, "rb") as image_file:
+                        resized = self._resize(image_file.read(), size)
+                    if resized is not None:
+                        self._write_atomic(variant_path, resized)
+                except OSError as e:
+                    print(f"No se pudo guardar el tamaño {size} de {key}: {e}")
+            if os.path.exists(variant_path):
+                path = variant_path
+        try:
+            with open(path, "rb") as image_file:
+                header = image_file.read(16)
+        except OSError:
+            return None
+        return path, self.detect_mimetype(header) or "application/octet-stream"
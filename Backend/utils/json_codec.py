@@ -0,0 +1,130 @@
+"""
+Codificación JSON de la API
+Usa orjson si está instalado y, si no, el módulo json de la biblioteca
+estándar; ambos producen el mismo formato que Flask (precios Decimal
+como texto y fechas como fecha HTTP)
+
+Uso (desde el directorio Backend), para comparar con el camino de Flask:
+    python -m utils.json_codec [filas]
+"""
+
+import decimal
+import json
+import uuid
+from datetime import date
+from functools import lru_cache
+
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa la biblioteca estándar
+    orjson = None
+
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+# Muchas filas comparten fecha: formatear cada una una sola vez
+_http_date = lru_cache(maxsize=4096)(http_date)
+
+
+def default(value):
+    """Convierte los tipos que devuelve MySQL y que JSON no conoce"""
+    if isinstance(value, date):
+        # datetime también es date: mismo formato que jsonify
+        return _http_date(value)
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"El tipo {type(value).__name__} no se puede convertir a JSON")
+
+
+if orjson is not None:
+    # Las fechas pasan por default() para conservar el formato de Flask
+    _OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(value):
+        """Codifica a bytes UTF-8"""
+        return orjson.dumps(value, default=default, option=_OPTIONS)
+
+    def loads(data):
+        """Decodifica bytes o str"""
+        return orjson.loads(data)
+else:
+    _encoder = json.JSONEncoder(default=default, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(value):
+        """Codifica a bytes UTF-8"""
+        return _encoder.encode(value).encode("utf-8")
+
+    def loads(data):
+        """Decodifica bytes o str"""
+        return json.loads(data)
+
+
+class CodecJSONProvider(JSONProvider):
+    """
+    Proveedor JSON de Flask basado en este módulo
+
+    Con app.json = CodecJSONProvider(app), jsonify(), request.get_json()
+    y current_app.json usan el mismo codificador que el resto de la API.
+    """
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Los bytes van directo a la respuesta, sin pasar por str
+        return self._app.response_class(dumps(obj) + b"\n", mimetype=self.mimetype)
+
+
+def _benchmark(rows=5000, rounds=20):
+    """Compara este módulo con el JSON por defecto de Flask"""
+    import time
+    from flask import Flask
+
+    data = {
+        "code": 200,
+        "message": "OK",
+        "data": [
+            {
+                "id": i,
+                "nombre": f"Plato número {i}",
+                "precio": decimal.Decimal(f"{i % 90}.50"),
+                "fecha_creacion": date(2025, 1, 1 + i % 28),
+                "imagen_url": f"https://res.cloudinary.com/demo/image/upload/menu/{i:06d}.jpg",
+                "imagen_estado": "lista"
+            }
+            for i in range(rows)
+        ]
+    }
+    app = Flask(__name__)
+
+    def measure(func):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            result = func()
+        return (time.perf_counter() - start) / rounds * 1000, result
+
+    with app.app_context():
+        flask_encode, flask_body = measure(lambda: app.json.response(data).get_data())
+        flask_decode, _ = measure(lambda: json.loads(flask_body))
+    codec_encode, codec_body = measure(lambda: dumps(data))
+    codec_decode, decoded = measure(lambda: loads(codec_body))
+
+    assert decoded == json.loads(flask_body), "El contenido no coincide con jsonify"
+    print(f"{rows} filas, {len(codec_body) / 1024:.0f} KB (codec: {BACKEND})")
+    print(f"  Codificar  jsonify: {flask_encode:8.2f} ms   codec: {codec_encode:8.2f} ms")
+    print(f"  Decodificar   json: {flask_decode:8.2f} ms   codec: {codec_decode:8.2f} ms")
+
+
+if __name__ == "__main__":
+    import sys
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
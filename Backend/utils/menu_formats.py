@@ -0,0 +1,67 @@
+"""
+Formatos de respuesta de GET /menu
+Además del JSON habitual (una lista de objetos) ofrece el menú por
+columnas, en JSON o en MessagePack, según el header Accept
+"""
+
+from utils import json_codec
+
+try:
+    import msgpack
+except ImportError:  # Sin el paquete msgpack solo se ofrecen los formatos JSON
+    msgpack = None
+
+
+JSON = "application/json"
+# Un arreglo por campo en lugar de un objeto por plato
+COLUMNAR = "application/vnd.restaurante.columnar+json"
+MSGPACK = "application/vnd.restaurante.columnar+msgpack"
+
+# En orden de preferencia del servidor: ante la duda (*/*), JSON
+FORMATS = (JSON, COLUMNAR, MSGPACK) if msgpack is not None else (JSON, COLUMNAR)
+# Nombre corto de cada formato para los ETags
+TAGS = {JSON: "json", COLUMNAR: "columnar", MSGPACK: "msgpack"}
+
+
+def negotiate(accept_mimetypes):
+    """
+    Elige el formato según el header Accept
+
+    Args:
+        accept_mimetypes: request.accept_mimetypes de Flask
+
+    Returns:
+        Uno de FORMATS (JSON si el cliente no pidió otro)
+    """
+    return accept_mimetypes.best_match(FORMATS, default=JSON)
+
+
+def to_columns(result):
+    """
+    Pasa una respuesta con "data" (lista de filas) a columnas
+
+    El resto de las claves (code, message, version, cursores...) se
+    conservan; "data" se reemplaza por "columns": {campo: [valores]},
+    todos los arreglos del mismo largo y en el orden de las filas.
+    """
+    rows = result.get('data') or []
+    fields = list(rows[0]) if rows else []
+    columnar = {key: value for key, value in result.items() if key != 'data'}
+    columnar['columns'] = {field: [row.get(field) for row in rows] for field in fields}
+    return columnar
+
+
+def encode(result, mimetype):
+    """
+    Codifica una respuesta exitosa de GET /menu en el formato indicado
+
+    Returns:
+        bytes
+    """
+    if mimetype == JSON:
+        return json_codec.dumps(result) + b"\n"
+    columnar = to_columns(result)
+    if mimetype == MSGPACK:
+        # Precios y fechas con el mismo texto que en JSON
+        return msgpack.packb(columnar, default=json_codec.default, use_bin_type=True)
+    return json_codec.dumps(columnar) + b"\n"
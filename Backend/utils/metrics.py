@@ -0,0 +1,415 @@
+"""
+Métricas de la API en formato de texto de Prometheus
+Contadores e histogramas con etiquetas, valores leídos al momento de
+cada consulta (pool, caché) y agregación entre los workers de utils.prefork
+"""
+
+import bisect
+import functools
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+from flask import Response, g, request
+
+
+# Límites (segundos) por defecto de los histogramas de duración
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shards:
+    """
+    Valores de una serie repartidos por hilo
+
+    Cada hilo suma solo en su propia lista, así registrar no usa locks
+    ni pierde incrementos. Al leer se suman todas; las listas de hilos
+    que ya terminaron se acumulan en una base y se descartan.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._base = [0.0] * size
+        self._shards = []  # (hilo, valores)
+
+    # Con más listas que esto se acumulan las de hilos terminados al crear otra
+    MAX_SHARDS = 64
+
+    def values(self):
+        values = getattr(self._local, "values", None)
+        if values is None:
+            values = self._local.values = [0.0] * self._size
+            with self._lock:
+                if len(self._shards) >= self.MAX_SHARDS:
+                    self._fold_locked()
+                self._shards.append((threading.current_thread(), values))
+        return values
+
+    def _fold_locked(self):
+        alive = []
+        for thread, values in self._shards:
+            if thread.is_alive():
+                alive.append((thread, values))
+            else:
+                # El hilo ya no escribe: su parte pasa a la base
+                self._base = [a + b for a, b in zip(self._base, values)]
+        self._shards = alive
+        return alive
+
+    def totals(self):
+        with self._lock:
+            alive = self._fold_locked()
+            totals = list(self._base)
+            for _, values in alive:
+                totals = [a + b for a, b in zip(totals, values)]
+        return totals
+
+
+class _CounterChild:
+    __slots__ = ("_shards",)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.values()[0] += amount
+
+    def totals(self):
+        return self._shards.totals()
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_shards")
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        # Un contador por límite, uno para +Inf y la suma de lo observado
+        self._shards = _Shards(len(bounds) + 2)
+
+    def observe(self, value):
+        values = self._shards.values()
+        values[bisect.bisect_left(self._bounds, value)] += 1
+        values[-1] += value
+
+    def time(self):
+        """Context manager que observa la duración del bloque"""
+        return _Timer(self)
+
+    def totals(self):
+        return self._shards.totals()
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _Metric:
+    def __init__(self, name, help, labelnames, kind):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Serie de estos valores de etiquetas (crearla es lo único que usa lock)"""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        return {values: child.totals() for values, child in children}
+
+
+class Counter(_Metric):
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames, "counter")
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Histogram(_Metric):
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames, "histogram")
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+class _Callback:
+    """Métrica cuyos valores se leen de una función al consultar /metrics"""
+
+    def __init__(self, name, help, labelnames, kind, func):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        self.func = func
+
+    def samples(self):
+        try:
+            values = self.func() or {}
+        except Exception as e:
+            print(f"⚠️  No se pudo leer la métrica {self.name}: {e}")
+            return {}
+        return {
+            tuple(str(label) for label in labels): [float(value)]
+            for labels, value in values.items()
+        }
+
+
+def timed(histogram):
+    """
+    Decorador: observa la duración de cada llamada en el histograma,
+    con el nombre de la función como única etiqueta
+    """
+    def decorator(func):
+        child = histogram.labels(func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class Registry:
+    """
+    Conjunto de métricas de un proceso
+
+    Con varios workers (utils.prefork) cada uno guarda periódicamente
+    sus valores en directory y /metrics suma los de todos los procesos
+    vivos, así cualquier worker responde con el total del servidor.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.directory = None
+        self._writer = None
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing  # Ya registrada (p. ej. el módulo se importó dos veces)
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge_callback(self, name, help, labelnames, func):
+        """Valores instantáneos: func retorna {(etiquetas...): valor}"""
+        return self._register(_Callback(name, help, labelnames, "gauge", func))
+
+    def counter_callback(self, name, help, labelnames, func):
+        """Contadores que ya lleva otro objeto: func retorna {(etiquetas...): valor}"""
+        return self._register(_Callback(name, help, labelnames, "counter", func))
+
+    # ==================== VARIOS PROCESOS ====================
+
+    def share(self, directory, interval=5):
+        """Guarda los valores de este proceso en directory cada interval segundos"""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        if self._writer is None:
+            self._writer = threading.Thread(
+                target=self._write_loop, args=(interval,), name="metrics-writer", daemon=True
+            )
+            self._writer.start()
+
+    def _write_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            self.write()
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"{pid}.metrics")
+
+    def write(self):
+        if self.directory is None:
+            return
+        data = pickle.dumps(self.snapshot(), protocol=pickle.HIGHEST_PROTOCOL)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, self._path(os.getpid()))
+        except OSError as e:
+            print(f"⚠️  No se pudieron guardar las métricas: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def remove(self):
+        """Borra el archivo de este proceso (al terminar el worker)"""
+        if self.directory is not None:
+            try:
+                os.remove(self._path(os.getpid()))
+            except OSError:
+                pass
+
+    def _other_snapshots(self):
+        if self.directory is None:
+            return []
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            name, _, extension = filename.partition(".")
+            if extension != "metrics" or not name.isdigit() or int(name) == os.getpid():
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                os.kill(int(name), 0)
+            except ProcessLookupError:
+                # Worker que terminó sin borrar su archivo
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            except PermissionError:
+                pass
+            try:
+                with open(path, "rb") as metrics_file:
+                    snapshots.append(pickle.load(metrics_file))
+            except (OSError, EOFError, pickle.UnpicklingError):
+                continue
+        return snapshots
+
+    # ==================== EXPOSICIÓN ====================
+
+    def snapshot(self):
+        """
+        Valores actuales de este proceso
+
+        Returns:
+            dict nombre -> (tipo, ayuda, etiquetas, límites, {valores_etiquetas: totales})
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: (
+                metric.kind, metric.help, metric.labelnames,
+                getattr(metric, "buckets", None), metric.samples()
+            )
+            for metric in metrics
+        }
+
+    def render(self):
+        """Texto para GET /metrics con la suma de todos los procesos"""
+        merged = self.snapshot()
+        for other in self._other_snapshots():
+            for name, (kind, help, labelnames, buckets, samples) in other.items():
+                if name not in merged:
+                    merged[name] = (kind, help, labelnames, buckets, {})
+                target = merged[name][4]
+                for labels, values in samples.items():
+                    current = target.get(labels)
+                    target[labels] = values if current is None else [a + b for a, b in zip(current, values)]
+
+        lines = []
+        for name, (kind, help, labelnames, buckets, samples) in sorted(merged.items()):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, values in sorted(samples.items()):
+                pairs = list(zip(labelnames, labels))
+                if kind == "histogram":
+                    cumulative = 0
+                    for bound, count in zip((*buckets, "+Inf"), values[:-1]):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else repr(float(bound))
+                        lines.append(f"{name}_bucket{_labels(pairs + [('le', le)])} {_number(cumulative)}")
+                    lines.append(f"{name}_sum{_labels(pairs)} {_number(values[-1])}")
+                    lines.append(f"{name}_count{_labels(pairs)} {_number(cumulative)}")
+                else:
+                    lines.append(f"{name}{_labels(pairs)} {_number(values[0])}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+# Registro del proceso: los módulos declaran sus métricas sobre él
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Tiempo hasta generar la respuesta (en /menu/stream, hasta abrir el canal)",
+    ("method", "route", "status")
+)
+
+
+def instrument(app):
+    """Registra la duración y el estado de cada petición de la aplicación Flask"""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            # La plantilla de la ruta, no la URL: /menu/<int:dish_id> es una sola serie
+            route = request.url_rule.rule if request.url_rule is not None else "(sin ruta)"
+            HTTP_SECONDS.labels(request.method, route, response.status_code).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(request.method, route, response.status_code).inc()
+        return response
+
+
+def metrics_response():
+    """Respuesta de GET /metrics"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
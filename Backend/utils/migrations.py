@@ -0,0 +1,161 @@
+"""
+Migraciones versionadas del esquema
+Aplica en orden los archivos NNN_descripcion.sql de database/migrations
+que todavía no figuran en la tabla schema_migrations
+
+Uso (desde el directorio Backend):
+    python -m utils.migrations           # aplicar pendientes
+    python -m utils.migrations status    # ver estado
+"""
+
+import os
+import re
+
+from mysql.connector import Error
+
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database", "migrations"
+)
+FILENAME_PATTERN = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+# Bloqueo con nombre de MySQL: varios procesos del servidor pueden arrancar a la vez
+LOCK_NAME = "restaurante_schema_migrations"
+
+
+class MigrationRunner:
+    """
+    Aplica las migraciones pendientes usando una conexión del pool
+
+    Cada archivo se ejecuta sentencia por sentencia (separadas por ';',
+    que no debe aparecer dentro de literales) y se registra en
+    schema_migrations al terminar. MySQL confirma cada cambio de esquema
+    por separado, así que si una migración falla a mitad hay que
+    corregirla a mano antes de volver a ejecutarla.
+    """
+
+    def __init__(self, pool, directory=MIGRATIONS_DIR, lock_timeout=30):
+        self.pool = pool
+        self.directory = directory
+        self.lock_timeout = lock_timeout
+
+    def discover(self):
+        """
+        Lista las migraciones disponibles
+
+        Returns:
+            Lista de (version, nombre, ruta) ordenada por versión
+        """
+        migrations = {}
+        for filename in sorted(os.listdir(self.directory)):
+            match = FILENAME_PATTERN.match(filename)
+            if not match:
+                continue
+            version = int(match.group(1))
+            if version in migrations:
+                raise ValueError(f"Versión de migración repetida: {version}")
+            migrations[version] = (version, match.group(2), os.path.join(self.directory, filename))
+        return [migrations[version] for version in sorted(migrations)]
+
+    @staticmethod
+    def _statements(sql):
+        """Separa un archivo SQL en sentencias, ignorando comentarios de línea"""
+        lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+        return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+    @staticmethod
+    def _applied(cursor):
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            " version INT PRIMARY KEY,"
+            " nombre VARCHAR(255) NOT NULL,"
+            " aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL"
+            ")"
+        )
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+
+    def run(self):
+        """
+        Aplica las migraciones pendientes
+
+        Returns:
+            Lista con los nombres de las migraciones aplicadas
+
+        Raises:
+            mysql.connector.Error: si una sentencia falla (las anteriores quedan registradas)
+        """
+        applied_now = []
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(buffered=True)
+            try:
+                cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, self.lock_timeout))
+                if cursor.fetchone()[0] != 1:
+                    raise Error("No se pudo obtener el bloqueo de migraciones")
+                try:
+                    done = self._applied(cursor)
+                    for version, name, path in self.discover():
+                        if version in done:
+                            continue
+                        print(f"Aplicando migración {version:03d}_{name}...")
+                        with open(path, encoding="utf-8") as sql_file:
+                            for statement in self._statements(sql_file.read()):
+                                cursor.execute(statement)
+                        cursor.execute(
+                            "INSERT INTO schema_migrations (version, nombre) VALUES (%s, %s)",
+                            (version, name)
+                        )
+                        applied_now.append(f"{version:03d}_{name}")
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+                    cursor.fetchall()
+            finally:
+                cursor.close()
+        return applied_now
+
+    def status(self):
+        """
+        Estado de cada migración disponible
+
+        Returns:
+            Lista de dicts con version, nombre y aplicada
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(buffered=True)
+            try:
+                done = self._applied(cursor)
+            finally:
+                cursor.close()
+        return [
+            {"version": version, "nombre": name, "aplicada": version in done}
+            for version, name, _ in self.discover()
+        ]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from dotenv import load_dotenv
+
+    from utils.conexion import ConnectionPool
+
+    load_dotenv()
+    pool = ConnectionPool(
+        host=os.getenv('DB_HOST', 'localhost'),
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD', ''),
+        port=int(os.getenv('DB_PORT', 3306)),
+        database=os.getenv('DB_NAME', 'restaurante'),
+        min_size=1,
+        max_size=1
+    )
+    try:
+        runner = MigrationRunner(pool)
+        if len(sys.argv) > 1 and sys.argv[1] == "status":
+            for migration in runner.status():
+                estado = "✓ aplicada" if migration["aplicada"] else "… pendiente"
+                print(f"{migration['version']:03d}_{migration['nombre']}: {estado}")
+        else:
+            applied = runner.run()
+            print(f"✓ {len(applied)} migraciones aplicadas" if applied else "✓ El esquema está al día")
+    finally:
+        pool.close()
@@ -0,0 +1,436 @@
+"""
+Servidor de producción con varios procesos
+El proceso principal abre el socket y crea los workers con fork; cada
+worker carga la aplicación por su cuenta (pool, caché e hilos propios)
+y atiende peticiones con un número fijo de hilos. Solo funciona en
+sistemas con fork (Linux, macOS)
+"""
+
+import itertools
+import os
+import pickle
+import select
+import signal
+import socket
+import struct
+import threading
+import time
+import traceback
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+
+_HEADER = struct.Struct("!I")
+
+
+def _send(channel, message):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    channel.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(channel, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = channel.recv(size - len(data))
+        if not chunk:
+            raise EOFError("Canal cerrado")
+        data += chunk
+    return bytes(data)
+
+
+def _recv(channel):
+    size = _HEADER.unpack(_recv_exact(channel, _HEADER.size))[0]
+    return pickle.loads(_recv_exact(channel, size))
+
+
+# ==================== LADO DEL WORKER ====================
+
+class ChangeRelay:
+    """
+    Comparte el registro de cambios entre los workers
+
+    Cada worker tiene su propio ChangeLog, pero las versiones las asigna
+    el proceso principal: una escritura se le envía, él le da número y
+    la reenvía a todos los workers (también al que la hizo), que la
+    agregan a su historial y despiertan a sus clientes en espera. Así
+    /menu/changes, /menu/stream y la caché de lectura ven las escrituras
+    de cualquier worker.
+    """
+
+    def __init__(self, channel, timeout=10):
+        self.channel = channel
+        self.timeout = timeout
+        self.change_log = None
+        self._send_lock = threading.Lock()
+        self._tokens = itertools.count()
+        self._pending = {}  # token -> [evento, versión asignada]
+
+    def attach(self, change_log):
+        """Sincroniza la versión con el proceso principal y empieza a escuchar"""
+        kind, version = _recv(self.channel)
+        if kind != "reset":
+            raise RuntimeError(f"Mensaje inesperado del proceso principal: {kind}")
+        change_log.reset(version)
+        change_log.relay = self
+        self.change_log = change_log
+        threading.Thread(target=self._listen, name="change-relay", daemon=True).start()
+
+    def publish(self, changes):
+        """
+        Envía un lote de escrituras y espera la versión que le asignaron
+
+        Returns:
+            int: Nueva versión del menú
+        """
+        changes = list(changes)
+        token = next(self._tokens)
+        waiter = [threading.Event(), None]
+        self._pending[token] = waiter
+        try:
+            with self._send_lock:
+                _send(self.channel, ("publish", token, changes))
+            if waiter[0].wait(self.timeout):
+                return waiter[1]
+        except OSError as e:
+            print(f"⚠️  No se pudo enviar el cambio al proceso principal: {e}")
+        finally:
+            self._pending.pop(token, None)
+        # Sin proceso principal el cambio queda al menos en este worker
+        print("⚠️  Cambio registrado solo en este worker")
+        return self.change_log.record_local(changes)
+
+    def _listen(self):
+        pid = os.getpid()
+        while True:
+            try:
+                kind, first_version, changes, origin, token = _recv(self.channel)
+            except (OSError, EOFError):
+                # El proceso principal terminó: este worker también
+                os.kill(pid, signal.SIGTERM)
+                return
+            if kind != "changes":
+                continue
+            version = self.change_log.apply(first_version, changes)
+            if origin == pid:
+                waiter = self._pending.get(token)
+                if waiter is not None:
+                    waiter[1] = version
+                    waiter[0].set()
+
+
+# Clave del environ WSGI con la función que pasa la conexión al cupo de streams
+DETACH_KEY = "prefork.detach"
+
+
+class _KeepAliveHandler(WSGIRequestHandler):
+    # HTTP/1.1 para mantener las conexiones abiertas entre peticiones
+    protocol_version = "HTTP/1.1"
+    # Segundos que una conexión puede esperar la siguiente petición
+    timeout = 5
+
+    def make_environ(self):
+        environ = super().make_environ()
+        # La aplicación lo llama antes de responder con un stream de larga duración
+        environ[DETACH_KEY] = self.server.detach
+        return environ
+
+
+class _WorkerServer(BaseWSGIServer):
+    """
+    Servidor WSGI de un worker con un máximo de hilos
+
+    Solo acepta una conexión cuando tiene un hilo libre: si todos están
+    ocupados las conexiones quedan en la cola del socket para el worker
+    que se libere primero. Los streams (/menu/stream) salen de ese cupo
+    al empezar y cuentan en uno propio, así no dejan al worker sin hilos.
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd, handler, streams=256):
+        super().__init__(host, port, app, handler=handler, fd=fd)
+        # Varios workers esperan en el mismo socket: el que pierde la
+        # carrera por accept() no debe quedarse bloqueado
+        self.socket.setblocking(False)
+        self._slots = threading.BoundedSemaphore(threads)
+        self._threads = threads
+        self._streams = threading.BoundedSemaphore(streams)
+        self._local = threading.local()
+
+    def _handle_request_noblock(self):
+        # Sin hilo libre no se acepta: se vuelve al bucle de serve_forever
+        # (que así sigue atendiendo shutdown) y la conexión sigue en la cola
+        if not self._slots.acquire(timeout=0.5):
+            return
+        try:
+            request, client_address = self.get_request()
+        except OSError:
+            self._slots.release()  # Otro worker la aceptó primero
+            return
+        try:
+            request.setblocking(True)
+            thread = threading.Thread(
+                target=self._process, args=(request, client_address), daemon=True
+            )
+            thread.start()
+        except Exception:
+            self._slots.release()
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            if getattr(self._local, "stream", False):
+                self._local.stream = False
+                self._streams.release()
+            else:
+                self._slots.release()
+
+    def detach(self):
+        """
+        Pasa la conexión del hilo actual del cupo de peticiones al de streams
+
+        Returns:
+            False si ya se alcanzó el máximo de streams del worker
+        """
+        if getattr(self._local, "stream", False):
+            return True
+        if not self._streams.acquire(blocking=False):
+            return False
+        self._local.stream = True
+        self._slots.release()
+        return True
+
+    def drain(self, timeout):
+        """
+        Espera hasta timeout segundos a que terminen las peticiones en curso
+
+        Los streams no se esperan: el cliente se reconecta a otro worker.
+        """
+        deadline = time.monotonic() + timeout
+        for _ in range(self._threads):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._slots.acquire(timeout=remaining):
+                return False
+        return True
+
+
+# ==================== PROCESO PRINCIPAL ====================
+
+class PreforkServer:
+    """
+    Proceso principal: socket compartido, workers y versiones del menú
+
+    Señales:
+        SIGHUP: recarga gradual (workers nuevos con el código actual y
+                los anteriores terminan lo que estaban atendiendo)
+        SIGTERM / SIGINT: detiene todos los workers de forma ordenada
+
+    Un worker que termina inesperadamente se reemplaza.
+    """
+
+    def __init__(self, load_app, host, port, workers, threads=32, backlog=2048,
+                 keepalive=5, graceful_timeout=30, on_worker_exit=None, streams=256):
+        """
+        Args:
+            load_app: Función que recibe un ChangeRelay y retorna la
+                      aplicación WSGI; se llama en cada worker después del fork
+            on_worker_exit: Función que se llama en el worker antes de salir
+            streams: Máximo de streams abiertos por worker (fuera de threads)
+        """
+        self.load_app = load_app
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.threads = max(1, threads)
+        self.streams = max(1, streams)
+        self.backlog = backlog
+        self.keepalive = keepalive
+        self.graceful_timeout = graceful_timeout
+        self.on_worker_exit = on_worker_exit
+
+        # Misma base que ChangeLog: siempre mayor que antes de reiniciar
+        self.version = int(time.time() * 1000)
+        self.socket = None
+        self._workers = {}  # pid -> (canal, generación)
+        self._generation = 0
+        self._stopping = False
+        self._reload = False
+
+    def _listen(self):
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def run(self):
+        self.socket = self._listen()
+        self.port = self.socket.getsockname()[1]
+        signal.signal(signal.SIGHUP, self._request_reload)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        print(f"✓ Proceso principal {os.getpid()}: {self.workers} workers x {self.threads} hilos")
+
+        try:
+            while not self._stopping:
+                if self._reload:
+                    self._reload = False
+                    self._replace_workers()
+                self._reap()
+                self._spawn_missing()
+                self._relay_once(timeout=1.0)
+        finally:
+            self._stop_workers()
+            self.socket.close()
+
+    def _request_reload(self, signum, frame):
+        self._reload = True
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    # ==================== WORKERS ====================
+
+    def _current(self):
+        return [pid for pid, (_, generation) in self._workers.items() if generation == self._generation]
+
+    def _spawn_missing(self):
+        for _ in range(self.workers - len(self._current())):
+            self._spawn()
+
+    def _spawn(self):
+        master_end, worker_end = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            master_end.close()
+            for channel, _ in self._workers.values():
+                channel.close()
+            code = 1
+            try:
+                self._worker_main(worker_end)
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+
+        worker_end.close()
+        self._workers[pid] = (master_end, self._generation)
+        # Lo primero que lee el worker: la versión actual del menú
+        self._safe_send(master_end, ("reset", self.version))
+
+    def _replace_workers(self):
+        print("🔄 Recarga: iniciando workers nuevos")
+        old = list(self._workers)
+        self._generation += 1
+        self._spawn_missing()
+        for pid in old:
+            self._signal(pid, signal.SIGTERM)
+
+    def _reap(self):
+        while self._workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            entry = self._workers.pop(pid, None)
+            if entry is None:
+                continue
+            entry[0].close()
+            if entry[1] == self._generation and not self._stopping:
+                print(f"⚠️  Worker {pid} terminó inesperadamente (estado {status}); se reemplaza")
+                time.sleep(1)  # No reiniciar en bucle si falla al cargar la aplicación
+
+    @staticmethod
+    def _signal(pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _stop_workers(self):
+        for pid in list(self._workers):
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self._workers and time.monotonic() < deadline:
+            # Seguir repartiendo cambios mientras terminan sus peticiones
+            self._relay_once(timeout=0.2)
+            self._reap()
+        for pid in list(self._workers):
+            self._signal(pid, signal.SIGKILL)
+        while self._workers:
+            pid, _ = os.waitpid(-1, 0)
+            entry = self._workers.pop(pid, None)
+            if entry is not None:
+                entry[0].close()
+
+    # ==================== CAMBIOS DEL MENÚ ====================
+
+    def _relay_once(self, timeout):
+        """Atiende los lotes de escrituras que enviaron los workers"""
+        channels = {channel: pid for pid, (channel, _) in self._workers.items()}
+        if not channels:
+            time.sleep(timeout)
+            return
+        try:
+            readable, _, _ = select.select(list(channels), [], [], timeout)
+        except (OSError, ValueError):
+            return
+        for channel in readable:
+            try:
+                kind, token, changes = _recv(channel)
+            except (OSError, EOFError):
+                continue  # El worker terminó; se limpia en _reap
+            if kind != "publish":
+                continue
+            first_version = self.version + 1
+            self.version += len(changes)
+            message = ("changes", first_version, changes, channels[channel], token)
+            for other in channels:
+                self._safe_send(other, message)
+
+    @staticmethod
+    def _safe_send(channel, message):
+        try:
+            _send(channel, message)
+        except OSError:
+            pass  # El worker terminó; se limpia en _reap
+
+    # ==================== DENTRO DEL WORKER ====================
+
+    def _worker_main(self, channel):
+        # Ctrl+C llega a todo el grupo: lo maneja el proceso principal
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        # El manejador heredado del proceso principal solo marcaría esta copia:
+        # mientras carga la aplicación, SIGTERM termina el worker directamente
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        app = self.load_app(ChangeRelay(channel))
+        handler = type("KeepAliveHandler", (_KeepAliveHandler,), {"timeout": self.keepalive})
+        server = _WorkerServer(
+            self.host, self.port, app, self.threads, self.socket.fileno(), handler, self.streams
+        )
+
+        def stop(signum, frame):
+            # shutdown() espera al bucle de serve_forever: desde otro hilo
+            threading.Thread(target=server.shutdown, daemon=True).start()
+        signal.signal(signal.SIGTERM, stop)
+
+        print(f"✓ Worker {os.getpid()} atendiendo en {self.host}:{self.port}")
+        server.serve_forever()
+        # Ya no acepta conexiones: terminar las peticiones en curso
+        if not server.drain(self.graceful_timeout):
+            print(f"⚠️  Worker {os.getpid()}: peticiones sin terminar tras {self.graceful_timeout}s")
+        if self.on_worker_exit is not None:
+            self.on_worker_exit()
@@ -3,10 +3,39 @@ Componente de vista previa de imagen
 """
 
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QFrame, QFileDialog
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
 from PyQt6.QtGui import QPixmap
 from styles.colors import Colors
-import requests
+from utils.image_cache import ImageCache
+
+
+class _ImageLoadSignals(QObject):
+    """Señales de una descarga; se entregan en el hilo de la interfaz"""
+    # (número de petición, url, QImage o None, vence)
+    finished = pyqtSignal(int, str, object, float)
+
+
+class _ImageLoadTask(QRunnable):
+    """Descarga y decodifica una imagen fuera del hilo de la interfaz"""
+    
+    def __init__(self, request_id, url, is_current):
+        super().__init__()
+        self.request_id = request_id
+        self.url = url
+        self.is_current = is_current
+        self.signals = _ImageLoadSignals()
+    
+    def run(self):
+        # Si el usuario ya pasó a otro plato no vale la pena descargarla
+        if not self.is_current(self.request_id):
+            return
+        try:
+            decoded = ImageCache.shared().decode_image(self.url)
+        except Exception as e:
+            print(f"❌ Error al cargar imagen: {e}")
+            decoded = None
+        image, expires = decoded if decoded else (None, 0.0)
+        self.signals.finished.emit(self.request_id, self.url, image, expires)
 
 
 class ImageViewer(QWidget):
@@ -15,6 +44,11 @@ class ImageViewer(QWidget):
     def __init__(self):
         super().__init__()
         self.current_image_path = None
+        # Cada carga recibe un número nuevo; los resultados de números
+        # anteriores se descartan al llegar
+        self._request_id = 0
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(2)
         self.init_ui()
     
     def init_ui(self):
@@ -61,15 +95,36 @@ class ImageViewer(QWidget):
     
     def show_placeholder(self):
         """Muestra un placeholder cuando no hay imagen"""
+        self._cancel_pending()
         self.image_label.setText("🖼️\n\nNo hay imagen cargada\n\nArrastra y suelta una imagen aquí o haz doble clic")
         self.current_image_path = None
     
+    def _cancel_pending(self):
+        """Invalida las cargas en curso y quita de la cola las que no empezaron"""
+        self._request_id += 1
+        self._pool.clear()
+    
+    def _is_current(self, request_id):
+        return request_id == self._request_id
+    
+    def _show_pixmap(self, pixmap):
+        # Escalar imagen manteniendo aspecto según el tamaño del label
+        target_w = min(600, max(200, self.image_label.width() or 400))
+        target_h = min(420, max(160, self.image_label.height() or 280))
+        scaled_pixmap = pixmap.scaled(
+            target_w, target_h,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+        self.image_label.setPixmap(scaled_pixmap)
+    
     def load_image(self, image_path):
         """Carga y muestra una imagen desde una ruta local"""
         if not image_path:
             self.show_placeholder()
             return
         
+        self._cancel_pending()
         pixmap = QPixmap(image_path)
         
         if pixmap.isNull():
@@ -77,50 +132,50 @@ class ImageViewer(QWidget):
             self.current_image_path = None
             return
         
-        # Escalar imagen manteniendo aspecto según el tamaño del label
-        target_w = min(600, max(200, self.image_label.width() or 400))
-        target_h = min(420, max(160, self.image_label.height() or 280))
-        scaled_pixmap = pixmap.scaled(
-            target_w, target_h,
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        self.image_label.setPixmap(scaled_pixmap)
+        self._show_pixmap(pixmap)
         self.current_image_path = image_path  # Guardar la ruta local
     
-    def load_image_from_url(self, image_url):
-        """Carga y muestra una imagen desde una URL"""
+    def load_image_from_url(self, image_url, display_url=None):
+        """
+        Carga y muestra una imagen desde una URL sin bloquear la interfaz
+        
+        Si la imagen está en memoria se muestra al instante; si no, se
+        muestra un aviso de carga y se descarga en segundo plano.
+        
+        Args:
+            image_url: URL original de la imagen (la que se guarda en el plato)
+            display_url: URL de una versión reducida para mostrar (opcional)
+        """
         if not image_url:
             self.show_placeholder()
             return
         
-        try:
-            # Descargar imagen desde URL
-            response = requests.get(image_url, timeout=10)
-            response.raise_for_status()
-            
-            # Crear pixmap desde bytes
-            pixmap = QPixmap()
-            pixmap.loadFromData(response.content)
-            
-            if pixmap.isNull():
+        self._cancel_pending()
+        # Guardar la URL como path para poder obtenerla después (aunque siga cargando)
+        self.current_image_path = image_url
+        # La versión reducida si existe: pesa y decodifica menos
+        url = display_url or image_url
+        
+        pixmap = ImageCache.shared().cached_pixmap(url)
+        if pixmap is not None:
+            self._show_pixmap(pixmap)
+            return
+        
+        self.image_label.setText("⏳\n\nCargando imagen...")
+        task = _ImageLoadTask(self._request_id, url, self._is_current)
+        task.signals.finished.connect(self._on_image_loaded)
+        self._pool.start(task)
+    
+    def _on_image_loaded(self, request_id, url, image, expires):
+        """Recibe en el hilo de la interfaz el resultado de una descarga"""
+        if image is None:
+            if self._is_current(request_id):
                 self.image_label.setText("❌\n\nError al cargar imagen desde URL")
-                return
-            
-            # Escalar imagen manteniendo aspecto
-            target_w = min(600, max(200, self.image_label.width() or 400))
-            target_h = min(420, max(160, self.image_label.height() or 280))
-            scaled_pixmap = pixmap.scaled(
-                target_w, target_h,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.image_label.setPixmap(scaled_pixmap)
-            # Guardar la URL como path para poder obtenerla después
-            self.current_image_path = image_url
-            
-        except Exception as e:
-            self.image_label.setText(f"❌\n\nError al cargar imagen:\n{str(e)}")
+            return
+        # Aunque ya no sea la actual, queda en memoria para cuando se vuelva a ella
+        pixmap = ImageCache.shared().put_image(url, image, expires)
+        if self._is_current(request_id):
+            self._show_pixmap(pixmap)
     
     def clear_image(self):
         """Limpia la imagen actual"""
@@ -7,8 +7,11 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QLabel, QFrame, QScrollArea, QMessageBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QCursor
+import random
 import time
 
+import requests
+
 from styles.theme import Theme
 from styles.colors import Colors
 from ui.form_fields import FormFields
@@ -16,28 +19,115 @@ from ui.toolbar_actions import ToolbarActions
 from ui.image_viewer import ImageViewer
 from utils.print_manager import PrintManager
 from utils.api_client import APIClient
+from utils.async_api import AsyncAPIClient
+from utils.config import Config
+from utils.image_cache import ImageCache
+from utils.image_prefetcher import ImagePrefetcher
+from utils import json_codec
+from utils.record_source import END_CURSOR, RecordSource, dish_to_record
 
 
 class DataUpdater(QThread):
-    """Hilo para verificar actualizaciones en segundo plano"""
-    data_changed = pyqtSignal(list)
+    """
+    Hilo que recibe las actualizaciones del menú en segundo plano
+    
+    Usa el canal SSE /menu/stream para recibir los cambios al instante.
+    Si el canal se cae reconecta con espera exponencial; si el servidor
+    no lo ofrece, recurre a long-poll sobre /menu/changes.
+    """
+    resync_required = pyqtSignal()  # El historial no alcanza: recargar la ventana
+    changes_received = pyqtSignal(dict)  # Solo las diferencias
+    
+    # Intervalos cortos para que stop() no quede bloqueado en una lectura
+    STREAM_HEARTBEAT = 2  # Keep-alive del canal SSE (segundos)
+    LONG_POLL_WAIT = 5  # Segundos que el servidor retiene cada long-poll
+    MAX_BACKOFF = 30  # Espera máxima entre reconexiones (segundos)
     
-    def __init__(self, api_client):
+    def __init__(self, api_client, version=None):
         super().__init__()
         self.api_client = api_client
+        self.version = version  # Última versión del menú conocida
         self.running = True
+        self._use_stream = True
+        self._failures = 0
         
     def run(self):
         while self.running:
             try:
-                # Verificar actualizaciones cada 3 segundos
-                time.sleep(3)
-                result = self.api_client.get_all_dishes()
-                if result.get('success'):
-                    self.data_changed.emit(result.get('data', []))
+                if self._use_stream:
+                    self._consume_stream()
+                else:
+                    self._long_poll()
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code in (404, 405, 501):
+                    # Servidor sin canal SSE: usar long-poll
+                    self._use_stream = False
+                else:
+                    self._backoff()
             except Exception:
-                pass
-            
+                self._backoff()
+    
+    def _consume_stream(self):
+        """Lee eventos SSE hasta que la conexión se cierre"""
+        response = self.api_client.open_change_stream(self.version, self.STREAM_HEARTBEAT)
+        try:
+            event, data = None, []
+            for line in response.iter_lines(decode_unicode=True):
+                if not self.running:
+                    break
+                self._failures = 0
+                if line is None:
+                    continue
+                if line == '':
+                    # Línea vacía: fin del evento
+                    if event == 'changes' and data:
+                        self._handle_changes(json_codec.loads('\n'.join(data)))
+                    event, data = None, []
+                elif line.startswith(':'):
+                    continue  # Comentario keep-alive
+                else:
+                    field, _, value = line.partition(':')
+                    value = value[1:] if value.startswith(' ') else value
+                    if field == 'event':
+                        event = value
+                    elif field == 'data':
+                        data.append(value)
+        finally:
+            response.close()
+        if self.running:
+            # El servidor cerró el canal: reconectar tras una breve espera
+            self._backoff()
+    
+    def _long_poll(self):
+        """Espera en el servidor hasta que haya cambios o se agote el tiempo"""
+        result = self.api_client.get_changes(self.version, wait=self.LONG_POLL_WAIT)
+        if not result.get('success'):
+            self._backoff()
+            return
+        self._failures = 0
+        self._handle_changes(result.get('data', {}))
+    
+    def _handle_changes(self, changes):
+        """Emite las diferencias recibidas o pide el menú completo si hace falta"""
+        if changes.get('resync'):
+            # El servidor ya no tiene el historial: la ventana recarga la página actual
+            self.version = changes.get('version', self.version)
+            self.resync_required.emit()
+            return
+        
+        self.version = changes.get('version', self.version)
+        if changes.get('inserted') or changes.get('updated') or changes.get('deleted'):
+            self.changes_received.emit(changes)
+    
+    def _backoff(self):
+        """Espera exponencial con jitter antes de reintentar"""
+        self._failures += 1
+        delay = min(self.MAX_BACKOFF, 2 ** (self._failures - 1))
+        delay *= random.uniform(0.5, 1.0)
+        deadline = time.monotonic() + delay
+        while self.running and time.monotonic() < deadline:
+            time.sleep(0.1)
+    
     def stop(self):
         self.running = False
         self.wait()
@@ -49,8 +139,22 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.current_record_index = 0  # Índice del registro actual
-        self.records_data = []  # Aquí se cargarán los datos del backend
+        self._shown_record = None  # (id, hash) del plato mostrado en el formulario
+        self.data_version = None  # Versión del menú cargada
         self.api_client = APIClient()  # Cliente API para backend
+        # Escrituras y recargas en segundo plano, en orden y sin recargas repetidas
+        self.async_api = AsyncAPIClient(self.api_client, parent=self)
+        # Platos del backend, descargados por páginas según se navega
+        self.records_data = RecordSource(
+            self.api_client, Config.PAGE_SIZE, Config.MAX_CACHED_PAGES
+        )
+        # Imágenes de los platos vecinos, precargadas en la caché
+        self.image_prefetcher = ImagePrefetcher(
+            ImageCache.shared(),
+            Config.IMAGE_PREFETCH_MAX_MB * 1024 * 1024,
+            Config.IMAGE_PREFETCH_MEMORY_MB * 1024 * 1024,
+            parent=self
+        )
         
         # Configuración de la ventana
         self.setWindowTitle("Gestor de Menú - Restaurante")
@@ -74,82 +178,72 @@ class MainWindow(QMainWindow):
 
     def start_auto_refresh(self):
         """Inicia el hilo de actualización automática"""
-        self.updater = DataUpdater(self.api_client)
-        self.updater.data_changed.connect(self.handle_remote_update)
+        self.updater = DataUpdater(self.api_client, self.data_version)
+        self.updater.resync_required.connect(self.handle_remote_resync)
+        self.updater.changes_received.connect(self.handle_remote_changes)
         self.updater.start()
         
     def closeEvent(self, event):
         """Detener hilo al cerrar"""
         if hasattr(self, 'updater'):
             self.updater.stop()
+        self.image_prefetcher.cancel()
+        self.async_api.close()
+        self.records_data.close()
         event.accept()
-        
-    def handle_remote_update(self, raw_data):
-        """Maneja las actualizaciones recibidas del backend"""
-        # Procesar datos nuevos
-        new_records = [
-            {
-                "id": dish.get("id"),
-                "name": dish.get("nombre"),
-                "price": str(dish.get("precio", "0.00")),
-                "date": str(dish.get("fecha_creacion", "")) if dish.get("fecha_creacion") else "",
-                "image_url": dish.get("imagen_url", ""),
-                "image_path": ""
-            }
-            for dish in raw_data
-        ]
-        
-        # Comparar si hay cambios reales (ignorando image_path local)
-        if self._has_data_changed(new_records):
-            # Guardar ID actual para intentar mantener la selección
-            current_id = None
-            if self.records_data and 0 <= self.current_record_index < len(self.records_data):
-                current_id = self.records_data[self.current_record_index].get('id')
-            
-            # Actualizar datos
-            self.records_data = new_records
-            
-            # Restaurar selección
-            new_index = 0
-            if current_id:
-                for i, record in enumerate(self.records_data):
-                    if record.get('id') == current_id:
-                        new_index = i
-                        break
-            
-            # Si el registro actual fue eliminado, ir al último o al primero
-            if new_index == 0 and current_id and not any(r.get('id') == current_id for r in self.records_data):
-                if self.records_data:
-                    new_index = max(0, min(self.current_record_index, len(self.records_data) - 1))
-                else:
-                    new_index = -1
-
-            self.current_record_index = new_index
-            
-            # Actualizar UI
-            if self.records_data and self.current_record_index >= 0:
-                self.load_record(self.current_record_index)
-            else:
-                self.form_fields.clear_data()
-                self.image_viewer.clear_image()
-                self.toolbar.update_navigation_label(0, 0)
-                
+    
+    def _current_record_id(self):
+        """Retorna el ID del registro seleccionado o None (sin usar la red)"""
+        record = self.records_data.peek(self.current_record_index)
+        if record is not None:
+            return record.id
+        # Su página todavía no llegó: el plato que sigue en el formulario
+        return self._shown_record[0] if self._shown_record else None
+    
+    def _displayed_record(self):
+        """
+        Registro seleccionado si es el que muestra el formulario; None (con
+        un aviso) mientras su página se descarga
+        """
+        record = self.records_data.peek(self.current_record_index)
+        if record is None or self._shown_record is None or record.id != self._shown_record[0]:
+            self.statusBar().showMessage("⏳ El plato todavía se está cargando", 3000)
+            return None
+        return record
+    
+    def handle_remote_resync(self):
+        """Recarga la página del registro actual cuando no hay diferencias disponibles"""
+        self.request_refresh(self._current_record_id(), notify_errors=False)
+    
+    def handle_remote_changes(self, changes):
+        """Aplica en sitio las diferencias recibidas de /menu/changes"""
+        current_id = self._current_record_id()
+        # El formulario solo se vuelve a cargar si cambió el plato actual (ver load_record)
+        if self.records_data.apply_changes(changes)["changed"]:
+            self._restore_selection(current_id)
             self.statusBar().showMessage("🔄 Datos actualizados remotamente", 2000)
+    
+    def _restore_selection(self, current_id):
+        """Vuelve a seleccionar el registro actual tras un cambio en los datos"""
+        new_index = self.records_data.index_of(current_id)
+        
+        # Si el registro actual fue eliminado, quedarse en la misma posición
+        if new_index is None:
+            if self.records_data:
+                new_index = max(0, min(self.current_record_index, len(self.records_data) - 1))
+            else:
+                new_index = -1
 
-    def _has_data_changed(self, new_records):
-        """Compara los datos nuevos con los actuales"""
-        if len(new_records) != len(self.records_data):
-            return True
-            
-        for i, new_record in enumerate(new_records):
-            current = self.records_data[i]
-            # Comparar campos clave
-            if (new_record['id'] != current['id'] or
-                new_record['name'] != current['name'] or
-                new_record['price'] != current['price'] or
-                new_record['image_url'] != current['image_url']):
-                return True
-        return False
+        self.current_record_index = new_index
+        
+        # Actualizar UI
+        if self.records_data and self.current_record_index >= 0:
+            self.load_record(self.current_record_index)
+        else:
+            self.form_fields.clear_data()
+            self._shown_record = None
+            self.image_viewer.clear_image()
+            self.toolbar.update_navigation_label(0, 0)
     
     def init_ui(self):
         """Inicializa la interfaz de usuario"""
@@ -271,52 +365,18 @@ class MainWindow(QMainWindow):
         # y mantener la estructura compacta
         return card
     
-    def load_data_from_backend(self):
-        """Carga datos desde el backend"""
+    def load_data_from_backend(self, anchor_id=None):
+        """
+        Carga desde el backend la página que contiene anchor_id
+        (la primera página si no se indica), esperando la respuesta
+        """
         try:
             self.setCursor(QCursor(Qt.CursorShape.WaitCursor))
             self.statusBar().showMessage("⏳ Cargando datos del servidor...")
             
-            # Obtener todos los platos del backend
-            result = self.api_client.get_all_dishes()
-            
-            # Verificar si result es un dict con estructura correcta
-            if isinstance(result, dict) and result.get('success'):
-                dishes = result.get('data', [])
-                
-                if dishes:
-                    self.records_data = [
-                        {
-                            "id": dish.get("id"),
-                            "name": dish.get("nombre"),
-                            "price": str(dish.get("precio", "0.00")),
-                            "date": str(dish.get("fecha_creacion", "")) if dish.get("fecha_creacion") else "",
-                            "image_url": dish.get("imagen_url", ""),
-                            "image_path": ""  # No hay path local inicialmente
-                        }
-                        for dish in dishes
-                    ]
-                    
-                    # Cargar primer registro
-                    if self.records_data:
-                        self.current_record_index = 0
-                        self.load_record(0)
-                        self.statusBar().showMessage(f"✅ {len(self.records_data)} platos cargados", 3000)
-                else:
-                    self.records_data = []
-                    self.current_record_index = -1
-                    self.form_fields.clear_data()
-                    self.image_viewer.clear_image()
-                    self.toolbar.update_navigation_label(0, 0)
-                    self.statusBar().showMessage("⚠️ No hay platos en el menú", 5000)
-            else:
-                error_msg = result.get('error', 'El backend no está disponible') if isinstance(result, dict) else 'Respuesta inválida del servidor'
-                self.statusBar().showMessage(f"❌ {error_msg}", 5000)
-                QMessageBox.warning(
-                    self,
-                    "Error de Conexión",
-                    f"No se pudo conectar con el servidor.\n\n{error_msg}"
-                )
+            # Obtener solo la página necesaria; el resto se descarga al navegar
+            result = self.records_data.reload(anchor_id)
+            self._show_loaded_data(result, anchor_id)
                 
         except Exception as e:
             self.statusBar().showMessage(f"❌ Error: {str(e)}", 5000)
@@ -328,34 +388,136 @@ class MainWindow(QMainWindow):
         finally:
             self.setCursor(QCursor(Qt.CursorShape.ArrowCursor))
     
+    def request_refresh(self, anchor_id=None, notify_errors=True):
+        """
+        Recarga en segundo plano la página que contiene anchor_id
+        
+        Las recargas pedidas mientras otra todavía espera en la cola se
+        combinan en una sola, con el ancla de la última.
+        """
+        self.async_api.submit(
+            self.records_data.reload, anchor_id,
+            callback=lambda result: self._show_loaded_data(result, anchor_id, notify_errors),
+            key="reload"
+        )
+    
+    def _show_loaded_data(self, result, anchor_id=None, notify_errors=True):
+        """Muestra el resultado de una recarga de RecordSource"""
+        # Verificar si result es un dict con estructura correcta
+        if isinstance(result, dict) and result.get('success'):
+            self.data_version = result.get('version')
+            if hasattr(self, 'updater'):
+                self.updater.version = self.data_version
+            
+            if self.records_data:
+                # Si el ancla ya no existe se muestra el plato que la sigue
+                index = self.records_data.nearest_index(anchor_id) or 0
+                self.current_record_index = index
+                self.load_record(index)
+                self.statusBar().showMessage(f"✅ {len(self.records_data)} platos en el menú", 3000)
+            else:
+                self.current_record_index = -1
+                self.form_fields.clear_data()
+                self._shown_record = None
+                self.image_viewer.clear_image()
+                self.toolbar.update_navigation_label(0, 0)
+                self.statusBar().showMessage("⚠️ No hay platos en el menú", 5000)
+        else:
+            error_msg = result.get('error', 'El backend no está disponible') if isinstance(result, dict) else 'Respuesta inválida del servidor'
+            self.statusBar().showMessage(f"❌ {error_msg}", 5000)
+            if notify_errors:
+                QMessageBox.warning(
+                    self,
+                    "Error de Conexión",
+                    f"No se pudo conectar con el servidor.\n\n{error_msg}"
+                )
+    
     def load_record(self, index):
         """Carga un registro en el formulario"""
         if 0 <= index < len(self.records_data):
+            # Nunca se descarga desde el hilo de la interfaz
+            record = self.records_data.get(index, load=False)
+            if record is None:
+                self._load_record_later(index)
+                return
+            previous_index = self.current_record_index
             self.current_record_index = index
-            record = self.records_data[index]
+            
+            if (record.id, record.hash) == self._shown_record:
+                # Es el mismo plato y no cambió: solo pudo moverse de posición.
+                # No se pisa el formulario ni se vuelve a pedir la imagen
+                self.toolbar.update_navigation_label(index + 1, len(self.records_data))
+                return
+            self._shown_record = (record.id, record.hash)
             
             # Cargar datos en el formulario
             self.form_fields.set_data(
-                name=record.get("name", ""),
-                price=record.get("price", ""),
-                date=record.get("date", "")
+                name=record.name or "",
+                price=record.price,
+                date=record.date
             )
             
             # Cargar imagen desde URL o path local
-            image_url = record.get("image_url", "")
-            image_path = record.get("image_path", "")
+            image_url = record.image_url
+            image_path = record.image_path
             
             if image_path:
                 # Si hay path local, usar ese
                 self.image_viewer.load_image(image_path)
             elif image_url:
-                # Si hay URL, cargar desde URL
-                self.image_viewer.load_image_from_url(image_url)
+                # Si hay URL, cargar el tamaño del visor (preview) si el servidor lo ofrece
+                self.image_viewer.load_image_from_url(image_url, record.variant("preview"))
             else:
                 self.image_viewer.clear_image()
             
+            if record.image_status == "pendiente":
+                # La imagen llega por el canal de cambios cuando termina la subida
+                self.statusBar().showMessage("⏳ La imagen del plato se está subiendo...", 3000)
+            
             # Actualizar contador de navegación
             self.toolbar.update_navigation_label(index + 1, len(self.records_data))
+            
+            self._prefetch_images(index, forward=index >= previous_index)
+    
+    def _load_record_later(self, index):
+        """
+        Selecciona un registro cuya página no está cargada: el formulario se
+        vacía y se completa cuando llega la página
+        """
+        self.current_record_index = index
+        self.form_fields.clear_data()
+        self._shown_record = None
+        self.image_viewer.clear_image()
+        self.toolbar.update_navigation_label(index + 1, len(self.records_data))
+        self.statusBar().showMessage("⏳ Cargando plato...", 2000)
+        # Si se navega de nuevo antes de que empiece, se pide solo el último
+        self.async_api.submit(
+            self.records_data.get, index,
+            callback=lambda record: self._on_record_loaded(index, record),
+            key="record"
+        )
+    
+    def _on_record_loaded(self, index, record):
+        if index != self.current_record_index:
+            return  # Ya se seleccionó otro registro
+        if record is None:
+            self.statusBar().showMessage("❌ No se pudo obtener el plato del servidor", 5000)
+            return
+        self.load_record(index)
+    
+    def _prefetch_images(self, index, forward=True):
+        """
+        Precarga las imágenes de los registros vecinos ya descargados,
+        alternando lados y empezando por la dirección en que se navega
+        """
+        step = 1 if forward else -1
+        urls = []
+        for distance in range(1, Config.IMAGE_PREFETCH_DISTANCE + 1):
+            for neighbor in (index + step * distance, index - step * distance):
+                record = self.records_data.peek(neighbor)
+                if record and record.image_url:
+                    urls.append(record.variant("preview") or record.image_url)
+        self.image_prefetcher.prefetch(urls)
     
     def handle_add_record(self):
         """Maneja la acción de agregar un nuevo registro"""
@@ -388,70 +550,68 @@ class MainWindow(QMainWindow):
             )
             return
         
-        try:
-            self.setCursor(QCursor(Qt.CursorShape.WaitCursor))
-            self.statusBar().showMessage("⏳ Agregando plato...")
-            
-            # Obtener la imagen del visor
-            image_path = self.image_viewer.get_current_image_path()
-            
-            # Llamar al API con la imagen
-            if image_path:
-                # Subir con archivo local
-                result = self.api_client.create_dish(
-                    nombre=data.get("name"),
-                    precio=precio_float,
-                    imagen_path=image_path
-                )
+        self.statusBar().showMessage("⏳ Agregando plato...")
+        
+        # Obtener la imagen del visor
+        image_path = self.image_viewer.get_current_image_path()
+        name = data.get("name")
+        
+        # Llamar al API en segundo plano; la interfaz sigue disponible
+        if image_path:
+            # Subir con archivo local
+            self.async_api.create_dish(
+                nombre=name,
+                precio=precio_float,
+                imagen_path=image_path,
+                callback=lambda result: self._on_dish_created(result, name)
+            )
+        else:
+            # Si no hay imagen, usar placeholder
+            self.async_api.create_dish(
+                nombre=name,
+                precio=precio_float,
+                imagen_url="https://via.placeholder.com/400",
+                callback=lambda result: self._on_dish_created(result, name)
+            )
+    
+    def _on_dish_created(self, result, name):
+        """Resultado de create_dish"""
+        if result.get('success'):
+            self.statusBar().showMessage("✅ Plato agregado exitosamente", 3000)
+            QMessageBox.information(
+                self,
+                "Éxito",
+                f"El plato '{name}' fue agregado correctamente."
+            )
+            # Agregar la fila devuelta por el servidor sin volver a descargar
+            dish = result.get('data') or {}
+            index = None
+            if dish.get('nombre') is not None:
+                index = self.records_data.confirm_insert(dish, result.get('version'))
+            if index is not None:
+                self.load_record(index)
             else:
-                # Si no hay imagen, usar placeholder
-                result = self.api_client.create_dish(
-                    nombre=data.get("name"),
-                    precio=precio_float,
-                    imagen_url="https://via.placeholder.com/400"
-                )
+                # Respuesta sin la fila: recargar alrededor del plato creado
+                # (sin ID, la última página, donde queda el recién creado)
+                dish_id = dish.get('id')
+                self.request_refresh(anchor_id=dish_id if dish_id is not None else END_CURSOR)
+        else:
+            error_msg = result.get('error', 'Error desconocido')
+            self.statusBar().showMessage(f"❌ Error al agregar: {error_msg}", 5000)
             
-            if result.get('success'):
-                self.statusBar().showMessage("✅ Plato agregado exitosamente", 3000)
-                QMessageBox.information(
+            # Mensaje específico para plato duplicado
+            if 'ya existe' in error_msg.lower():
+                QMessageBox.warning(
                     self,
-                    "Éxito",
-                    f"El plato '{data.get('name')}' fue agregado correctamente."
+                    "Plato Duplicado",
+                    f"Ya existe un plato con ese nombre en el menú.\n\n{error_msg}"
                 )
-                # Recargar datos
-                self.load_data_from_backend()
-                
-                # Ir al último registro (el recién creado)
-                if self.records_data:
-                    self.current_record_index = len(self.records_data) - 1
-                    self.load_record(self.current_record_index)
             else:
-                error_msg = result.get('error', 'Error desconocido')
-                self.statusBar().showMessage(f"❌ Error al agregar: {error_msg}", 5000)
-                
-                # Mensaje específico para plato duplicado
-                if 'ya existe' in error_msg.lower():
-                    QMessageBox.warning(
-                        self,
-                        "Plato Duplicado",
-                        f"Ya existe un plato con ese nombre en el menú.\n\n{error_msg}"
-                    )
-                else:
-                    QMessageBox.critical(
-                        self,
-                        "Error",
-                        f"No se pudo agregar el plato.\n\nError: {error_msg}"
-                    )
-            
-        except Exception as e:
-            self.statusBar().showMessage(f"❌ Error al agregar: {str(e)}", 5000)
-            QMessageBox.critical(
-                self,
-                "Error",
-                f"No se pudo agregar el plato.\n\nError: {str(e)}"
-            )
-        finally:
-            self.setCursor(QCursor(Qt.CursorShape.ArrowCursor))
+                QMessageBox.critical(
+                    self,
+                    "Error",
+                    f"No se pudo agregar el plato.\n\nError: {error_msg}"
+                )
     
     def handle_edit_record(self):
         """Maneja la acción de modificar el registro actual"""
@@ -459,9 +619,11 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Sin Registros", "No hay platos para modificar.")
             return
         
+        current_record = self._displayed_record()
+        if current_record is None:
+            return
         data = self.form_fields.get_data()
-        current_record = self.records_data[self.current_record_index]
-        dish_id = current_record.get("id")
+        dish_id = current_record.id
         
         if not dish_id:
             QMessageBox.warning(self, "Error", "No se puede identificar el plato.")
@@ -494,69 +656,74 @@ class MainWindow(QMainWindow):
             )
             return
         
-        try:
-            self.setCursor(QCursor(Qt.CursorShape.WaitCursor))
-            self.statusBar().showMessage("⏳ Actualizando plato...")
-            
-            # Obtener la imagen del visor
-            image_path = self.image_viewer.get_current_image_path()
-            
-            # Determinar si es un archivo local o una URL
-            is_local_file = image_path and not image_path.startswith(('http://', 'https://'))
-            
-            # Llamar al API
-            if is_local_file:
-                # Si hay una nueva imagen local, subirla
-                result = self.api_client.update_dish(
-                    dish_id=dish_id,
-                    nombre=data.get("name"),
-                    precio=precio_float,
-                    imagen_path=image_path
-                )
-            else:
-                # Mantener la URL actual (ya está en Cloudinary)
-                result = self.api_client.update_dish(
-                    dish_id=dish_id,
-                    nombre=data.get("name"),
-                    precio=precio_float,
-                    imagen_url=image_path if image_path else current_record.get("image_url", "")
-                )
-            
-            if result.get('success'):
-                self.statusBar().showMessage("✅ Plato actualizado exitosamente", 3000)
-                QMessageBox.information(
-                    self,
-                    "Éxito",
-                    f"El plato '{data.get('name')}' fue actualizado correctamente."
-                )
-                # Recargar datos
-                self.load_data_from_backend()
-                
-                # Buscar y mostrar el plato actualizado
-                if self.records_data:
-                    for i, record in enumerate(self.records_data):
-                        if record.get('id') == dish_id:
-                            self.current_record_index = i
-                            self.load_record(self.current_record_index)
-                            break
+        self.statusBar().showMessage("⏳ Actualizando plato...")
+        
+        # Obtener la imagen del visor
+        image_path = self.image_viewer.get_current_image_path()
+        name = data.get("name")
+        # Mostrar el cambio ya; se deshace si el servidor lo rechaza
+        previous = self.records_data.replace(
+            current_record.copy(name=name, raw_price=f"{precio_float:.2f}")
+        )
+        callback = lambda result: self._on_dish_updated(result, dish_id, name, previous)
+        
+        # Determinar si es un archivo local o una URL
+        is_local_file = image_path and not image_path.startswith(('http://', 'https://'))
+        
+        # Llamar al API en segundo plano
+        if is_local_file:
+            # Si hay una nueva imagen local, subirla
+            self.async_api.update_dish(
+                dish_id=dish_id,
+                nombre=name,
+                precio=precio_float,
+                imagen_path=image_path,
+                callback=callback
+            )
+        else:
+            # Mantener la URL actual (ya está en Cloudinary)
+            self.async_api.update_dish(
+                dish_id=dish_id,
+                nombre=name,
+                precio=precio_float,
+                imagen_url=image_path if image_path else current_record.image_url,
+                callback=callback
+            )
+    
+    def _on_dish_updated(self, result, dish_id, name, previous=None):
+        """Resultado de update_dish"""
+        if result.get('success'):
+            self.statusBar().showMessage("✅ Plato actualizado exitosamente", 3000)
+            if result.get('data'):
+                # Quedarse con la fila tal como la guardó el servidor
+                self.records_data.replace(dish_to_record(result['data']))
+                self._reload_if_current(dish_id)
             else:
-                error_msg = result.get('error', 'Error desconocido')
-                self.statusBar().showMessage(f"❌ Error al actualizar: {error_msg}", 5000)
-                QMessageBox.critical(
-                    self,
-                    "Error",
-                    f"No se pudo actualizar el plato.\n\nError: {error_msg}"
-                )
-            
-        except Exception as e:
-            self.statusBar().showMessage(f"❌ Error al actualizar: {str(e)}", 5000)
+                self.request_refresh(anchor_id=dish_id)
+            QMessageBox.information(
+                self,
+                "Éxito",
+                f"El plato '{name}' fue actualizado correctamente."
+            )
+        else:
+            if previous is not None:
+                self.records_data.replace(previous)
+                # El formulario muestra lo rechazado aunque la fila vuelva a ser la misma
+                self._reload_if_current(dish_id, force=True)
+            error_msg = result.get('error', 'Error desconocido')
+            self.statusBar().showMessage(f"❌ Error al actualizar: {error_msg}", 5000)
             QMessageBox.critical(
                 self,
                 "Error",
-                f"No se pudo actualizar el plato.\n\nError: {str(e)}"
+                f"No se pudo actualizar el plato.\n\nError: {error_msg}"
             )
-        finally:
-            self.setCursor(QCursor(Qt.CursorShape.ArrowCursor))
+    
+    def _reload_if_current(self, dish_id, force=False):
+        """Vuelve a mostrar el plato si es el seleccionado (si cambió, salvo force)"""
+        if self.records_data.index_of(dish_id) == self.current_record_index:
+            if force:
+                self._shown_record = None
+            self.load_record(self.current_record_index)
     
     def handle_delete_record(self):
         """Maneja la acción de eliminar el registro actual"""
@@ -564,9 +731,11 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Sin Registros", "No hay platos para eliminar.")
             return
         
-        current_record = self.records_data[self.current_record_index]
-        dish_id = current_record.get("id")
-        dish_name = current_record.get("name")
+        current_record = self._displayed_record()
+        if current_record is None:
+            return
+        dish_id = current_record.id
+        dish_name = current_record.name
         
         if not dish_id:
             QMessageBox.warning(self, "Error", "No se puede identificar el plato.")
@@ -584,55 +753,42 @@ class MainWindow(QMainWindow):
         if reply != QMessageBox.StandardButton.Yes:
             return
         
-        try:
-            self.setCursor(QCursor(Qt.CursorShape.WaitCursor))
-            self.statusBar().showMessage("⏳ Eliminando plato...")
-            
-            # Enviar al backend
-            result = self.api_client.delete_dish(dish_id)
-            
-            if result.get('success'):
-                self.statusBar().showMessage("✅ Plato eliminado exitosamente", 3000)
-                QMessageBox.information(
-                    self,
-                    "Éxito",
-                    f"El plato '{dish_name}' fue eliminado correctamente."
-                )
-                # Recargar datos
-                self.load_data_from_backend()
-                
-                # Ajustar navegación después de eliminar
-                if not self.records_data:
-                    # No hay más platos
-                    self.current_record_index = -1
-                    self.form_fields.clear_data()
-                    self.image_viewer.clear_image()
-                    self.toolbar.update_navigation_label(0, 0)
-                else:
-                    # Ajustar el índice si está fuera de rango
-                    if self.current_record_index >= len(self.records_data):
-                        self.current_record_index = len(self.records_data) - 1
-                    # Cargar el plato en la posición actual
-                    if self.current_record_index >= 0:
-                        self.load_record(self.current_record_index)
+        # Quitarlo de la vista ya (queda el siguiente); se restaura si el servidor lo rechaza
+        removed = self.records_data.remove(dish_id)
+        self._restore_selection(None)
+        self.statusBar().showMessage("⏳ Eliminando plato...")
+        
+        # Enviar al backend en segundo plano
+        self.async_api.delete_dish(
+            dish_id,
+            callback=lambda result: self._on_dish_deleted(result, dish_id, dish_name, removed)
+        )
+    
+    def _on_dish_deleted(self, result, dish_id, dish_name, removed=None):
+        """Resultado de delete_dish"""
+        if result.get('success'):
+            self.statusBar().showMessage("✅ Plato eliminado exitosamente", 3000)
+            if removed is not None:
+                self.records_data.confirm_delete(dish_id, result.get('version'))
             else:
-                error_msg = result.get('error', 'Error desconocido')
-                self.statusBar().showMessage(f"❌ Error al eliminar: {error_msg}", 5000)
-                QMessageBox.critical(
-                    self,
-                    "Error",
-                    f"No se pudo eliminar el plato.\n\nError: {error_msg}"
-                )
-            
-        except Exception as e:
-            self.statusBar().showMessage(f"❌ Error al eliminar: {str(e)}", 5000)
+                # No estaba cargado: recargar desde su posición
+                self.request_refresh(anchor_id=dish_id)
+            QMessageBox.information(
+                self,
+                "Éxito",
+                f"El plato '{dish_name}' fue eliminado correctamente."
+            )
+        else:
+            if removed is not None:
+                self.records_data.restore(removed)
+                self._restore_selection(dish_id)
+            error_msg = result.get('error', 'Error desconocido')
+            self.statusBar().showMessage(f"❌ Error al eliminar: {error_msg}", 5000)
             QMessageBox.critical(
                 self,
                 "Error",
-                f"No se pudo eliminar el plato.\n\nError: {str(e)}"
+                f"No se pudo eliminar el plato.\n\nError: {error_msg}"
             )
-        finally:
-            self.setCursor(QCursor(Qt.CursorShape.ArrowCursor))
     
     def handle_previous_record(self):
         """Navega al registro anterior"""
@@ -662,17 +818,19 @@ class MainWindow(QMainWindow):
         print("🖨️ ACCIÓN: Imprimir registro actual")
         
         # Obtener datos del registro actual (formulario + datos del registro)
+        record = self._displayed_record()
+        if record is None:
+            return
         data = self.form_fields.get_data()
 
-        record = self.records_data[self.current_record_index]
-
         # Preparar documento para impresión
         document_data = {
             "name": data.get("name", "Sin nombre"),
             "price": f"${data.get('price', '0.00')}",
             "date": data.get("date", ""),
-            "image_path": record.get("image_path", ""),
-            "image_url": record.get("image_url", "")
+            "image_path": record.image_path,
+            "image_url": record.image_url,
+            "image_print_url": record.variant("print")
         }
         
         # Llamar al gestor de impresión
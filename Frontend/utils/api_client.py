@@ -3,9 +3,31 @@ Cliente para comunicarse con el backend REST API
 Gestiona todas las peticiones HTTP al servidor
 """
 
+import threading
+from collections import OrderedDict
+
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, Optional, Any
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
 from utils.config import Config
+from utils.json_codec import dumps, response_json
+from utils.record_source import dish_to_record, records_from_columns
+
+try:
+    import msgpack
+except ImportError:  # Sin msgpack el menú se pide por columnas en JSON
+    msgpack = None
+
+
+# Formatos de GET /menu por columnas (ver Backend/utils/menu_formats.py)
+MENU_COLUMNAR = "application/vnd.restaurante.columnar+json"
+MENU_MSGPACK = "application/vnd.restaurante.columnar+msgpack"
+MENU_ACCEPT = ", ".join(
+    ([MENU_MSGPACK] if msgpack is not None else [])
+    + [f"{MENU_COLUMNAR};q=0.9", "application/json;q=0.5"]
+)
 
 
 class APIClient:
@@ -14,6 +36,70 @@ class APIClient:
     # URL del backend (se carga desde .env)
     BASE_URL = Config.get_backend_url()
     TIMEOUT = Config.REQUEST_TIMEOUT
+    CONNECT_TIMEOUT = Config.CONNECT_TIMEOUT
+    
+    # Tiempo máximo de lectura (segundos) según el tipo de petición
+    TIMEOUTS = {
+        "health": 3,
+        "read": TIMEOUT,
+        "write": TIMEOUT,
+        "image": TIMEOUT,
+        "bulk": TIMEOUT * 6,  # Un lote grande tarda más que una petición individual
+    }
+    
+    # Sesión HTTP compartida (conexiones persistentes); se crea al primer uso
+    _session = None
+    _session_lock = threading.Lock()
+    
+    # Última respuesta de GET /menu como (etag, registros, versión)
+    _menu_cache = None
+    # Respuestas de GET /menu/<id> como {id: (etag, plato)}, de menos a más usada
+    _dish_cache = OrderedDict()
+    _dish_cache_lock = threading.Lock()
+    DISH_CACHE_SIZE = 256
+    
+    @classmethod
+    def session(cls) -> requests.Session:
+        """
+        Sesión HTTP compartida por el cliente, el visor de imágenes y la impresión
+        
+        Mantiene las conexiones abiertas (keep-alive) en un pool de
+        HTTP_POOL_SIZE por servidor. Los métodos idempotentes (GET, PUT,
+        DELETE...) se reintentan HTTP_RETRIES veces ante errores de
+        conexión o respuestas 502/503/504, con espera exponencial y
+        aleatoria; POST y PATCH solo si la conexión no llegó a abrirse.
+        Acepta respuestas comprimidas con gzip y, si está instalado el
+        paquete brotli, br (el menú completo pesa varias veces menos).
+        """
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    retry = Retry(
+                        total=Config.HTTP_RETRIES,
+                        backoff_factor=Config.HTTP_BACKOFF,
+                        backoff_jitter=Config.HTTP_BACKOFF,
+                        backoff_max=5,
+                        status_forcelist=(502, 503, 504),
+                        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+                        raise_on_status=False
+                    )
+                    adapter = HTTPAdapter(
+                        pool_connections=2,
+                        pool_maxsize=Config.HTTP_POOL_SIZE,
+                        max_retries=retry
+                    )
+                    session = requests.Session()
+                    # "gzip,deflate" más br/zstd según lo que urllib3 pueda descomprimir
+                    session.headers.update(make_headers(accept_encoding=True))
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    cls._session = session
+        return cls._session
+    
+    @classmethod
+    def timeout(cls, kind: str, extra: float = 0):
+        """(conexión, lectura) para el tipo de petición indicado"""
+        return (cls.CONNECT_TIMEOUT, cls.TIMEOUTS[kind] + extra)
     
     @classmethod
     def set_base_url(cls, url: str):
@@ -24,6 +110,10 @@ class APIClient:
             url: URL completa del backend (ej: http://192.168.1.100:5000)
         """
         cls.BASE_URL = url.rstrip('/')
+        # Las respuestas guardadas pertenecen al servidor anterior
+        cls._menu_cache = None
+        with cls._dish_cache_lock:
+            cls._dish_cache.clear()
         print(f"✓ URL del backend configurada: {cls.BASE_URL}")
     
     @classmethod
@@ -35,15 +125,15 @@ class APIClient:
             Dict con status del servidor
         """
         try:
-            response = requests.get(
+            response = cls.session().get(
                 f"{cls.BASE_URL}/health",
-                timeout=cls.TIMEOUT
+                timeout=cls.timeout("health")
             )
             
             if response.status_code == 200:
                 return {
                     "success": True,
-                    "data": response.json()
+                    "data": response_json(response)
                 }
             else:
                 return {
@@ -67,26 +157,66 @@ class APIClient:
                 "error": f"Error inesperado: {str(e)}"
             }
     
+    @staticmethod
+    def _menu_payload(response) -> Dict[str, Any]:
+        """
+        Cuerpo de GET /menu en cualquiera de sus formatos
+        
+        Los platos (por filas o por columnas) quedan ya convertidos en
+        "records" (DishRecord); el resto de las claves no cambia.
+        """
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        if content_type == MENU_MSGPACK and msgpack is not None:
+            data = msgpack.unpackb(response.content)
+        else:
+            data = response_json(response)
+        if 'columns' in data:
+            data['records'] = records_from_columns(data.pop('columns'))
+        else:
+            data['records'] = [dish_to_record(dish) for dish in data.pop('data', None) or []]
+        return data
+    
     @classmethod
     def get_all_dishes(cls) -> Dict[str, Any]:
         """
         Obtiene todos los platos del menú
         
+        Pide el formato por columnas (MessagePack si está instalado) y
+        envía el ETag de la última descarga; si el servidor responde
+        304 Not Modified se reutiliza la lista guardada.
+        
         Returns:
-            Dict con lista de platos o error
+            Dict con records (lista de DishRecord) y version, o error
         """
         try:
-            response = requests.get(
+            cached = cls._menu_cache
+            headers = {'Accept': MENU_ACCEPT}
+            if cached:
+                headers['If-None-Match'] = cached[0]
+            response = cls.session().get(
                 f"{cls.BASE_URL}/menu",
-                timeout=cls.TIMEOUT
+                headers=headers,
+                timeout=cls.timeout("read")
             )
             
-            data = response.json()
+            if response.status_code == 304 and cached:
+                return {
+                    "success": True,
+                    "records": cached[1],
+                    "version": cached[2],
+                    "not_modified": True
+                }
+            
+            data = cls._menu_payload(response)
             
             if data.get('code') == 200:
+                records = data['records']
+                etag = response.headers.get('ETag')
+                cls._menu_cache = (etag, records, data.get('version')) if etag else None
                 return {
                     "success": True,
-                    "data": data.get('data', [])
+                    "records": records,
+                    "version": data.get('version')
                 }
             else:
                 return {
@@ -100,6 +230,136 @@ class APIClient:
                 "error": f"Error al obtener platos: {str(e)}"
             }
     
+    @classmethod
+    def get_dishes_page(cls, limit: int, after_id: Optional[int] = None,
+                        before_id: Optional[int] = None,
+                        with_total: bool = False) -> Dict[str, Any]:
+        """
+        Obtiene una página del menú ordenada por id
+        
+        Args:
+            limit: Cantidad de platos por página
+            after_id: Cursor hacia adelante (ids mayores a este)
+            before_id: Cursor hacia atrás (ids menores a este)
+            with_total: Pedir también el total y la posición de la página
+            
+        Returns:
+            Dict con records (lista de DishRecord), next_cursor,
+            prev_cursor, version y, si se pidió, total y offset
+        """
+        try:
+            params = {'limit': limit}
+            if after_id is not None:
+                params['after_id'] = after_id
+            if before_id is not None:
+                params['before_id'] = before_id
+            if with_total:
+                params['with_total'] = 1
+            
+            response = cls.session().get(
+                f"{cls.BASE_URL}/menu",
+                params=params,
+                headers={'Accept': MENU_ACCEPT},
+                timeout=cls.timeout("read")
+            )
+            
+            data = cls._menu_payload(response)
+            
+            if data.get('code') == 200:
+                return {
+                    "success": True,
+                    "records": data['records'],
+                    "next_cursor": data.get('next_cursor'),
+                    "prev_cursor": data.get('prev_cursor'),
+                    "total": data.get('total'),
+                    "offset": data.get('offset'),
+                    "version": data.get('version')
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": data.get('message', 'Error desconocido')
+                }
+                
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error al obtener platos: {str(e)}"
+            }
+    
+    @classmethod
+    def get_changes(cls, since: Optional[int], wait: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Obtiene los cambios del menú posteriores a una versión
+        
+        Args:
+            since: Última versión conocida (None fuerza resincronización)
+            wait: Segundos que el servidor puede esperar a que haya cambios (long-poll)
+            
+        Returns:
+            Dict con version, resync, inserted, updated y deleted
+        """
+        try:
+            params = {'since': since} if since is not None else {}
+            timeout = cls.timeout("read")
+            if wait:
+                params['wait'] = wait
+                timeout = cls.timeout("read", wait)
+            
+            response = cls.session().get(
+                f"{cls.BASE_URL}/menu/changes",
+                params=params,
+                timeout=timeout
+            )
+            
+            data = response_json(response)
+            
+            if data.get('code') == 200:
+                return {
+                    "success": True,
+                    "data": data.get('data', {})
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": data.get('message', 'Error desconocido')
+                }
+                
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error al obtener cambios: {str(e)}"
+            }
+    
+    @classmethod
+    def open_change_stream(cls, since: Optional[int], heartbeat: float = 15) -> requests.Response:
+        """
+        Abre el canal SSE de cambios del menú (GET /menu/stream)
+        
+        Args:
+            since: Última versión conocida
+            heartbeat: Cada cuántos segundos el servidor envía un keep-alive;
+                si pasan tres intervalos sin datos la conexión se da por caída
+            
+        Returns:
+            Respuesta en modo streaming; el llamador debe cerrarla
+            
+        Raises:
+            requests.RequestException: si no se puede abrir el canal
+        """
+        params = {'heartbeat': heartbeat}
+        if since is not None:
+            params['since'] = since
+        response = cls.session().get(
+            f"{cls.BASE_URL}/menu/stream",
+            params=params,
+            headers={'Accept': 'text/event-stream'},
+            stream=True,
+            timeout=(cls.CONNECT_TIMEOUT, heartbeat * 3)
+        )
+        response.raise_for_status()
+        return response
+    
     @classmethod
     def get_dish_by_id(cls, dish_id: int) -> Dict[str, Any]:
         """
@@ -112,14 +372,33 @@ class APIClient:
             Dict con datos del plato o error
         """
         try:
-            response = requests.get(
+            with cls._dish_cache_lock:
+                cached = cls._dish_cache.get(dish_id)
+                if cached:
+                    cls._dish_cache.move_to_end(dish_id)
+            headers = {'If-None-Match': cached[0]} if cached else {}
+            response = cls.session().get(
                 f"{cls.BASE_URL}/menu/{dish_id}",
-                timeout=cls.TIMEOUT
+                headers=headers,
+                timeout=cls.timeout("read")
             )
             
-            data = response.json()
+            if response.status_code == 304 and cached:
+                return {
+                    "success": True,
+                    "data": cached[1]
+                }
+            
+            data = response_json(response)
             
             if data.get('code') == 200:
+                etag = response.headers.get('ETag')
+                if etag:
+                    with cls._dish_cache_lock:
+                        cls._dish_cache[dish_id] = (etag, data.get('data'))
+                        cls._dish_cache.move_to_end(dish_id)
+                        while len(cls._dish_cache) > cls.DISH_CACHE_SIZE:
+                            cls._dish_cache.popitem(last=False)
                 return {
                     "success": True,
                     "data": data.get('data')
@@ -161,11 +440,12 @@ class APIClient:
                         'precio': str(precio)
                     }
                     
-                    response = requests.post(
+                    response = cls.session().post(
                         f"{cls.BASE_URL}/menu",
                         files=files,
                         data=data,
-                        timeout=30  # Más tiempo para subir imagen
+                        # El servidor sube la imagen en segundo plano: no hace falta esperar más
+                        timeout=cls.timeout("write")
                     )
             
             # Si solo hay URL, usar JSON
@@ -176,10 +456,10 @@ class APIClient:
                     'imagen_url': imagen_url
                 }
                 
-                response = requests.post(
+                response = cls.session().post(
                     f"{cls.BASE_URL}/menu",
                     json=json_data,
-                    timeout=cls.TIMEOUT
+                    timeout=cls.timeout("write")
                 )
             
             else:
@@ -188,12 +468,17 @@ class APIClient:
                     "error": "Debe proporcionar una imagen (archivo o URL)"
                 }
             
-            result = response.json()
+            result = response_json(response)
             
             if result.get('code') == 201:
                 return {
                     "success": True,
-                    "message": result.get('message', 'Plato creado exitosamente')
+                    "message": result.get('message', 'Plato creado exitosamente'),
+                    # Fila guardada (el servidor la incluye con su id) y versión del menú
+                    "data": result.get('data') or {"id": result.get('id')},
+                    "version": result.get('version'),
+                    # Subida de imagen en curso (solo si se envió un archivo)
+                    "image_job": result.get('image_job')
                 }
             else:
                 return {
@@ -239,11 +524,11 @@ class APIClient:
                         'precio': str(precio)
                     }
                     
-                    response = requests.put(
+                    response = cls.session().put(
                         f"{cls.BASE_URL}/menu/{dish_id}",
                         files=files,
                         data=data,
-                        timeout=30
+                        timeout=cls.timeout("write")
                     )
             
             # Si hay URL o no hay imagen nueva, usar JSON
@@ -256,18 +541,21 @@ class APIClient:
                 if imagen_url:
                     json_data['imagen_url'] = imagen_url
                 
-                response = requests.put(
+                response = cls.session().put(
                     f"{cls.BASE_URL}/menu/{dish_id}",
                     json=json_data,
-                    timeout=cls.TIMEOUT
+                    timeout=cls.timeout("write")
                 )
             
-            result = response.json()
+            result = response_json(response)
             
             if result.get('code') == 200:
                 return {
                     "success": True,
-                    "message": result.get('message', 'Plato actualizado exitosamente')
+                    "message": result.get('message', 'Plato actualizado exitosamente'),
+                    "data": result.get('data'),
+                    "version": result.get('version'),
+                    "image_job": result.get('image_job')
                 }
             else:
                 return {
@@ -281,6 +569,42 @@ class APIClient:
                 "error": f"Error al actualizar plato: {str(e)}"
             }
     
+    @classmethod
+    def get_image_job(cls, job_id: str) -> Dict[str, Any]:
+        """
+        Consulta el estado de una subida de imagen en segundo plano
+        
+        Args:
+            job_id: ID recibido en image_job al crear o actualizar
+            
+        Returns:
+            Dict con el trabajo (status: pending, running, done o failed)
+        """
+        try:
+            response = cls.session().get(
+                f"{cls.BASE_URL}/images/jobs/{job_id}",
+                timeout=cls.timeout("read")
+            )
+            
+            result = response_json(response)
+            
+            if result.get('code') == 200:
+                return {
+                    "success": True,
+                    "data": result.get('data', {})
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": result.get('message', 'Trabajo no encontrado')
+                }
+                
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error al consultar la subida: {str(e)}"
+            }
+    
     @classmethod
     def delete_dish(cls, dish_id: int) -> Dict[str, Any]:
         """
@@ -293,17 +617,20 @@ class APIClient:
             Dict con resultado de la operación
         """
         try:
-            response = requests.delete(
+            response = cls.session().delete(
                 f"{cls.BASE_URL}/menu/{dish_id}",
-                timeout=cls.TIMEOUT
+                timeout=cls.timeout("write")
             )
             
-            result = response.json()
+            result = response_json(response)
             
             if result.get('code') == 200:
+                with cls._dish_cache_lock:
+                    cls._dish_cache.pop(dish_id, None)
                 return {
                     "success": True,
-                    "message": result.get('message', 'Plato eliminado exitosamente')
+                    "message": result.get('message', 'Plato eliminado exitosamente'),
+                    "version": result.get('version')
                 }
             else:
                 return {
@@ -316,6 +643,78 @@ class APIClient:
                 "success": False,
                 "error": f"Error al eliminar plato: {str(e)}"
             }
+    
+    @classmethod
+    def _bulk(cls, method: str, payload: list, action: str) -> Dict[str, Any]:
+        """Envía un lote a /menu/bulk y retorna los resultados por elemento"""
+        try:
+            response = cls.session().request(
+                method,
+                f"{cls.BASE_URL}/menu/bulk",
+                data=dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=cls.timeout("bulk")
+            )
+            
+            result = response_json(response)
+            
+            if result.get('code') == 200:
+                return {
+                    "success": True,
+                    "message": result.get('message'),
+                    "results": result.get('results', []),
+                    "failed": result.get('failed', 0)
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": result.get('message', f'Error al {action} platos')
+                }
+                
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error al {action} platos: {str(e)}"
+            }
+    
+    @classmethod
+    def bulk_create_dishes(cls, dishes: list) -> Dict[str, Any]:
+        """
+        Crea varios platos en una sola petición
+        
+        Args:
+            dishes: Lista de dicts con nombre, precio e imagen_url
+            
+        Returns:
+            Dict con results (uno por plato, en el mismo orden) y failed
+        """
+        return cls._bulk("POST", dishes, "crear")
+    
+    @classmethod
+    def bulk_update_dishes(cls, dishes: list) -> Dict[str, Any]:
+        """
+        Actualiza varios platos en una sola petición
+        
+        Args:
+            dishes: Lista de dicts con id y los campos a cambiar
+            
+        Returns:
+            Dict con results (uno por plato, en el mismo orden) y failed
+        """
+        return cls._bulk("PATCH", dishes, "actualizar")
+    
+    @classmethod
+    def bulk_delete_dishes(cls, dish_ids: list) -> Dict[str, Any]:
+        """
+        Elimina varios platos en una sola petición
+        
+        Args:
+            dish_ids: Lista de IDs
+            
+        Returns:
+            Dict con results (uno por ID, en el mismo orden) y failed
+        """
+        return cls._bulk("DELETE", dish_ids, "eliminar")
 
 
 # Configuración para pruebas
@@ -0,0 +1,95 @@
+"""
+Cliente asíncrono de la API para la interfaz
+Ejecuta las peticiones en un hilo de trabajo, en orden, y entrega los
+resultados en el hilo de la interfaz mediante una señal de Qt
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class AsyncAPIClient(QObject):
+    """
+    Cola de peticiones a la API que no bloquea la interfaz
+
+    Cualquier método de APIClient se puede llamar igual que en el cliente
+    síncrono, con dos argumentos extra:
+
+        callback: función que recibe el resultado en el hilo de la interfaz
+        key: peticiones con la misma clave que todavía esperan en la cola
+             se combinan en una sola (gana la última llamada)
+
+    Cada llamada retorna un concurrent.futures.Future con el dict de
+    resultado. Las peticiones se ejecutan de a una y en el orden en que
+    se encolaron, así una recarga pedida después de una escritura ya ve
+    ese cambio.
+    """
+
+    # (callback, resultado): se emite desde el hilo de trabajo
+    _finished = pyqtSignal(object, object)
+
+    def __init__(self, api_client, parent=None):
+        super().__init__(parent)
+        self.api_client = api_client
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-queue")
+        self._lock = threading.Lock()
+        self._queued = {}  # clave -> petición en cola que todavía no empezó
+        self._finished.connect(self._deliver)
+
+    def __getattr__(self, name):
+        method = getattr(self.api_client, name)
+        if not callable(method):
+            return method
+
+        def call(*args, callback=None, key=None, **kwargs):
+            return self.submit(method, *args, callback=callback, key=key, **kwargs)
+        return call
+
+    def submit(self, func, *args, callback=None, key=None, **kwargs):
+        """
+        Encola una función cualquiera (por ejemplo RecordSource.reload)
+
+        Returns:
+            Future con el resultado de func
+        """
+        with self._lock:
+            request = self._queued.get(key) if key is not None else None
+            if request is not None:
+                # Ya hay una igual esperando: actualizarla en lugar de repetirla
+                request.update(func=func, args=args, kwargs=kwargs, callback=callback)
+                return request["future"]
+            request = {
+                "func": func, "args": args, "kwargs": kwargs,
+                "callback": callback, "key": key, "future": Future()
+            }
+            if key is not None:
+                self._queued[key] = request
+        self._executor.submit(self._run, request)
+        return request["future"]
+
+    def _run(self, request):
+        with self._lock:
+            if request["key"] is not None and self._queued.get(request["key"]) is request:
+                del self._queued[request["key"]]
+            func, args, kwargs = request["func"], request["args"], request["kwargs"]
+            callback = request["callback"]
+
+        future = request["future"]
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        future.set_result(result)
+        if callback is not None:
+            self._finished.emit(callback, result)
+
+    def _deliver(self, callback, result):
+        callback(result)
+
+    def close(self):
+        """Descarta las peticiones que no empezaron"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
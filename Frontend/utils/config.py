@@ -18,8 +18,28 @@ class Config:
     # URL del backend
     BACKEND_URL = os.getenv('BACKEND_URL', 'http://localhost:5000')
     
-    # Timeout para peticiones
+    # Timeout para peticiones (lectura) y para abrir la conexión
     REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '10'))
+    CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', '3'))
+    
+    # Conexiones HTTP persistentes y reintentos de peticiones idempotentes
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+    HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '3'))
+    HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', '0.3'))  # Segundos base de la espera exponencial
+    
+    # Navegación por páginas: platos por página y páginas en memoria
+    PAGE_SIZE = int(os.getenv('PAGE_SIZE', '50'))
+    MAX_CACHED_PAGES = int(os.getenv('MAX_CACHED_PAGES', '5'))
+    
+    # Caché de imágenes: carpeta y tamaño máximo en disco, memoria para imágenes decodificadas
+    IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR') or str(Path.home() / '.cache' / 'gestor_menu' / 'images')
+    IMAGE_CACHE_MAX_MB = int(os.getenv('IMAGE_CACHE_MAX_MB', '200'))
+    IMAGE_MEMORY_CACHE_MB = int(os.getenv('IMAGE_MEMORY_CACHE_MB', '64'))
+    
+    # Precarga de imágenes vecinas: registros a cada lado y presupuesto por navegación
+    IMAGE_PREFETCH_DISTANCE = int(os.getenv('IMAGE_PREFETCH_DISTANCE', '3'))
+    IMAGE_PREFETCH_MAX_MB = int(os.getenv('IMAGE_PREFETCH_MAX_MB', '8'))
+    IMAGE_PREFETCH_MEMORY_MB = int(os.getenv('IMAGE_PREFETCH_MEMORY_MB', '24'))
     
     # Configuración de la aplicación
     APP_NAME = "Gestor de Menú - Restaurante"
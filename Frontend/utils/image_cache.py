@@ -0,0 +1,373 @@
+"""
+Caché de imágenes descargadas
+Guarda las imágenes en disco (acotado por tamaño) y las ya decodificadas
+en memoria, para no volver a descargarlas al navegar entre platos
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from PyQt6.QtGui import QImage, QPixmap
+
+from utils.api_client import APIClient
+from utils.config import Config
+
+
+class DiskImageCache:
+    """
+    Respuestas de imágenes en disco, indexadas por el SHA-256 de la URL
+
+    Cada entrada son dos archivos: <clave> con el contenido y
+    <clave>.json con la URL, ETag, Last-Modified y hasta cuándo está
+    fresca. Mientras está fresca se entrega sin usar la red; después se
+    revalida con If-None-Match / If-Modified-Since y un 304 solo renueva
+    la fecha. Si se supera max_bytes se borran las menos usadas.
+    """
+
+    MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+    def __init__(self, directory, max_bytes, default_ttl=3600, timeout=10, session=None):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl  # Frescura si el servidor no indica max-age
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # clave -> bytes en disco, de menos a más usada
+        self._total = 0
+        self._fetching = {}  # url -> [lock, hilos usándolo]: una sola descarga por URL
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Reconstruye el índice LRU con la fecha de último uso de cada archivo"""
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json") or name.startswith("tmp"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                found.append((os.path.getmtime(path), name, os.path.getsize(path)))
+            except OSError:
+                continue
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _read_meta(self, key):
+        try:
+            with open(self._path(key) + ".json", encoding="utf-8") as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_file(self, path, content):
+        # Escribir aparte y renombrar: otro hilo nunca lee un archivo a medias
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _expires(self, response):
+        """Momento hasta el que la respuesta está fresca según Cache-Control"""
+        cache_control = response.headers.get("Cache-Control", "").lower()
+        if "no-cache" in cache_control or "no-store" in cache_control:
+            return 0
+        match = self.MAX_AGE_PATTERN.search(cache_control)
+        ttl = int(match.group(1)) if match else self.default_ttl
+        return time.time() + ttl
+
+    # ==================== ENTRADAS ====================
+
+    def lookup(self, url):
+        """
+        Entrada guardada para la URL, sin usar la red
+
+        Returns:
+            (contenido, metadatos) o None
+        """
+        key = self.key_for(url)
+        meta = self._read_meta(key)
+        if meta is None or meta.get("url") != url:
+            return None
+        try:
+            with open(self._path(key), "rb") as data_file:
+                content = data_file.read()
+        except OSError:
+            return None
+        self._touch(key)
+        return content, meta
+
+    def is_fresh(self, url):
+        """True si hay una copia en disco que se puede usar sin revalidar"""
+        meta = self._read_meta(self.key_for(url))
+        return meta is not None and meta.get("url") == url and meta.get("expires", 0) > time.time()
+
+    def _touch(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            # La fecha de modificación conserva el orden LRU entre sesiones
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def store(self, url, content, meta):
+        key = self.key_for(url)
+        meta = dict(meta, url=url)
+        try:
+            self._write_file(self._path(key), content)
+            self._write_file(self._path(key) + ".json", json.dumps(meta).encode("utf-8"))
+        except OSError as e:
+            print(f"⚠️  No se pudo guardar la imagen en caché: {e}")
+            return
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+            self._entries[key] = len(content)
+            self._total += len(content)
+            evicted = self._evict_locked()
+        for old_key in evicted:
+            self._remove_files(old_key)
+
+    def _update_meta(self, url, meta):
+        key = self.key_for(url)
+        try:
+            self._write_file(self._path(key) + ".json", json.dumps(meta).encode("utf-8"))
+        except OSError:
+            pass
+
+    def _evict_locked(self):
+        evicted = []
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            evicted.append(key)
+        return evicted
+
+    def _remove_files(self, key):
+        for path in (self._path(key), self._path(key) + ".json"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Elimina todas las imágenes guardadas"""
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+            self._total = 0
+        for key in keys:
+            self._remove_files(key)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._total, "max_bytes": self.max_bytes}
+
+    # ==================== DESCARGA ====================
+
+    def fetch(self, url, timeout=None):
+        """
+        Contenido de la imagen, desde disco si está fresca o desde la red
+
+        Si otro hilo ya está descargando la misma URL se espera su
+        resultado en lugar de descargarla dos veces.
+
+        Returns:
+            (contenido, vence) o None si no se pudo obtener
+        """
+        with self._lock:
+            entry = self._fetching.setdefault(url, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                return self._fetch(url, timeout)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._fetching[url]
+
+    def _fetch(self, url, timeout):
+        cached = self.lookup(url)
+        if cached is not None and cached[1].get("expires", 0) > time.time():
+            return cached[0], cached[1]["expires"]
+
+        headers = {}
+        if cached is not None:
+            if cached[1].get("etag"):
+                headers["If-None-Match"] = cached[1]["etag"]
+            if cached[1].get("last_modified"):
+                headers["If-Modified-Since"] = cached[1]["last_modified"]
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error al descargar imagen: {e}")
+            # Sin conexión sirve la copia vencida antes que nada
+            return (cached[0], 0) if cached is not None else None
+
+        if response.status_code == 304 and cached is not None:
+            meta = dict(cached[1], expires=self._expires(response))
+            self._update_meta(url, meta)
+            return cached[0], meta["expires"]
+
+        if response.status_code != 200:
+            print(f"❌ Error al descargar imagen: HTTP {response.status_code}")
+            return (cached[0], 0) if cached is not None else None
+
+        meta = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "expires": self._expires(response)
+        }
+        if "no-store" not in response.headers.get("Cache-Control", "").lower():
+            self.store(url, response.content, meta)
+        return response.content, meta["expires"]
+
+
+class ImageCache:
+    """
+    Caché de dos niveles compartida por el visor y la impresión
+
+    Nivel 1: QPixmap ya decodificados en un LRU en memoria, acotado por
+    la memoria que ocupan. Nivel 2: DiskImageCache. Una imagen vista
+    antes y todavía fresca se muestra sin usar la red ni decodificarla.
+    Los QPixmap solo se crean en el hilo de la interfaz; desde otros
+    hilos se usa load_image(), que retorna QImage.
+    """
+
+    _shared = None
+
+    def __init__(self, disk_cache, memory_bytes):
+        self.disk = disk_cache
+        self.memory_bytes = memory_bytes
+        self._lock = threading.Lock()
+        self._pixmaps = OrderedDict()  # url -> (vence, QPixmap, bytes que ocupa)
+        self._memory_total = 0
+
+    @classmethod
+    def shared(cls):
+        """Instancia común de la aplicación, configurada desde Config"""
+        if cls._shared is None:
+            # Las descargas usan las conexiones persistentes del cliente de la API
+            disk_cache = DiskImageCache(
+                Config.IMAGE_CACHE_DIR,
+                Config.IMAGE_CACHE_MAX_MB * 1024 * 1024,
+                timeout=APIClient.timeout("image"),
+                session=APIClient.session()
+            )
+            cls._shared = cls(disk_cache, Config.IMAGE_MEMORY_CACHE_MB * 1024 * 1024)
+        return cls._shared
+
+    def cached_pixmap(self, url):
+        """QPixmap fresco en memoria, o None"""
+        with self._lock:
+            entry = self._pixmaps.get(url)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._drop_locked(url)
+                return None
+            self._pixmaps.move_to_end(url)
+            return entry[1]
+
+    def _drop_locked(self, url):
+        entry = self._pixmaps.pop(url, None)
+        if entry is not None:
+            self._memory_total -= entry[2]
+
+    def put_pixmap(self, url, pixmap, expires):
+        if pixmap.isNull() or expires <= time.time():
+            return
+        cost = pixmap.width() * pixmap.height() * 4
+        with self._lock:
+            self._drop_locked(url)
+            self._pixmaps[url] = (expires, pixmap, cost)
+            self._memory_total += cost
+            while self._memory_total > self.memory_bytes and len(self._pixmaps) > 1:
+                old_url = next(iter(self._pixmaps))
+                self._drop_locked(old_url)
+
+    def load_pixmap(self, url, timeout=None):
+        """
+        Imagen lista para mostrar (solo desde el hilo de la interfaz)
+
+        Returns:
+            QPixmap o None si no se pudo obtener
+        """
+        pixmap = self.cached_pixmap(url)
+        if pixmap is not None:
+            return pixmap
+        fetched = self.disk.fetch(url, timeout)
+        if fetched is None:
+            return None
+        content, expires = fetched
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(content):
+            return None
+        self.put_pixmap(url, pixmap, expires)
+        return pixmap
+
+    def load_image(self, url, timeout=None):
+        """
+        Imagen decodificada como QImage (se puede usar desde cualquier hilo;
+        no consulta los QPixmap en memoria, sí el disco)
+
+        Returns:
+            QImage o None si no se pudo obtener
+        """
+        decoded = self.decode_image(url, timeout)
+        return decoded[0] if decoded else None
+
+    def decode_image(self, url, timeout=None):
+        """
+        Descarga (o lee del disco) y decodifica la imagen, desde cualquier hilo
+
+        Returns:
+            (QImage, vence) o None si no se pudo obtener
+        """
+        fetched = self.disk.fetch(url, timeout)
+        if fetched is None:
+            return None
+        image = QImage()
+        return (image, fetched[1]) if image.loadFromData(fetched[0]) else None
+
+    def put_image(self, url, image, expires):
+        """
+        Guarda en memoria una imagen decodificada en otro hilo (solo desde
+        el hilo de la interfaz)
+
+        Returns:
+            QPixmap listo para mostrar
+        """
+        pixmap = QPixmap.fromImage(image)
+        self.put_pixmap(url, pixmap, expires)
+        return pixmap
+
+    def clear(self):
+        """Vacía ambos niveles"""
+        with self._lock:
+            self._pixmaps.clear()
+            self._memory_total = 0
+        self.disk.clear()
@@ -0,0 +1,116 @@
+"""
+Precarga de imágenes de los platos vecinos
+Descarga y decodifica en segundo plano las imágenes de los registros
+cercanos al actual para que la navegación las encuentre en la caché
+"""
+
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _PrefetchSignals(QObject):
+    # (ronda, url, QImage, vence)
+    decoded = pyqtSignal(int, str, object, float)
+
+
+class _PrefetchTask(QRunnable):
+    def __init__(self, prefetcher, round_id, url):
+        super().__init__()
+        self.prefetcher = prefetcher
+        self.round_id = round_id
+        self.url = url
+
+    def run(self):
+        try:
+            self.prefetcher._run(self.round_id, self.url)
+        except Exception as e:
+            print(f"⚠️  Error al precargar imagen: {e}")
+
+
+class ImagePrefetcher(QObject):
+    """
+    Precarga por rondas dentro de un presupuesto
+
+    Cada llamada a prefetch() inicia una ronda nueva y cancela la
+    anterior. En una ronda se descargan como máximo max_bytes de la red
+    (las imágenes frescas en disco no cuentan) y se decodifican a memoria
+    como máximo memory_bytes; pasado ese límite las imágenes solo quedan
+    en disco. Las URLs se procesan en el orden recibido.
+    """
+
+    def __init__(self, cache, max_bytes, memory_bytes, max_threads=2, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+
+        self._round = 0
+        self._lock = threading.Lock()
+        self._downloaded = 0  # Bytes descargados en la ronda actual
+        self._decoded = 0  # Bytes decodificados en la ronda actual
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        self._signals = _PrefetchSignals(self)
+        self._signals.decoded.connect(self._store)
+
+    def prefetch(self, urls):
+        """
+        Inicia una ronda con las URLs indicadas (solo desde el hilo de la interfaz)
+        """
+        self.cancel()
+        seen = set()
+        for url in urls:
+            # Las que ya están en memoria no necesitan nada
+            if not url or url in seen or self.cache.cached_pixmap(url) is not None:
+                continue
+            seen.add(url)
+            self._pool.start(_PrefetchTask(self, self._round, url))
+
+    def cancel(self):
+        """Descarta la ronda actual: lo que no empezó ya no se ejecuta"""
+        with self._lock:
+            self._round += 1
+            self._downloaded = 0
+            self._decoded = 0
+        self._pool.clear()
+
+    def _run(self, round_id, url):
+        if round_id != self._round:
+            return
+        fresh = self.cache.disk.is_fresh(url)
+        with self._lock:
+            if not fresh and self._downloaded >= self.max_bytes:
+                return
+
+        if fresh:
+            size = None
+        else:
+            fetched = self.cache.disk.fetch(url)
+            if fetched is None:
+                return
+            size = len(fetched[0])
+
+        with self._lock:
+            if round_id != self._round:
+                return
+            if size is not None:
+                self._downloaded += size
+            if self._decoded >= self.memory_bytes:
+                return  # Sin presupuesto de memoria: queda solo en disco
+
+        decoded = self.cache.decode_image(url)
+        if decoded is None:
+            return
+        image, expires = decoded
+        with self._lock:
+            if round_id != self._round:
+                return
+            self._decoded += image.sizeInBytes()
+        self._signals.decoded.emit(round_id, url, image, expires)
+
+    def _store(self, round_id, url, image, expires):
+        # En el hilo de la interfaz: convertir a QPixmap y dejarlo en memoria
+        if round_id == self._round:
+            self.cache.put_image(url, image, expires)
@@ -0,0 +1,37 @@
+"""
+Decodificación JSON de las respuestas del backend
+Usa orjson si está instalado y, si no, el módulo json de la biblioteca estándar
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa la biblioteca estándar
+    orjson = None
+
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+if orjson is not None:
+    def loads(data):
+        """Decodifica bytes o str (lanza ValueError si no es JSON válido)"""
+        return orjson.loads(data)
+
+    def dumps(value):
+        """Codifica a bytes UTF-8"""
+        return orjson.dumps(value)
+else:
+    def loads(data):
+        """Decodifica bytes o str (lanza ValueError si no es JSON válido)"""
+        return json.loads(data)
+
+    def dumps(value):
+        """Codifica a bytes UTF-8"""
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def response_json(response):
+    """Contenido JSON de una respuesta de requests (ya descomprimida)"""
+    return loads(response.content)
@@ -9,7 +9,9 @@ from PyQt6.QtGui import QPainter, QFont, QPixmap, QImage, QPageSize, QPageLayout
 from PyQt6.QtCore import Qt, QRectF, QMarginsF, QRect
 from PyQt6.QtWidgets import QMessageBox
 from pathlib import Path
-import requests
+
+from utils.api_client import APIClient
+from utils.image_cache import ImageCache
 
 
 class PrintManager:
@@ -27,6 +29,7 @@ class PrintManager:
                 - date: Fecha
                 - image_path: Ruta local de la imagen
                 - image_url: URL de Cloudinary (opcional)
+                - image_print_url: Versión para impresión generada por el servidor (opcional)
         """
         print("\n" + "="*50)
         print("📄 PREPARANDO DOCUMENTO PARA IMPRESIÓN")
@@ -359,7 +362,7 @@ class PrintManager:
         Carga la imagen desde archivo local o URL de Cloudinary
         
         Args:
-            data: Datos del documento con image_path o image_url
+            data: Datos del documento con image_path, image_print_url o image_url
             
         Returns:
             QImage: Imagen cargada o None si falla
@@ -370,18 +373,16 @@ class PrintManager:
             print(f"📷 Cargando imagen desde: {image_path}")
             return QImage(image_path)
         
-        # Intentar cargar desde URL (Cloudinary)
-        image_url = data.get("image_url", "")
+        # Intentar cargar desde URL, preferentemente el tamaño para impresión
+        image_url = data.get("image_print_url") or data.get("image_url", "")
         if image_url:
             try:
-                print(f"📷 Descargando imagen desde: {image_url}")
+                print(f"📷 Cargando imagen desde: {image_url}")
                 # Timeout reducido para evitar congelar la UI demasiado tiempo
-                response = requests.get(image_url, timeout=3)
-                if response.status_code == 200:
-                    image = QImage()
-                    if image.loadFromData(response.content):
-                        print("✅ Imagen cargada desde Cloudinary")
-                        return image
+                image = ImageCache.shared().load_image(image_url, timeout=(APIClient.CONNECT_TIMEOUT, 3))
+                if image is not None:
+                    print("✅ Imagen cargada")
+                    return image
             except Exception as e:
                 print(f"❌ Error al descargar imagen desde URL: {e}")
         
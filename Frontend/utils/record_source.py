@@ -0,0 +1,569 @@
+"""
+Fuente de registros del menú con carga por ventanas
+Descarga páginas alrededor del registro actual bajo demanda
+"""
+
+import bisect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Mayor id posible (INT de MySQL) + 1: cursor para pedir la última página
+END_CURSOR = 2 ** 31
+
+
+class DishRecord:
+    """
+    Plato tal como lo usa el formulario
+
+    Con __slots__ cada registro ocupa mucho menos que un dict. El precio
+    se guarda como llegó de la API y se pasa a texto solo al mostrarlo.
+    "hash" resume el contenido visible del plato: dos registros con el
+    mismo id y el mismo hash se muestran igual.
+    """
+
+    __slots__ = (
+        "id", "name", "raw_price", "date", "image_url", "image_status",
+        "image_variants", "image_path", "hash"
+    )
+
+    def __init__(self, id, name, raw_price, date="", image_url="",
+                 image_status="lista", image_variants=None, image_path=""):
+        self.id = id
+        self.name = name
+        self.raw_price = raw_price
+        self.date = date
+        self.image_url = image_url
+        self.image_status = image_status  # "pendiente" mientras se sube
+        # URLs de los tamaños generados por el servidor (thumb, preview, print)
+        self.image_variants = image_variants
+        self.image_path = image_path  # Path local, si se eligió una imagen
+        self.hash = hash((name, raw_price, date, image_url, image_status))
+
+    @property
+    def price(self):
+        return "0.00" if self.raw_price is None else str(self.raw_price)
+
+    def variant(self, size):
+        """URL del tamaño indicado, o cadena vacía si el servidor no lo ofrece"""
+        return self.image_variants.get(size, "") if self.image_variants else ""
+
+    def copy(self, **changes):
+        """Copia con los campos indicados cambiados (y el hash recalculado)"""
+        fields = {name: getattr(self, name) for name in self.__slots__[:-1]}
+        fields.update(changes)
+        return DishRecord(**fields)
+
+    def __repr__(self):
+        return f"DishRecord(id={self.id!r}, name={self.name!r}, price={self.price!r})"
+
+
+def dish_to_record(dish):
+    """
+    Convierte un plato de la API al formato usado por el formulario
+
+    Es la única conversión: la usan la carga inicial, las recargas, las
+    páginas y los cambios remotos.
+    """
+    return DishRecord(
+        dish.get("id"),
+        dish.get("nombre"),
+        dish.get("precio"),
+        dish.get("fecha_creacion") or "",
+        dish.get("imagen_url") or "",
+        dish.get("imagen_estado", "lista"),
+        dish.get("imagen_variantes") or None
+    )
+
+
+def records_from_columns(columns):
+    """
+    Convierte el menú por columnas ({campo: [valores]}) en registros
+
+    Equivale a dish_to_record sobre cada fila, sin armar los dicts
+    intermedios. Los campos que no vienen quedan con su valor por defecto.
+    """
+    ids = columns.get("id") or []
+    missing = [None] * len(ids)
+    states = columns.get("imagen_estado") or ["lista"] * len(ids)
+    return [
+        DishRecord(id, name, price, date or "", url or "", state, variants or None)
+        for id, name, price, date, url, state, variants in zip(
+            ids,
+            columns.get("nombre") or missing,
+            columns.get("precio") or missing,
+            columns.get("fecha_creacion") or missing,
+            columns.get("imagen_url") or missing,
+            states,
+            columns.get("imagen_variantes") or missing
+        )
+    ]
+
+
+def diff_records(old_rows, new_rows):
+    """
+    Diferencias entre dos listas de registros, por id y hash, en O(n)
+
+    Returns:
+        Dict con los ids inserted, updated y deleted
+    """
+    old_hashes = {record.id: record.hash for record in old_rows}
+    inserted, updated = [], []
+    for record in new_rows:
+        previous = old_hashes.pop(record.id, None)
+        if previous is None:
+            inserted.append(record.id)
+        elif previous != record.hash:
+            updated.append(record.id)
+    return {"inserted": inserted, "updated": updated, "deleted": list(old_hashes)}
+
+
+class RecordSource:
+    """
+    Ventana de registros del menú ordenados por id
+
+    Solo mantiene en memoria unas pocas páginas contiguas alrededor del
+    registro actual. len() devuelve el total informado por el servidor y
+    el acceso por índice descarga la página necesaria si no está cargada.
+    Las páginas vecinas se precargan en segundo plano y las lejanas se
+    descartan.
+
+    Las escrituras propias se aplican en sitio (remove, replace,
+    confirm_insert) sin recargar; el aviso del mismo cambio que llega
+    después por el canal de cambios se reconoce y no se cuenta dos veces.
+    """
+
+    def __init__(self, api_client, page_size=50, max_pages=5):
+        self.api_client = api_client
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.total = 0  # Total de platos en el servidor
+        self.version = None  # Versión del menú de la última recarga
+
+        self._rows = []  # Registros cargados (contiguos, ordenados por id)
+        self._start = 0  # Índice absoluto del primer registro cargado
+        self._lock = threading.RLock()
+        # Cambia en cada recarga para descartar precargas de una ventana anterior
+        self._generation = 0
+        self._loading = set()  # Direcciones con precarga en curso
+        # (posición por id, lista de ids) de la ventana; None si hay que reconstruirlo
+        self._index_cache = None
+        # Escrituras propias aplicadas localmente cuyo aviso remoto todavía
+        # no llegó: id -> (operación, versión o None si no hay respuesta aún)
+        self._echoes = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="record-prefetch")
+
+    def __len__(self):
+        return self.total
+
+    def __bool__(self):
+        return self.total > 0
+
+    def __getitem__(self, index):
+        record = self.get(index)
+        if record is None:
+            raise IndexError(index)
+        return record
+
+    @property
+    def start(self):
+        """Índice absoluto del primer registro cargado"""
+        return self._start
+
+    def close(self):
+        """Detiene las precargas pendientes"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ==================== CARGA ====================
+
+    def reload(self, anchor_id=None):
+        """
+        Descarta la ventana actual y carga la página que contiene anchor_id
+        (o la primera página si no se indica)
+
+        Returns:
+            Dict con success, version, total y diff (ids que cambiaron
+            respecto de la ventana anterior, ver diff_records), o error
+        """
+        if anchor_id is None:
+            page = self.api_client.get_dishes_page(self.page_size, with_total=True)
+        else:
+            page = self.api_client.get_dishes_page(
+                self.page_size, after_id=anchor_id - 1, with_total=True
+            )
+            if page.get('success') and not page.get('records') and page.get('total'):
+                # El ancla era el último plato y ya no existe: cargar el final
+                page = self._fetch_tail_page()
+
+        if not page.get('success'):
+            return page
+
+        with self._lock:
+            old_rows = self._rows
+            self._reset(page)
+            return {
+                "success": True,
+                "version": self.version,
+                "total": self.total,
+                # Las filas de la ventana anterior que no volvieron pueden
+                # seguir existiendo fuera de la nueva
+                "diff": diff_records(old_rows, self._rows)
+            }
+
+    def _fetch_tail_page(self):
+        return self.api_client.get_dishes_page(
+            self.page_size, before_id=END_CURSOR, with_total=True
+        )
+
+    def _reset(self, page):
+        self._generation += 1
+        self._loading.clear()
+        self._rows = list(page.get('records', []))
+        self._index_cache = None
+        self._start = page.get('offset') or 0
+        self.total = page.get('total') if page.get('total') is not None else len(self._rows)
+        self.version = page.get('version')
+        # La página ya incluye las escrituras confirmadas hasta su versión
+        self._echoes = {
+            dish_id: echo for dish_id, echo in self._echoes.items()
+            if echo[1] is None or self.version is None or echo[1] > self.version
+        }
+        # Una eliminación propia que la página todavía no refleja: quitar la
+        # fila como en remove() y conservar el eco para ignorar el aviso remoto
+        pending = {dish_id for dish_id, echo in self._echoes.items() if echo[0] == "delete"}
+        if pending:
+            rows = [record for record in self._rows if record.id not in pending]
+            self.total = max(0, self.total - (len(self._rows) - len(rows)))
+            self._rows = rows
+
+    def _fetch_next(self):
+        """Agrega la página siguiente al final de la ventana"""
+        with self._lock:
+            if not self._rows:
+                return False
+            generation = self._generation
+            cursor = self._rows[-1].id
+
+        page = self.api_client.get_dishes_page(self.page_size, after_id=cursor)
+        if not page.get('success'):
+            return False
+
+        with self._lock:
+            # Ignorar si la ventana cambió mientras se descargaba
+            if generation != self._generation or not self._rows or self._rows[-1].id != cursor:
+                return False
+            new_rows = page.get('records', [])
+            self._rows.extend(new_rows)
+            self._index_cache = None
+            if page.get('next_cursor') is None:
+                # Se llegó al final: corregir el total si hubo cambios no vistos
+                self.total = self._start + len(self._rows)
+            return bool(new_rows)
+
+    def _fetch_prev(self):
+        """Agrega la página anterior al inicio de la ventana"""
+        with self._lock:
+            if not self._rows:
+                return False
+            generation = self._generation
+            cursor = self._rows[0].id
+
+        page = self.api_client.get_dishes_page(self.page_size, before_id=cursor)
+        if not page.get('success'):
+            return False
+
+        with self._lock:
+            if generation != self._generation or not self._rows or self._rows[0].id != cursor:
+                return False
+            new_rows = page.get('records', [])
+            self._rows[:0] = new_rows
+            self._index_cache = None
+            self._start = max(0, self._start - len(new_rows))
+            if page.get('prev_cursor') is None:
+                # Se llegó al inicio
+                self._start = 0
+            return bool(new_rows)
+
+    # ==================== ACCESO ====================
+
+    def get(self, index, load=True):
+        """
+        Retorna el registro en la posición indicada, descargándolo si hace falta
+
+        Args:
+            load: False para no usar la red (desde la interfaz): retorna
+                  None si la página no está cargada
+
+        Returns:
+            Dict del registro o None si no se pudo obtener
+        """
+        if not 0 <= index < self.total:
+            return None
+
+        record = self._cached(index)
+        if record is None and load:
+            self._load_sync(index)
+            record = self._cached(index)
+        if record is not None:
+            self._after_access(index)
+        return record
+
+    def peek(self, index):
+        """Registro en la posición indicada solo si ya está cargado (sin usar la red)"""
+        return self._cached(index)
+
+    def _cached(self, index):
+        with self._lock:
+            if self._start <= index < self._start + len(self._rows):
+                return self._rows[index - self._start]
+            return None
+
+    def _load_sync(self, index):
+        """Carga la página necesaria cuando la precarga no llegó a tiempo"""
+        with self._lock:
+            start, end = self._start, self._start + len(self._rows)
+
+        if self._rows and index == end:
+            self._fetch_next()
+        elif self._rows and index == start - 1:
+            self._fetch_prev()
+        elif index == self.total - 1:
+            page = self._fetch_tail_page()
+            if page.get('success'):
+                with self._lock:
+                    self._reset(page)
+        elif index == 0:
+            self.reload()
+
+    def _after_access(self, index):
+        """Descarta páginas lejanas y precarga las vecinas"""
+        with self._lock:
+            half = self.max_rows // 2
+            low, high = index - half, index + half
+            if self._start < low:
+                drop = low - self._start
+                del self._rows[:drop]
+                self._start += drop
+                self._index_cache = None
+            end = self._start + len(self._rows)
+            if end > high:
+                del self._rows[high - self._start:]
+                self._index_cache = None
+                end = high
+
+            directions = []
+            if end < self.total and end - index <= self.page_size:
+                directions.append('next')
+            if self._start > 0 and index - self._start <= self.page_size:
+                directions.append('prev')
+            for direction in directions:
+                if direction not in self._loading:
+                    self._loading.add(direction)
+                    self._executor.submit(self._prefetch, direction)
+
+    def _prefetch(self, direction):
+        try:
+            if direction == 'next':
+                self._fetch_next()
+            else:
+                self._fetch_prev()
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._loading.discard(direction)
+
+    def _index(self):
+        """(posición por id, ids ordenados) de la ventana; se reconstruye tras cambios de forma"""
+        if self._index_cache is None:
+            ids = [record.id for record in self._rows]
+            self._index_cache = ({dish_id: position for position, dish_id in enumerate(ids)}, ids)
+        return self._index_cache
+
+    def _position(self, dish_id):
+        """Posición dentro de la ventana donde está (o iría) el id"""
+        found = self._index()[0].get(dish_id)
+        return found if found is not None else bisect.bisect_left(self._index()[1], dish_id)
+
+    def index_of(self, dish_id):
+        """Índice absoluto del plato si está cargado, o None"""
+        if dish_id is None:
+            return None
+        with self._lock:
+            position = self._index()[0].get(dish_id)
+            return self._start + position if position is not None else None
+
+    def nearest_index(self, dish_id):
+        """
+        Índice absoluto del plato o, si ya no existe, del siguiente cargado
+        (el último de la ventana si no hay siguiente)
+        """
+        with self._lock:
+            if not self._rows:
+                return None
+            if dish_id is None:
+                return self._start
+            position = min(self._position(dish_id), len(self._rows) - 1)
+            return self._start + position
+
+    # ==================== ESCRITURAS PROPIAS ====================
+
+    def _insert_locked(self, record):
+        """
+        Agrega un registro nuevo a la ventana y al total
+
+        Returns:
+            Índice absoluto, o None si quedó fuera de la ventana
+        """
+        position = self._position(record.id)
+        includes_tail = self._start + len(self._rows) >= self.total
+        self.total += 1
+        if self._rows and position == 0 and record.id < self._rows[0].id:
+            # Va antes de la ventana: todo se corre una posición
+            self._start += 1
+            return None
+        if position < len(self._rows) or includes_tail:
+            self._rows.insert(position, record)
+            self._index_cache = None
+            return self._start + position
+        return None
+
+    def replace(self, record):
+        """
+        Reemplaza en sitio el registro con el mismo id, si está cargado
+
+        Returns:
+            El registro anterior (para deshacer) o None
+        """
+        with self._lock:
+            position = self._index()[0].get(record.id)
+            if position is None:
+                return None
+            previous = self._rows[position]
+            self._rows[position] = record
+            return previous
+
+    def remove(self, dish_id):
+        """
+        Quita un plato eliminado localmente antes de que llegue el aviso remoto
+
+        Returns:
+            (índice absoluto, registro) para deshacer con restore(), o None
+        """
+        with self._lock:
+            position = self._index()[0].get(dish_id)
+            if position is None:
+                return None
+            record = self._rows.pop(position)
+            self._index_cache = None
+            self.total = max(0, self.total - 1)
+            self._echoes[dish_id] = ("delete", None)
+            return self._start + position, record
+
+    def restore(self, removed):
+        """Deshace remove() cuando el servidor rechazó la eliminación"""
+        _, record = removed
+        with self._lock:
+            if self._echoes.get(record.id, (None,))[0] != "delete":
+                return  # Una recarga ya reflejó el estado real
+            del self._echoes[record.id]
+            self._insert_locked(record)
+
+    def confirm_insert(self, dish, version=None):
+        """
+        Agrega el plato creado con la fila que devolvió el servidor
+
+        Si la fila cae lejos de la ventana (un plato nuevo va al final),
+        la ventana pasa a ser solo esa fila y el resto se carga al navegar.
+
+        Returns:
+            Índice absoluto del plato, o None si no se pudo ubicar
+        """
+        record = dish_to_record(dish)
+        with self._lock:
+            position = self._index()[0].get(record.id)
+            if position is not None:
+                # El aviso remoto llegó antes que la respuesta
+                self._rows[position] = record
+                return self._start + position
+
+            seen = version is not None and self.version is not None and version <= self.version
+            if seen:
+                # Ya contado por el aviso remoto, pero quedó fuera de la ventana
+                self.total -= 1
+            else:
+                self._echoes[record.id] = ("insert", version)
+            index = self._insert_locked(record)
+            if index is not None or (self._rows and record.id < self._rows[0].id):
+                return index
+
+            self._generation += 1
+            self._loading.clear()
+            self._rows = [record]
+            self._index_cache = None
+            self._start = self.total - 1
+            return self._start
+
+    def confirm_delete(self, dish_id, version=None):
+        """Registra la versión de una eliminación hecha con remove()"""
+        with self._lock:
+            if dish_id in self._echoes:
+                self._echoes[dish_id] = ("delete", version)
+
+    # ==================== CAMBIOS REMOTOS ====================
+
+    def apply_changes(self, changes):
+        """
+        Aplica las diferencias de /menu/changes sobre la ventana y el total
+
+        Las actualizaciones que no cambian el contenido (mismo hash, por
+        ejemplo el aviso de una edición propia) se ignoran.
+
+        Returns:
+            Dict con los ids inserted, updated y deleted que cambiaron algo
+            y changed (bool)
+        """
+        with self._lock:
+            diff = {"inserted": [], "updated": [], "deleted": []}
+            if changes.get('version') is not None:
+                self.version = changes['version']
+
+            for dish_id in changes.get('deleted', []):
+                echo = self._echoes.pop(dish_id, None)
+                if echo is not None and echo[0] == "delete":
+                    continue  # Ya se quitó localmente
+                position = self._position(dish_id)
+                if position < len(self._rows) and self._rows[position].id == dish_id:
+                    del self._rows[position]
+                    self._index_cache = None
+                elif self._rows and position == 0:
+                    # Estaba antes de la ventana: todo se corre una posición
+                    self._start = max(0, self._start - 1)
+                self.total = max(0, self.total - 1)
+                diff["deleted"].append(dish_id)
+
+            for dish in changes.get('updated', []):
+                position = self._index()[0].get(dish.get('id'))
+                if position is not None:
+                    record = dish_to_record(dish)
+                    if record.hash != self._rows[position].hash:
+                        self._rows[position] = record
+                        diff["updated"].append(record.id)
+
+            for dish in changes.get('inserted', []):
+                record = dish_to_record(dish)
+                echo = self._echoes.pop(record.id, None)
+                position = self._index()[0].get(record.id)
+                if position is not None:
+                    # Ya estaba (por ejemplo, incluido en una recarga o agregado localmente)
+                    if record.hash != self._rows[position].hash:
+                        self._rows[position] = record
+                        diff["updated"].append(record.id)
+                    continue
+                if echo is not None and echo[0] == "insert":
+                    continue  # Contado localmente y fuera de la ventana
+                self._insert_locked(record)
+                diff["inserted"].append(record.id)
+
+            diff["changed"] = bool(diff["inserted"] or diff["updated"] or diff["deleted"])
+            return diff